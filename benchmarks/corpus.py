@@ -0,0 +1,172 @@
+"""
+Corpus de pages pour les benchmarks
+
+Aucune page réelle n'est versionnée : par défaut, des pages synthétiques
+reproduisant la structure utilisée par les parseurs (info-list-container,
+feed-grid__item) et le volume d'une vraie page (en-tête, scripts, images)
+sont générées. Les mesures obtenues servent à comparer deux versions du
+code entre elles ; elles ne prédisent pas les temps sur les pages réelles.
+
+Pour mesurer sur des pages réelles :
+- une archive de pages écrite par les exécutions (PAGE_ARCHIVE_PATH), avec
+  --archive ;
+- des pages enregistrées localement dans benchmarks/corpus/
+  (cardmarket_*.html : pages produit, vinted_*.html : recherches du
+  catalogue).
+
+corpus_source() indique le corpus utilisé, repris dans les résultats.
+"""
+
+import glob
+import os
+import random
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+ARCHIVE_PATH = ""
+# Pages au plus lues dans l'archive, par type
+ARCHIVE_MAX_PAGES = 200
+
+VINTED_PRICE_CLASS = "web_ui__Text__text web_ui__Text__subtitle web_ui__Text__left web_ui__Text__clickable web_ui__Text__underline-none"
+
+NAME_WORDS = (
+    "Mickey Souris Brave Stitch Elsa Reine Neiges Maui Demi-dieu Ariel Sirène "
+    "Gaston Maléfique Dragon Bête Héros Tragique Belle Érudite Jafar Sorcier "
+    "Cruella Vilaine Hadès Seigneur Morts Simba Roi Lion Scar Pumbaa Timon "
+    "Raiponce Flynn Vaiana Aladdin Jasmine Génie Ursula Capitaine Crochet"
+).split()
+
+
+def synthetic_card_names(count: int, seed: int = 42) -> list[str]:
+    """Noms de cartes synthétiques, au format « Personnage - Titre »"""
+    rng = random.Random(seed)
+    names = []
+    for i in range(count):
+        character = " ".join(rng.sample(NAME_WORDS, rng.randint(1, 2)))
+        title = " ".join(rng.sample(NAME_WORDS, rng.randint(1, 3)))
+        names.append(f"{character} - {title} {i}")
+    return names
+
+
+def _euro(value: float) -> str:
+    """Prix au format affiché par les sites (12,34 €)"""
+    return f"{value:.2f} €".replace(".", ",")
+
+
+def _page_padding(rng: random.Random) -> tuple[str, str]:
+    """En-tête et contenu annexe d'un poids comparable à une vraie page"""
+    scripts = "".join(
+        f'<script src="/static/js/chunk-{i}.js"></script>' for i in range(40)
+    )
+    inline = "<script>window.__STATE__ = {" + ",".join(
+        f'"k{i}": "{rng.random()}"' for i in range(3000)
+    ) + "}</script>"
+    styles = "".join(
+        f'<link rel="stylesheet" href="/static/css/{i}.css">' for i in range(20)
+    )
+    head = f"<head><title>Page</title>{styles}{scripts}</head>"
+    footer = "".join(
+        f'<div class="footer-link"><a href="/help/{i}">Aide {i}</a><img src="/img/{i}.png"></div>'
+        for i in range(300)
+    )
+    return head + inline, footer
+
+
+def cardmarket_product_page(seed: int = 0) -> str:
+    """Page produit Cardmarket synthétique"""
+    rng = random.Random(seed)
+    head, footer = _page_padding(rng)
+    price = rng.uniform(0.1, 80)
+    offers = "".join(
+        f'<div class="article-row"><span class="seller">Vendeur{i}</span>'
+        f'<span class="price">{_euro(price + i * 0.1)}</span></div>'
+        for i in range(50)
+    )
+    info = (
+        '<div class="info-list-container col-12 col-md-8"><dl class="labeled row">'
+        '<dt class="col-6">Rareté</dt><dd class="col-6">Rare</dd>'
+        '<dt class="col-6">Numéro</dt><dd class="col-6">124</dd>'
+        f'<dt class="col-6">Articles disponibles</dt><dd class="col-6">{rng.randint(1, 500)}</dd>'
+        f'<dt class="col-6">De</dt><dd class="col-6">{_euro(price)}</dd>'
+        f'<dt class="col-6">Tendance des prix</dt><dd class="col-6"><span>{_euro(price * 1.1)}</span></dd>'
+        f'<dt class="col-6">Prix moyen 30 jours</dt><dd class="col-6"><span>{_euro(price * 1.05)}</span></dd>'
+        "</dl></div>"
+    )
+    return (
+        f'<html>{head}<body><div id="mainContent">{info}'
+        f'<div class="table-body">{offers}</div></div>{footer}</body></html>'
+    )
+
+
+def vinted_catalog_page(card_name: str = "", items: int = 96, seed: int = 0) -> str:
+    """Page de recherche Vinted synthétique, contenant quelques annonces de la carte"""
+    rng = random.Random(seed)
+    head, footer = _page_padding(rng)
+    cells = []
+    for i in range(items):
+        if i % 24 == 11:
+            cells.append(
+                '<div class="feed-grid__item feed-grid__item--full-row"><div class="ad">Pub</div></div>'
+            )
+            continue
+        if card_name and i % 10 == 3:
+            title = f"{card_name} Lorcana"
+        else:
+            title = " ".join(rng.sample(NAME_WORDS, 3))
+        price = _euro(rng.uniform(2, 60))
+        cells.append(
+            '<div class="feed-grid__item"><div class="new-item-box__container">'
+            f'<img src="/images/{i}.webp" alt="">'
+            f'<a data-testid="product-item-id-{i}--overlay-link" href="/items/{1000 + i}-carte"'
+            f' title="{title}, marque: Disney, état: Très bon état, {price}"></a>'
+            f'<div><span class="{VINTED_PRICE_CLASS}">{price}</span></div>'
+            "</div></div>"
+        )
+    grid = f'<div class="feed-grid">{"".join(cells)}</div>'
+    return f"<html>{head}<body><main>{grid}</main>{footer}</body></html>"
+
+
+def archived_pages(kind: str) -> list[tuple[str, str]]:
+    """Couples (clé, HTML) des pages d'un type de l'archive (cardmarket_html, vinted_html)"""
+    from utils.page_archive import ArchiveReader
+
+    with ArchiveReader(ARCHIVE_PATH) as reader:
+        entries = list(reader.select({kind}))[-ARCHIVE_MAX_PAGES:]
+        return [(entry.key, reader.read(entry)) for entry in entries]
+
+
+def load_pages(prefix: str) -> list[str]:
+    """Pages enregistrées d'un type (cardmarket ou vinted)"""
+    if ARCHIVE_PATH:
+        return [page for _, page in archived_pages(f"{prefix}_html")]
+    pages = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, f"{prefix}_*.html"))):
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+    return pages
+
+
+def corpus_source() -> str:
+    """Origine des pages mesurées : archive, recorded ou synthetic"""
+    if ARCHIVE_PATH:
+        return "archive"
+    if load_pages("cardmarket") or load_pages("vinted"):
+        return "recorded"
+    return "synthetic"
+
+
+def cardmarket_pages() -> list[str]:
+    """Pages Cardmarket enregistrées, ou synthétiques à défaut"""
+    return load_pages("cardmarket") or [cardmarket_product_page(i) for i in range(5)]
+
+
+def vinted_pages() -> list[tuple[str, str]]:
+    """Couples (carte recherchée, page Vinted), enregistrés ou synthétiques"""
+    if ARCHIVE_PATH:
+        recorded = archived_pages("vinted_html")
+        if recorded:
+            return recorded
+    recorded = load_pages("vinted")
+    if recorded:
+        return [("", page) for page in recorded]
+    names = synthetic_card_names(5)
+    return [(name, vinted_catalog_page(name, seed=i)) for i, name in enumerate(names)]
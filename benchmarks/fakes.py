@@ -0,0 +1,247 @@
+"""
+Doublures hors ligne des services externes pour les benchmarks
+
+- FakeSheetsService : imite service.spreadsheets().values() en mémoire,
+  compte les appels et simule latence et quota par minute
+- FakeBrowserPool : imite BrowserPool et sert les pages du corpus
+"""
+
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from urllib.parse import parse_qs, urlparse
+
+from corpus import cardmarket_pages, vinted_catalog_page
+from scrapers.html_parsers import extract_cardmarket_fields, extract_vinted_items
+from scrapers.page_scripts import CARDMARKET_FIELDS_SCRIPT, VINTED_ITEMS_SCRIPT
+
+CELL_RE = re.compile(r"^([A-Z]+)?(\d+)?$")
+CARD_PLACEHOLDER = "@@CARD@@"
+
+
+class FakeQuotaError(Exception):
+    """Équivalent d'une réponse 429 de l'API Google Sheets"""
+
+
+def _column_index(letters: str) -> int:
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def parse_a1(a1_range: str) -> tuple[str, int, int, int, int]:
+    """Découpe "Onglet!A2:S" en (onglet, ligne début, col début, ligne fin, col fin)"""
+    sheet, _, cells = a1_range.partition("!")
+    start, _, end = cells.partition(":")
+    start_col, start_row = CELL_RE.match(start).groups()
+    end_col, end_row = CELL_RE.match(end or start).groups()
+    return (
+        sheet,
+        int(start_row) if start_row else 1,
+        _column_index(start_col) if start_col else 0,
+        int(end_row) if end_row else 10**9,
+        _column_index(end_col) if end_col else 10**3,
+    )
+
+
+class _FakeRequest:
+    def __init__(self, service: "FakeSheetsService", method: str, handler):
+        self._service = service
+        self._method = method
+        self.methodId = f"sheets.spreadsheets.values.{method}"
+        self._handler = handler
+
+    def execute(self):
+        self._service._on_call(self._method)
+        return self._handler()
+
+
+class FakeSheetsService:
+    """
+    Google Sheet en mémoire
+
+    rows contient les lignes de l'onglet principal à partir de la ligne 1
+    (en-têtes) ; les autres onglets sont créés à la volée.
+    """
+
+    def __init__(
+        self,
+        rows: list[list],
+        sheet_name: str = "data",
+        latency: float = 0.0,
+        quota_per_minute: int | None = None,
+    ):
+        self.sheets: dict[str, list[list]] = {sheet_name: rows}
+        self.latency = latency
+        self.quota_per_minute = quota_per_minute
+        self.calls: Counter = Counter()
+        self.cells_read = 0
+        self.cells_written = 0
+        self.quota_errors = 0
+        self._recent: deque = deque()
+        self._lock = threading.Lock()
+
+    def _on_call(self, method: str):
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            if self.quota_per_minute and len(self._recent) >= self.quota_per_minute:
+                self.quota_errors += 1
+                raise FakeQuotaError("429 RESOURCE_EXHAUSTED (quota simulé)")
+            self._recent.append(now)
+            self.calls[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    # Chaînage service.spreadsheets().values()
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def _read(self, a1_range: str) -> dict:
+        sheet, r1, c1, r2, c2 = parse_a1(a1_range)
+        rows = self.sheets.get(sheet, [])
+        values = []
+        for row in rows[r1 - 1 : r2]:
+            cells = row[c1 : c2 + 1]
+            self.cells_read += len(cells)
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return {"range": a1_range, "values": values}
+
+    def _write(self, a1_range: str, values: list[list]):
+        sheet, r1, c1, _, _ = parse_a1(a1_range)
+        rows = self.sheets.setdefault(sheet, [])
+        for offset, row_values in enumerate(values):
+            index = r1 - 1 + offset
+            while len(rows) <= index:
+                rows.append([])
+            row = rows[index]
+            if len(row) < c1 + len(row_values):
+                row.extend([""] * (c1 + len(row_values) - len(row)))
+            row[c1 : c1 + len(row_values)] = row_values
+            self.cells_written += len(row_values)
+
+    def get(self, spreadsheetId, range, **kwargs):
+        return _FakeRequest(self, "get", lambda: self._read(range))
+
+    def batchGet(self, spreadsheetId, ranges, **kwargs):
+        return _FakeRequest(
+            self,
+            "batchGet",
+            lambda: {"valueRanges": [self._read(r) for r in ranges]},
+        )
+
+    def batchUpdate(self, spreadsheetId, body, **kwargs):
+        def handler():
+            for data in body.get("data", []):
+                self._write(data["range"], data["values"])
+            return {"totalUpdatedCells": sum(len(d["values"][0]) for d in body["data"])}
+
+        return _FakeRequest(self, "batchUpdate", handler)
+
+    def append(self, spreadsheetId, range, body, **kwargs):
+        def handler():
+            sheet = range.partition("!")[0]
+            rows = self.sheets.setdefault(sheet, [])
+            rows.extend(body["values"])
+            self.cells_written += sum(len(row) for row in body["values"])
+            return {"updates": {"updatedRows": len(body["values"])}}
+
+        return _FakeRequest(self, "append", handler)
+
+    def stats(self) -> dict:
+        """Compteurs d'appels pour le rapport de benchmark"""
+        return {
+            "api_calls": sum(self.calls.values()),
+            "calls_by_method": dict(self.calls),
+            "cells_read": self.cells_read,
+            "cells_written": self.cells_written,
+            "quota_errors": self.quota_errors,
+        }
+
+
+class FakeSB:
+    """Navigateur factice servant les pages du corpus selon l'URL ouverte"""
+
+    def __init__(self, pool: "FakeBrowserPool"):
+        self._pool = pool
+        self._page = ""
+
+    def open(self, url: str):
+        if self._pool.latency:
+            time.sleep(self._pool.latency)
+        self._pool.pages_served += 1
+        self._page = self._pool.page_for(url)
+
+    def wait_for_element(self, selector: str, timeout: int = 10):
+        return None
+
+    def get_page_source(self) -> str:
+        return self._page
+
+    def execute_script(self, script: str, *args):
+        """Résultat des scripts d'extraction, calculé par les parseurs sur la page servie"""
+        if script == CARDMARKET_FIELDS_SCRIPT:
+            return extract_cardmarket_fields(self._page)
+        if script == VINTED_ITEMS_SCRIPT:
+            if "feed-grid" not in self._page:
+                return None
+            return [list(item) for item in extract_vinted_items(self._page)]
+        raise NotImplementedError("Script non simulé")
+
+
+class FakeBrowserPool:
+    """Remplace BrowserPool : aucun navigateur n'est lancé"""
+
+    def __init__(self, size: int = 2, max_pages: int = 50, latency: float = 0.0, **kwargs):
+        self.latency = latency
+        self.launched = 0
+        self.pages_served = 0
+        self._cardmarket = cardmarket_pages()
+        self._vinted_template = vinted_catalog_page(CARD_PLACEHOLDER)
+        self._counter = 0
+
+    def page_for(self, url: str) -> str:
+        if "vinted" in url or "/catalog" in url:
+            query = parse_qs(urlparse(url).query).get("search_text", [""])[0]
+            card_name = query.removeprefix("Lorcana ").strip()
+            return self._vinted_template.replace(CARD_PLACEHOLDER, card_name)
+        self._counter += 1
+        return self._cardmarket[self._counter % len(self._cardmarket)]
+
+    @contextmanager
+    def session(self, source: str):
+        yield FakeSB(self)
+
+    def close(self):
+        pass
+
+    def __enter__(self) -> "FakeBrowserPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class FakeMailer:
+    """Remplace Mailer : les emails sont comptés au lieu d'être envoyés"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.messages = []
+
+    def send(self, msg):
+        if self.latency:
+            time.sleep(self.latency)
+        self.messages.append(msg)
+
+    def close(self):
+        pass
@@ -0,0 +1,438 @@
+"""
+Benchmarks hors ligne du suivi des prix
+
+Mesure le parsing des pages, la correspondance des titres et une exécution
+complète de track_prices sur des cartes synthétiques, sans Cardmarket,
+Vinted ni Google. Les résultats sont écrits en JSON pour suivre les
+régressions d'une version à l'autre ; sauf --archive ou pages déposées
+dans benchmarks/corpus/, les pages sont synthétiques (voir corpus.py).
+
+Usage :
+    python benchmarks/run.py [--cards 1000 10000] [--output bench_results.json]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "src"))
+sys.path.insert(0, BENCH_DIR)
+os.environ.setdefault(
+    "GOOGLE_SHEETS_URL", "https://docs.google.com/spreadsheets/d/benchmark/edit"
+)
+
+from config import get_settings  # noqa: E402
+import corpus  # noqa: E402
+from corpus import (  # noqa: E402
+    cardmarket_pages,
+    corpus_source,
+    synthetic_card_names,
+    vinted_pages,
+)
+from fakes import FakeBrowserPool, FakeMailer, FakeSheetsService  # noqa: E402
+
+settings = get_settings()
+
+
+def bench(name: str, fn, iterations: int, **extra) -> dict:
+    """Chronomètre `iterations` appels de fn"""
+    fn()  # échauffement (imports, caches)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    total = time.perf_counter() - start
+    result = {
+        "name": name,
+        "iterations": iterations,
+        "total_s": round(total, 6),
+        "per_op_us": round(total / iterations * 1e6, 2),
+    }
+    result.update(extra)
+    print(f"{name:<45} {result['per_op_us']:>12.1f} µs/op")
+    return result
+
+
+def run_parsers(iterations: int) -> list[dict]:
+    from scrapers.cardmarket import parse_price_info
+    from scrapers.vinted import parse_vinted_listings
+
+    results = []
+    cm_pages = cardmarket_pages()
+    vinted = vinted_pages()
+    for backend in ("lxml", "bs4"):
+        settings.html_parser_backend = backend
+
+        def parse_cardmarket():
+            for page in cm_pages:
+                parse_price_info(page)
+
+        def parse_vinted():
+            for card_name, page in vinted:
+                parse_vinted_listings(page, card_name or "Mickey")
+
+        results.append(
+            bench(
+                f"parse_price_info[{backend}]",
+                parse_cardmarket,
+                iterations,
+                pages=len(cm_pages),
+            )
+        )
+        results.append(
+            bench(
+                f"parse_vinted_listings[{backend}]",
+                parse_vinted,
+                iterations,
+                pages=len(vinted),
+            )
+        )
+    settings.html_parser_backend = "lxml"
+    return results
+
+
+def run_matching(iterations: int) -> list[dict]:
+    from utils.string_matcher import TitleMatcher, is_title_match, normalize_text
+
+    card_names = synthetic_card_names(1000)
+    titles = synthetic_card_names(96, seed=7)
+
+    def normalize():
+        for title in titles:
+            normalize_text(title)
+
+    def pairwise():
+        for title in titles:
+            is_title_match(card_names[0], title)
+
+    matcher = TitleMatcher(card_names)
+
+    def batched():
+        matcher.match(titles)
+
+    return [
+        bench("normalize_text[96 titres]", normalize, iterations),
+        bench("is_title_match[1 carte x 96 titres]", pairwise, iterations),
+        bench(
+            "TitleMatcher.match[1000 cartes x 96 titres]",
+            batched,
+            max(1, iterations // 10),
+        ),
+    ]
+
+
+def synthetic_rows(count: int) -> list[list]:
+    """Lignes A:S d'un sheet de `count` cartes (ligne 1 = en-têtes)"""
+    rows = [["Name (EN)", "Name (FR)"]]
+    for i, name in enumerate(synthetic_card_names(count)):
+        rows.append(
+            [
+                name,
+                name,
+                str(1 + i % 6),
+                str(i),
+                "Ruby",
+                "Rare",
+                "1,00 €",
+                "2,00 €",
+                f"https://www.cardmarket.com/fr/Lorcana/Products/Singles/Set/Card-{i}",
+                "10,00 €",
+                "",
+                "",
+                "",
+                "",
+                "",
+                "",
+                "",
+                "",
+                "",
+            ]
+        )
+    return rows
+
+
+def run_end_to_end(
+    sizes: list[int],
+    workers: int,
+    page_latency: float,
+    sheets_latency: float,
+    quota: int,
+    pipeline: bool = False,
+    storage: str = "sheets",
+) -> list[dict]:
+    import main as app
+    from utils.metrics import metrics
+
+    results = []
+    for count in sizes:
+        tmp_dir = tempfile.mkdtemp(prefix="lorcana_bench_")
+        settings.history_db_path = os.path.join(tmp_dir, "history.db")
+        settings.scrape_cache_path = os.path.join(tmp_dir, "cache.json")
+        settings.journal_path = os.path.join(tmp_dir, "journal.jsonl")
+        settings.page_archive_path = os.path.join(tmp_dir, "pages")
+        settings.storage_path = os.path.join(tmp_dir, f"cards.{storage}")
+        settings.vinted_fetch_mode = "browser"
+
+        service = FakeSheetsService(
+            synthetic_rows(count),
+            latency=sheets_latency,
+            quota_per_minute=quota or None,
+        )
+        pools: list[FakeBrowserPool] = []
+
+        def make_pool(**kwargs):
+            pool = FakeBrowserPool(latency=page_latency, **kwargs)
+            pools.append(pool)
+            return pool
+
+        app.get_google_sheets_service = lambda *args, **kwargs: service
+        app.BrowserPool = make_pool
+        mailer = FakeMailer()
+        app.Mailer.from_settings = lambda: mailer
+
+        start = time.perf_counter()
+        app.track_prices(
+            settings.google_sheets_url,
+            "data",
+            ["cardmarket", "vinted"],
+            workers=workers,
+            max_age=timedelta(0),
+            pipeline=pipeline,
+            storage=storage,
+        )
+        total = time.perf_counter() - start
+
+        mode = "pipeline" if pipeline else f"{workers} workers"
+        if storage != "sheets":
+            mode += f", {storage}"
+        result = {
+            "name": f"track_prices[{count} cartes, {mode}]",
+            "iterations": 1,
+            "total_s": round(total, 6),
+            "per_card_ms": round(total / count * 1e3, 3),
+            "pages_served": sum(pool.pages_served for pool in pools),
+            "alerts": len(mailer.messages),
+            "sheets": service.stats(),
+        }
+        run_metrics = metrics.to_dict()
+        result["stages"] = run_metrics["stages"]
+        result["counters"] = run_metrics["counters"]
+        print(
+            f"{result['name']:<45} {result['per_card_ms']:>12.3f} ms/carte "
+            f"({result['sheets']['api_calls']} appels Sheets)"
+        )
+        results.append(result)
+    return results
+
+
+TRACKER_SCRIPT = '<script src="/www.googletagmanager.com/gtm.js"></script>'
+
+
+class _CountingServer:
+    """
+    Serveur HTTP local servant les pages du corpus et leurs ressources
+
+    Chaque requête reçue est comptée avec le nombre d'octets renvoyés :
+    les ressources bloquées par le navigateur n'arrivent jamais ici.
+    """
+
+    def __init__(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        pages = {
+            "/cardmarket": cardmarket_pages()[0],
+            "/vinted": vinted_pages()[0][1],
+        }
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path in pages:
+                    body = pages[path].replace("<head>", f"<head>{TRACKER_SCRIPT}", 1)
+                    body, content_type = body.encode(), "text/html; charset=utf-8"
+                elif path.endswith((".png", ".webp")):
+                    body, content_type = b"\0" * 20000, "image/png"
+                elif path.endswith(".css"):
+                    body, content_type = b"body{margin:0}" * 500, "text/css"
+                else:
+                    body, content_type = b"void 0;" * 1000, "application/javascript"
+                with server.lock:
+                    server.requests += 1
+                    server.bytes += len(body)
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes = 0
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.bytes = 0
+
+    def close(self):
+        self.httpd.shutdown()
+
+
+def run_page_weight(iterations: int) -> list[dict]:
+    """
+    Requêtes et octets chargés par page selon le profil de blocage
+
+    Nécessite Chrome : les pages du corpus sont ouvertes dans un vrai
+    navigateur (BrowserPool) depuis un serveur HTTP local.
+    """
+    from scrapers.browser_pool import BrowserPool
+    from scrapers.cardmarket import fetch_cardmarket_page
+    from scrapers.vinted import fetch_vinted_page
+
+    server = _CountingServer()
+    results = []
+    try:
+        for profile in ("off", "lean"):
+            settings.browser_block_profile = profile
+            with BrowserPool(size=1) as pool:
+                for source, fetch in (
+                    ("cardmarket", fetch_cardmarket_page),
+                    ("vinted", fetch_vinted_page),
+                ):
+                    url = f"{server.base_url}/{source}"
+                    fetch(url, pool)  # échauffement (lancement du navigateur)
+                    server.reset()
+                    start = time.perf_counter()
+                    for _ in range(iterations):
+                        fetch(url, pool)
+                    total = time.perf_counter() - start
+                    result = {
+                        "name": f"page_weight[{source}, {profile}]",
+                        "iterations": iterations,
+                        "total_s": round(total, 6),
+                        "per_page_ms": round(total / iterations * 1e3, 1),
+                        "requests_per_page": server.requests / iterations,
+                        "kb_per_page": round(server.bytes / iterations / 1024, 1),
+                    }
+                    print(
+                        f"{result['name']:<45} {result['per_page_ms']:>8.1f} ms/page "
+                        f"{result['requests_per_page']:>6.1f} requêtes "
+                        f"{result['kb_per_page']:>8.1f} Ko"
+                    )
+                    results.append(result)
+    finally:
+        server.close()
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks hors ligne")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--cards", type=int, nargs="*", default=[1000, 10000])
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--page-latency", type=float, default=0.0, help="Latence simulée par page (s)"
+    )
+    parser.add_argument(
+        "--sheets-latency",
+        type=float,
+        default=0.0,
+        help="Latence simulée par appel Sheets (s)",
+    )
+    parser.add_argument(
+        "--sheets-quota",
+        type=int,
+        default=0,
+        help="Quota simulé d'appels Sheets par minute (0 = illimité)",
+    )
+    parser.add_argument(
+        "--pipeline", action="store_true", help="Exécution complète en mode --pipeline"
+    )
+    parser.add_argument(
+        "--only",
+        choices=["parsers", "matching", "e2e", "page_weight"],
+        nargs="*",
+        help="page_weight (poids des pages selon le blocage, nécessite Chrome) "
+        "n'est lancé que s'il est demandé",
+    )
+    parser.add_argument(
+        "--storage",
+        choices=["sheets", "sqlite", "csv", "parquet"],
+        default="sheets",
+        help="Stockage des cartes pour l'exécution complète (les stockages "
+        "locaux sont d'abord importés depuis le sheet simulé)",
+    )
+    parser.add_argument(
+        "--archive",
+        help="Archive de pages (PAGE_ARCHIVE_PATH) utilisée comme corpus des parseurs",
+    )
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument(
+        "--with-logs", action="store_true", help="Conserver les logs pendant les mesures"
+    )
+    args = parser.parse_args()
+
+    if not args.with_logs:
+        logging.disable(logging.CRITICAL)
+
+    if args.archive:
+        corpus.ARCHIVE_PATH = args.archive
+
+    only = set(args.only or ["parsers", "matching", "e2e"])
+    results = []
+    if "parsers" in only:
+        results += run_parsers(args.iterations)
+    if "matching" in only:
+        results += run_matching(args.iterations)
+    if "e2e" in only and args.cards:
+        results += run_end_to_end(
+            args.cards,
+            args.workers,
+            args.page_latency,
+            args.sheets_latency,
+            args.sheets_quota,
+            args.pipeline,
+            args.storage,
+        )
+    if "page_weight" in only:
+        results += run_page_weight(args.iterations)
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus": corpus_source(),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Résultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
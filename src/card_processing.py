@@ -0,0 +1,315 @@
+from typing import Optional
+
+from config import get_settings
+from models.price_info import PriceInfo, VintedPriceInfo
+from run_context import RunContext
+from scrapers.cardmarket import get_cardmarket_price
+from scrapers.vinted import get_vinted_prices
+from utils.email_notifier import send_price_alert
+from utils.logger import setup_logger
+from utils.metrics import metrics
+from utils.durations import parse_duration
+from utils.scrape_cache import last_checked
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+
+def stale_sources(card, ctx: RunContext) -> list[str]:
+    """Sources dont le dernier relevé est plus vieux que leur TTL"""
+    if ctx.cache is None:
+        return list(ctx.sources)
+
+    sources = []
+    for source in ("cardmarket", "vinted"):
+        if source not in ctx.sources:
+            continue
+        if ctx.cache.is_fresh(source, last_checked(card, source, ctx.cache)):
+            logger.info(f"Prix {source} de {card.name_fr} encore frais, ignoré")
+            continue
+        sources.append(source)
+    return sources
+
+
+def harvested_cardmarket(card, ctx: RunContext) -> bool:
+    """Le prix Cardmarket de la carte a-t-il été relevé sur la liste de son extension ?"""
+    return (
+        ctx.cardmarket_harvest is not None
+        and card.cardmarket_url in ctx.cardmarket_harvest
+    )
+
+
+def reserve_budget(card, ctx: RunContext, sources: list[str]) -> bool:
+    """Réserve dans le budget les pages que la carte va charger"""
+    if ctx.budget is None:
+        return True
+    # Une recherche Vinted parcourt jusqu'à VINTED_MAX_PAGES pages de résultats
+    pages = sum(
+        settings.vinted_max_pages if source == "vinted" else 1
+        for source in sources
+        if (
+            source != "cardmarket"
+            or (card.cardmarket_url and not harvested_cardmarket(card, ctx))
+        )
+        and (source != "vinted" or ctx.vinted_harvest is None)
+    )
+    if not ctx.budget.try_reserve(pages):
+        logger.info(f"Budget épuisé, {card.name_fr} ignorée")
+        metrics.incr("cards_skipped_budget")
+        return False
+    return True
+
+
+def journaled_result(ctx: RunContext, source: str, key: str) -> Optional[dict]:
+    """
+    Résultat obtenu par l'exécution interrompue (--resume), s'il est encore
+    frais pour la durée de validité de la source
+    """
+    if ctx.journal is None:
+        return None
+    ttl = (
+        ctx.cache.ttl(source)
+        if ctx.cache is not None
+        else parse_duration(getattr(settings, f"{source}_ttl"))
+    )
+    return ctx.journal.result(source, key, ttl)
+
+
+def fetch_card_prices(card, ctx: RunContext, sources: list[str]):
+    """
+    Récupère les prix d'une carte sur chaque source
+
+    Les résultats déjà obtenus par une exécution reprise (journal) et ceux
+    encore valides du cache sont réutilisés sans ouvrir de page. Avec un
+    executor, les sources sont interrogées en même temps ; le limiter borne
+    le nombre de pages ouvertes simultanément par domaine.
+    """
+    fetchers = {}
+    if "cardmarket" in sources and harvested_cardmarket(card, ctx):
+        # Prix déjà relevé sur la liste de l'extension
+        fetchers["cardmarket"] = (
+            card.cardmarket_url,
+            PriceInfo,
+            lambda: ctx.cardmarket_harvest[card.cardmarket_url],
+        )
+    elif "cardmarket" in sources and card.cardmarket_url:
+        fetchers["cardmarket"] = (
+            card.cardmarket_url,
+            PriceInfo,
+            lambda: get_cardmarket_price(card.cardmarket_url, ctx.pool),
+        )
+    if "vinted" in sources and ctx.vinted_harvest is not None:
+        # Prix déjà récupérés par la moisson du catalogue
+        fetchers["vinted"] = (
+            card.name_fr,
+            VintedPriceInfo,
+            lambda: ctx.vinted_harvest.get(card.name_fr),
+        )
+    elif "vinted" in sources:
+        fetchers["vinted"] = (
+            card.name_fr,
+            VintedPriceInfo,
+            lambda: get_vinted_prices(card.name_fr, ctx.pool),
+        )
+
+    def run(source):
+        key, model, fetch = fetchers[source]
+        journaled = journaled_result(ctx, source, key)
+        if journaled is not None:
+            logger.debug("Résultat %s repris du journal pour %s", source, key)
+            return model.model_validate(journaled)
+        if ctx.cache is not None:
+            cached = ctx.cache.get(source, key)
+            if cached is not None:
+                logger.debug("Résultat %s en cache pour %s", source, key)
+                metrics.incr("cache_hits", source=source)
+                return model.model_validate(cached)
+            metrics.incr("cache_misses", source=source)
+
+        # Les threads de l'executor n'héritent pas de la carte en cours
+        with metrics.card(card.name_fr), metrics.stage(f"{source}_fetch"):
+            if ctx.limiter is None:
+                result = fetch()
+            else:
+                with ctx.limiter.slot(source):
+                    result = fetch()
+
+        if result is not None:
+            if ctx.cache is not None:
+                ctx.cache.put(source, key, result)
+            if ctx.journal is not None:
+                ctx.journal.record_result(source, key, result)
+        return result
+
+    if ctx.executor is None:
+        results = {source: run(source) for source in fetchers}
+    else:
+        futures = {source: ctx.executor.submit(run, source) for source in fetchers}
+        results = {source: future.result() for source, future in futures.items()}
+
+    return results.get("cardmarket"), results.get("vinted")
+
+
+def write_card_prices(
+    card,
+    ctx: RunContext,
+    sources: list[str],
+    cardmarket_price_info: Optional[PriceInfo],
+    vinted_price_info: Optional[VintedPriceInfo],
+):
+    """Écrit les nouveaux prix d'une carte dans le stockage et l'historique"""
+    if cardmarket_price_info:
+        ctx.store.update_card_prices(
+            card.row, cardmarket_price_info, current_min=card.min_price
+        )
+        if ctx.history is not None:
+            ctx.history.add(
+                card.name_fr, "Cardmarket", cardmarket_price_info.current_price
+            )
+        if settings.history_sheet_mode == "append":
+            ctx.store.log_price_history(
+                card.name_fr, cardmarket_price_info.current_price, "Cardmarket"
+            )
+
+    if "vinted" in sources:
+        if not vinted_price_info:
+            # Si on n'a pas de prix Vinted, on ne peut pas mettre à jour
+            logger.warning(
+                f"Pas de prix Vinted disponible pour {card.name_fr}, impossible de mettre à jour"
+            )
+            return
+
+        ctx.store.update_vinted_price(card.row, vinted_price_info)
+        if ctx.history is not None:
+            ctx.history.add(
+                card.name_fr,
+                "Vinted",
+                vinted_price_info.min_price,
+                vinted_price_info.url,
+            )
+
+
+def price_alert(
+    card,
+    sources: list[str],
+    cardmarket_price_info: Optional[PriceInfo],
+    vinted_price_info: Optional[VintedPriceInfo],
+) -> Optional[dict]:
+    """
+    Paramètres de l'alerte à envoyer pour la carte, ou None
+
+    L'alerte s'appuie toujours sur le prix Cardmarket le plus récent et
+    n'est envoyée qu'une fois par annonce Vinted.
+    """
+    if "vinted" not in sources or not vinted_price_info:
+        return None
+
+    latest_cardmarket_price = card.current_price
+    if cardmarket_price_info:
+        latest_cardmarket_price = cardmarket_price_info.current_price
+    if not latest_cardmarket_price:
+        return None
+
+    vinted_price = vinted_price_info.min_price
+    price_diff = latest_cardmarket_price - vinted_price
+
+    # Si le prix Vinted est inférieur avec une différence minimale
+    if (
+        price_diff > 0
+        and (price_diff / latest_cardmarket_price * 100)
+        >= settings.min_price_diff_percent
+        and card.vinted_url != vinted_price_info.url
+    ):
+        return {
+            "card_name": card.name_fr,
+            "cardmarket_price": latest_cardmarket_price,
+            "vinted_price": vinted_price,
+            "vinted_url": vinted_price_info.url,
+            "difference": price_diff,
+        }
+    return None
+
+
+def notify_alert(ctx: RunContext, alert: dict):
+    """
+    Signale une alerte de prix et l'enregistre dans l'historique
+
+    Avec une file d'envoi (AlertOutbox), l'alerte y est déposée sans attendre
+    le serveur SMTP. Une annonce déjà signalée (journal) n'est pas signalée
+    une seconde fois, même si son URL n'avait pas encore été écrite dans le
+    sheet.
+    """
+    card_name, url = alert["card_name"], alert["vinted_url"]
+    if ctx.outbox is not None:
+        if not ctx.outbox.put(alert):
+            logger.info(f"Alerte déjà envoyée pour {card_name} ({url}), ignorée")
+            return
+    else:
+        if ctx.journal is not None and ctx.journal.alert_sent(card_name, url):
+            logger.info(f"Alerte déjà envoyée pour {card_name} ({url}), ignorée")
+            return
+        if send_price_alert(**alert) and ctx.journal is not None:
+            ctx.journal.record_alert(card_name, url)
+
+    metrics.incr("alerts_triggered")
+    if ctx.history is not None:
+        ctx.history.record_alert(card_name, url)
+
+
+def refreshed_card(
+    card,
+    cardmarket_price_info: Optional[PriceInfo],
+    vinted_price_info: Optional[VintedPriceInfo],
+):
+    """Copie de la carte avec les prix relevés, tels qu'écrits dans le stockage"""
+    update = {}
+    if cardmarket_price_info:
+        current_price = cardmarket_price_info.current_price
+        update.update(
+            current_price=current_price,
+            trend_price=cardmarket_price_info.trend_price,
+            avg_30_days=cardmarket_price_info.avg_30_days,
+            min_price=min(card.min_price, current_price)
+            if card.min_price
+            else current_price,
+            last_update=cardmarket_price_info.last_update,
+        )
+    if vinted_price_info:
+        update.update(
+            vinted_url=vinted_price_info.url,
+            vinted_last_update=vinted_price_info.last_update,
+        )
+    return card.model_copy(update=update) if update else card
+
+
+def process_card(card, ctx: RunContext):
+    """
+    Traite une carte individuelle en mesurant sa durée
+
+    Retourne les prix relevés (Cardmarket, Vinted), None pour une source
+    non relevée.
+    """
+    with metrics.card(card.name_fr), metrics.stage("card_total"):
+        results = _process_card(card, ctx)
+    metrics.incr("cards_processed")
+    return results
+
+
+def _process_card(card, ctx: RunContext):
+    logger.info(f"\nTraitement de : {card.name_fr}")
+
+    sources = stale_sources(card, ctx)
+    if not reserve_budget(card, ctx, sources):
+        return None, None
+
+    # Les deux sources sont récupérées avant toute comparaison : l'alerte
+    # Vinted s'appuie toujours sur le prix Cardmarket le plus récent
+    cardmarket_price_info, vinted_price_info = fetch_card_prices(card, ctx, sources)
+    write_card_prices(card, ctx, sources, cardmarket_price_info, vinted_price_info)
+
+    alert = price_alert(card, sources, cardmarket_price_info, vinted_price_info)
+    if alert is not None:
+        notify_alert(ctx, alert)
+    if ctx.journal is not None:
+        ctx.journal.record_done(card)
+    return cardmarket_price_info, vinted_price_info
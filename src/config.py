@@ -6,11 +6,23 @@ from functools import lru_cache
 class Settings(BaseSettings):
     """Configuration globale de l'application"""
 
-    google_sheets_url: str
+    # Obligatoire avec le stockage "sheets" et pour l'import ou la
+    # publication d'un stockage local
+    google_sheets_url: str = ""
     google_sheets_credentials_file: str = "service-account.json"
     sheet_name: str = "data"
     history_sheet_name: str = "Historique"
-    log_level: str = "DEBUG"
+    # Historique local SQLite ; l'onglet du sheet reçoit chaque relevé
+    # ("append"), un résumé par jour ("daily") ou rien ("off")
+    history_db_path: str = "data/price_history.db"
+    history_sheet_mode: str = "append"
+    log_level: str = "INFO"
+    # Dossier du fichier lorcana_price.log (relatif au dossier de lancement)
+    log_dir: str = "logs"
+    # Messages DEBUG identiques : au plus LOG_RATE_LIMIT par fenêtre de
+    # LOG_RATE_WINDOW secondes (0 pour ne pas limiter)
+    log_rate_limit: int = 20
+    log_rate_window: float = 10.0
 
     # SMTP Configuration
     smtp_server: str = os.getenv("SMTP_SERVER", "smtp.gmail.com")
@@ -19,10 +31,134 @@ class Settings(BaseSettings):
     smtp_password: str = os.getenv("SMTP_PASSWORD", "")
     smtp_from_email: str = os.getenv("SMTP_FROM_EMAIL", "")
     notification_email: str = os.getenv("NOTIFICATION_EMAIL", "")
+    # "ssl", "starttls" ou "none" (serveur SMTP local de test)
+    smtp_security: str = "ssl"
+
+    # Alertes : "immediate" (un email par alerte) ou "digest" (un récapitulatif
+    # par exécution, ou toutes les ALERT_DIGEST_INTERVAL si non nul)
+    alert_mode: str = "immediate"
+    alert_digest_interval: str = "0"
 
     # Prix minimum de différence pour envoyer une alerte (en %)
     min_price_diff_percent: float = float(os.getenv("MIN_PRICE_DIFF_PERCENT", "10"))
 
+    # Pool de navigateurs
+    browser_pool_size: int = 2
+    browser_max_pages: int = 50
+    # Chargement des pages : "normal", "eager" (HTML analysé, sans attendre
+    # les ressources) ou "none" (rend la main immédiatement ; les scrapers
+    # attendent ensuite l'élément dont ils ont besoin)
+    browser_page_load_strategy: str = "none"
+    # Ressources bloquées : "lean" (images, polices, CSS, médias, traceurs)
+    # ou "off" ; les allowlists (catégories ou motifs séparés par des
+    # virgules) sont propres à chaque site
+    browser_block_profile: str = "lean"
+    cardmarket_block_allowlist: str = ""
+    vinted_block_allowlist: str = ""
+
+    # Listes d'extensions Cardmarket (--cardmarket-mode listing) : pages
+    # parcourues par extension, cartes par page, noms d'extension dans les
+    # URL si besoin ("1:The-First-Chapter,2:Rise-of-the-Floodborn", sinon
+    # déduits des URL des cartes) et période en jours du passage par la page
+    # produit pour rafraîchir tendance et moyenne 30 jours (0 : seulement si
+    # elles manquent)
+    cardmarket_listing_max_pages: int = 20
+    cardmarket_listing_per_page: int = 50
+    cardmarket_set_slugs: str = ""
+    cardmarket_product_refresh_days: int = 7
+
+    # Pages ouvertes simultanément par domaine en mode --workers
+    cardmarket_max_concurrency: int = 2
+    vinted_max_concurrency: int = 2
+
+    # Vinted : "browser" utilise toujours le navigateur, "http" interroge
+    # l'API du catalogue et ne lance le navigateur qu'en cas de blocage (pas
+    # encore vérifié sur le vrai site)
+    vinted_fetch_mode: str = "browser"
+    vinted_base_url: str = "https://www.vinted.fr"
+    # Recherche d'une carte : annonces les moins chères conservées et nombre
+    # maximal de pages de résultats parcourues
+    vinted_top_k: int = 5
+    vinted_max_pages: int = 3
+    # Parcourir toutes les pages (jusqu'à vinted_max_pages) au lieu de
+    # s'arrêter aux top_k annonces les moins chères : le nombre d'annonces,
+    # la médiane et le premier quartile portent alors sur tous les résultats
+    vinted_full_stats: bool = False
+
+    # Moisson du catalogue Vinted (--vinted-mode harvest)
+    vinted_harvest_max_pages: int = 50
+    vinted_harvest_order: str = "newest_first"
+    vinted_harvest_state_path: str = ".cache/vinted_harvest.json"
+    vinted_harvest_listing_max_age: str = "3d"
+
+    # Analyse HTML : "lxml" (rapide, repli automatique) ou "bs4"
+    html_parser_backend: str = "lxml"
+    # Extraction des pages ouvertes dans le navigateur : "source" (HTML
+    # complet analysé en Python) ou "script" (champs utiles lus dans la page,
+    # HTML complet en repli ; pas encore vérifié sur les vrais sites)
+    browser_extraction: str = "source"
+
+    # Cache de scraping : durée de validité des prix par source
+    cardmarket_ttl: str = "6h"
+    vinted_ttl: str = "30m"
+    scrape_cache_path: str = ".cache/scrape_cache.json"
+    scrape_cache_max_entries: int = 10000
+
+    # Stockage des cartes et des prix : "sheets" (Google Sheet), "sqlite",
+    # "csv" ou "parquet" (fichier STORAGE_PATH, data/cards.<format> par
+    # défaut) ; écritures locales par lots de STORAGE_FLUSH_ROWS lignes ou
+    # toutes les STORAGE_FLUSH_SECONDS secondes
+    storage_backend: str = "sheets"
+    storage_path: str = ""
+    storage_flush_rows: int = 1000
+    storage_flush_seconds: float = 30
+    # Publication d'un stockage local dans le sheet : en fin d'exécution si
+    # la précédente date de plus de STORAGE_SYNC_INTERVAL ("0" : seulement
+    # avec --sync-sheet), par batchUpdate de STORAGE_SYNC_BATCH plages
+    storage_sync_interval: str = "0"
+    storage_sync_batch: int = 5000
+    storage_sync_state_path: str = ".cache/storage_sync.json"
+
+    # Écritures groupées dans le Google Sheet
+    sheets_flush_rows: int = 200
+    sheets_flush_seconds: float = 60
+    # Seules les cellules modifiées sont écrites ; la date de mise à jour
+    # l'est si un prix a changé ("changed") ou à chaque relevé ("always").
+    # Avec "changed", la fraîcheur des prix (TTL, priorités, démon) se fonde
+    # sur la date des relevés mémorisée dans le cache de scraping
+    sheet_timestamp_policy: str = "changed"
+
+    # Journal d'exécution (reprise avec --resume) et durée de conservation
+    # des alertes envoyées, pour ne pas alerter deux fois sur une annonce
+    journal_path: str = ".cache/run_journal.jsonl"
+    journal_alert_retention: str = "30d"
+
+    # Archive des pages chargées (rejouée par --replay) : dossier (vide pour
+    # désactiver), niveau de compression zstd, taille des segments et durée
+    # de conservation
+    page_archive_path: str = "data/page_archive"
+    page_archive_level: int = 3
+    page_archive_segment_mb: int = 64
+    page_archive_retention: str = "14d"
+
+    # Pipeline asynchrone (--pipeline) : processus de parsing (0 = un par
+    # cœur) et taille des files entre les étapes
+    pipeline_parse_workers: int = 0
+    pipeline_queue_size: int = 32
+
+    # Suivi continu (--daemon) : vérification des modifications du sheet,
+    # tour de mesures (envoi des écritures, journal, export des mesures) et
+    # serveur d'état HTTP local (port 0 pour désactiver)
+    daemon_sheet_poll: str = "2m"
+    daemon_checkpoint: str = "15m"
+    daemon_http_host: str = "127.0.0.1"
+    daemon_http_port: int = 8787
+
+    # Mesures de l'exécution (durées par étape, compteurs) : fichiers écrits
+    # en fin d'exécution, vides pour désactiver
+    metrics_json_path: str = ""
+    metrics_prom_path: str = ""
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,390 @@
+import heapq
+import json
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+from card_processing import process_card, refreshed_card
+from config import get_settings
+from models.card import Card
+from run_context import RunContext
+from utils.durations import parse_duration
+from utils.logger import setup_logger
+from utils.metrics import PROMETHEUS_PREFIX, metrics
+from utils.page_archive import archive_page
+from utils.scrape_cache import ScrapeCache, last_checked
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+# Durée minimale d'un cycle complet, pour ne pas boucler sur des TTL nuls
+MIN_CYCLE_SECONDS = 60
+
+
+def _timestamp(when) -> float:
+    return when.timestamp() if when is not None else 0.0
+
+
+class CardSchedule:
+    """
+    Échéancier des cartes suivies par le démon
+
+    Une carte est due quand le prix de l'une de ses sources dépasse son TTL.
+    Les cartes dues sont libérées une à une, espacées de `pace` secondes
+    (durée du cycle divisée par le nombre de cartes) : les relevés sont
+    étalés au lieu d'être faits tous en même temps, y compris au démarrage
+    quand toutes les cartes sont en retard. Une carte traitée n'est pas
+    reprise avant `cycle` secondes, même si l'une de ses sources a échoué.
+    """
+
+    def __init__(
+        self, ttls: dict[str, float], cycle: float, cache: Optional[ScrapeCache] = None
+    ):
+        self.ttls = ttls
+        self.cycle = cycle
+        self.cache = cache
+        self.pace = cycle
+        self._cards: dict[int, Card] = {}
+        self._heap: list[tuple[float, int]] = []
+        self._in_flight: set[int] = set()
+        self._next_release = 0.0
+        self._lock = threading.Lock()
+
+    def due_at(self, card: Card) -> float:
+        """Date à laquelle l'une des sources de la carte n'est plus fraîche"""
+        return min(
+            _timestamp(last_checked(card, source, self.cache)) + ttl
+            for source, ttl in self.ttls.items()
+        )
+
+    def load(self, cards: list[Card]):
+        """Remplace la liste des cartes (cartes en cours de traitement comprises)"""
+        with self._lock:
+            self._cards = {card.row: card for card in cards}
+            self._heap = [
+                (self.due_at(card), card.row)
+                for card in cards
+                if card.row not in self._in_flight
+            ]
+            heapq.heapify(self._heap)
+            self.pace = self.cycle / max(1, len(cards))
+
+    def next_card(self, now: float) -> tuple[Optional[Card], float]:
+        """Prochaine carte à traiter, ou None et le délai avant la suivante"""
+        with self._lock:
+            while self._heap:
+                due, row = self._heap[0]
+                if row not in self._cards or row in self._in_flight:
+                    # Carte retirée du sheet depuis sa mise en file
+                    heapq.heappop(self._heap)
+                    continue
+                wait = max(due, self._next_release) - now
+                if wait > 0:
+                    return None, wait
+                heapq.heappop(self._heap)
+                self._in_flight.add(row)
+                self._next_release = max(self._next_release, now) + self.pace
+                return self._cards[row], 0.0
+            return None, self.cycle
+
+    def done(self, card: Card, now: float):
+        """Remet en file une carte traitée, avec ses nouvelles dates de mise à jour"""
+        with self._lock:
+            self._in_flight.discard(card.row)
+            current = self._cards.get(card.row)
+            if current is None or current.name_fr != card.name_fr:
+                # Ligne retirée ou remplacée pendant le traitement
+                return
+            self._cards[card.row] = card
+            heapq.heappush(
+                self._heap, (max(self.due_at(card), now + self.cycle), card.row)
+            )
+
+    @property
+    def cards(self) -> list[Card]:
+        with self._lock:
+            return list(self._cards.values())
+
+    def status(self, now: float) -> dict:
+        """Taille de la file : cartes suivies, dues, en cours, prochaine échéance"""
+        with self._lock:
+            pending = [due for due, row in self._heap if row in self._cards]
+            return {
+                "cards": len(self._cards),
+                "due": sum(1 for due in pending if due <= now),
+                "in_flight": len(self._in_flight),
+                "next_due_in_s": round(max(0.0, min(pending) - now), 1)
+                if pending
+                else None,
+                "pace_s": round(self.pace, 3),
+            }
+
+
+def daemon_ttls(ctx: RunContext) -> dict[str, float]:
+    """
+    TTL en secondes des sources suivies
+
+    Lève ValueError sans source, sans cache ou avec un TTL nul : les cartes
+    seraient relevées en continu, un cycle toutes les MIN_CYCLE_SECONDS.
+    """
+    if not ctx.sources:
+        raise ValueError("aucune source à suivre")
+    if ctx.cache is None:
+        raise ValueError("le suivi continu a besoin du cache de scraping")
+    ttls = {source: ctx.cache.ttl(source).total_seconds() for source in ctx.sources}
+    zero = [source for source, ttl in ttls.items() if ttl <= 0]
+    if zero:
+        raise ValueError(f"TTL nul pour {', '.join(zero)}, suivi continu impossible")
+    return ttls
+
+
+class PriceDaemon:
+    """
+    Suivi continu des prix (--daemon)
+
+    Service Google Sheets, navigateurs, cache, journal et liste des cartes
+    restent ouverts d'un relevé à l'autre ; les cartes sont relevées au fil
+    de leur échéance (CardSchedule) par `workers` threads. L'empreinte du
+    stockage est vérifiée tous les DAEMON_SHEET_POLL et la liste des cartes
+    n'est relue que si elle a changé. Tous les DAEMON_CHECKPOINT, les
+    écritures sont envoyées, le journal et les mesures sont clos
+    (`checkpoint`) puis un nouveau tour commence.
+    """
+
+    def __init__(
+        self,
+        cards: list[Card],
+        ctx: RunContext,
+        workers: int,
+        sheet_name: str,
+        checkpoint: Callable[[], None],
+    ):
+        self.ctx = ctx
+        self.workers = max(1, workers)
+        self.sheet_name = sheet_name
+        self.checkpoint = checkpoint
+        ttls = daemon_ttls(ctx)
+        cycle = max(min(ttls.values()), MIN_CYCLE_SECONDS)
+        self.schedule = CardSchedule(ttls, cycle, ctx.cache)
+        self.schedule.load(cards)
+        self.poll_interval = parse_duration(settings.daemon_sheet_poll).total_seconds()
+        self.checkpoint_interval = parse_duration(
+            settings.daemon_checkpoint
+        ).total_seconds()
+        self.started_at = time.time()
+        self.last_card_at: Optional[float] = None
+        self.last_reload_at = self.started_at
+        self.last_checkpoint_at: Optional[float] = None
+        self.last_metrics: Optional[dict] = None
+        self.last_prometheus = ""
+        self._fingerprint = self._read_fingerprint()
+        self._slots = threading.Semaphore(self.workers)
+        self._stop = threading.Event()
+
+    def _read_fingerprint(self) -> Optional[str]:
+        try:
+            return self.ctx.store.fingerprint()
+        except Exception as e:
+            logger.warning(f"Impossible de vérifier les modifications du sheet : {e}")
+            return None
+
+    def reload_if_changed(self):
+        """Relit les cartes si le stockage a été modifié en dehors du suivi"""
+        fingerprint = self._read_fingerprint()
+        if fingerprint is None or fingerprint == self._fingerprint:
+            return
+        # Écritures en attente envoyées avant de relire les lignes
+        self.ctx.store.flush()
+        cards = self.ctx.store.get_cards()
+        if not cards:
+            logger.warning("Aucune carte relue, liste précédente conservée")
+            return
+        self._fingerprint = fingerprint
+        self.schedule.load(cards)
+        self.last_reload_at = time.time()
+        metrics.incr("daemon_reloads")
+        logger.info(f"Sheet modifié : {len(cards)} cartes relues")
+
+    def _checkpoint(self):
+        # Cartes en cours terminées d'abord : aucune écriture pendant que le
+        # journal est recommencé
+        for _ in range(self.workers):
+            self._slots.acquire()
+        try:
+            self.checkpoint()
+            self.last_metrics = metrics.to_dict()
+            self.last_prometheus = metrics.to_prometheus()
+            self.last_checkpoint_at = time.time()
+            metrics.reset()
+        finally:
+            for _ in range(self.workers):
+                self._slots.release()
+        # Le nouveau segment d'archive reçoit la liste des cartes (--replay)
+        archive_page(
+            "sheet",
+            "sheet_cards",
+            self.sheet_name,
+            [card.model_dump(mode="json") for card in self.schedule.cards],
+        )
+
+    def _process(self, card: Card, ctx: RunContext):
+        try:
+            cardmarket_price_info, vinted_price_info = process_card(card, ctx)
+            card = refreshed_card(card, cardmarket_price_info, vinted_price_info)
+        except Exception as e:
+            logger.error(f"Erreur lors du traitement de {card.name_fr} : {e}")
+        finally:
+            self.last_card_at = time.time()
+            self.schedule.done(card, self.last_card_at)
+            self._slots.release()
+
+    def stop(self, *args):
+        """Demande l'arrêt : les cartes en cours sont terminées, puis tout est envoyé"""
+        if not self._stop.is_set():
+            logger.info("Arrêt du démon demandé")
+        self._stop.set()
+
+    def run(self):
+        logger.info(
+            f"Démon démarré : {len(self.schedule.cards)} cartes, une toutes les "
+            f"{self.schedule.pace:.1f} s au plus"
+        )
+        next_poll = time.time() + self.poll_interval
+        next_checkpoint = time.time() + self.checkpoint_interval
+        source_workers = settings.cardmarket_max_concurrency + settings.vinted_max_concurrency
+        with ThreadPoolExecutor(
+            max_workers=source_workers, thread_name_prefix="source"
+        ) as source_executor, ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="card"
+        ) as card_executor:
+            card_ctx = replace(self.ctx, executor=source_executor) if self.workers > 1 else self.ctx
+            while not self._stop.is_set():
+                now = time.time()
+                if self.poll_interval and now >= next_poll:
+                    self.reload_if_changed()
+                    next_poll = now + self.poll_interval
+                if now >= next_checkpoint:
+                    self._checkpoint()
+                    next_checkpoint = now + self.checkpoint_interval
+
+                card, wait = self.schedule.next_card(now)
+                if card is None:
+                    wake = min(next_checkpoint, next_poll if self.poll_interval else next_checkpoint)
+                    self._stop.wait(max(0.0, min(wait, wake - now)))
+                    continue
+                while not self._slots.acquire(timeout=1):
+                    if self._stop.is_set():
+                        self.schedule.done(card, time.time())
+                        break
+                else:
+                    card_executor.submit(self._process, card, card_ctx)
+        logger.info("Démon arrêté")
+
+    def status(self) -> dict:
+        now = time.time()
+        return {
+            "status": "stopping" if self._stop.is_set() else "ok",
+            "uptime_s": round(now - self.started_at, 1),
+            "last_card_at": self.last_card_at,
+            "last_reload_at": self.last_reload_at,
+            "last_checkpoint_at": self.last_checkpoint_at,
+            "browsers_launched": self.ctx.pool.launched if self.ctx.pool else 0,
+            "queue": self.schedule.status(now),
+        }
+
+    def prometheus(self) -> str:
+        """Mesures du dernier tour terminé et état de la file, au format Prometheus"""
+        queue = self.schedule.status(time.time())
+        lines = [f"# TYPE {PROMETHEUS_PREFIX}_daemon_queue gauge"]
+        for state in ("cards", "due", "in_flight"):
+            lines.append(f'{PROMETHEUS_PREFIX}_daemon_queue{{state="{state}"}} {queue[state]}')
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_daemon_uptime_seconds gauge")
+        lines.append(
+            f"{PROMETHEUS_PREFIX}_daemon_uptime_seconds {time.time() - self.started_at:.0f}"
+        )
+        return self.last_prometheus + "\n".join(lines) + "\n"
+
+
+def _status_handler(daemon: PriceDaemon):
+    class StatusHandler(BaseHTTPRequestHandler):
+        """/health, /queue, /metrics (Prometheus) et /metrics.json"""
+
+        def do_GET(self):
+            if self.path == "/health":
+                status = daemon.status()
+                self._reply(200 if status["status"] == "ok" else 503, status)
+            elif self.path == "/queue":
+                self._reply(200, daemon.schedule.status(time.time()))
+            elif self.path == "/metrics":
+                self._reply(200, daemon.prometheus(), "text/plain; version=0.0.4")
+            elif self.path == "/metrics.json":
+                self._reply(200, daemon.last_metrics or metrics.to_dict())
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def _reply(self, code: int, body, content_type: str = "application/json"):
+            if not isinstance(body, str):
+                body = json.dumps(body, ensure_ascii=False)
+            data = body.encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", f"{content_type}; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            logger.debug("HTTP %s", format % args)
+
+    return StatusHandler
+
+
+def start_status_server(daemon: PriceDaemon, host: str, port: int) -> ThreadingHTTPServer:
+    """Sert l'état du démon en HTTP dans un thread dédié"""
+    server = ThreadingHTTPServer((host, port), _status_handler(daemon))
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name="daemon-http", daemon=True
+    ).start()
+    logger.info(f"État du démon sur http://{host}:{server.server_address[1]}/health")
+    return server
+
+
+def run_daemon(
+    cards: list[Card],
+    ctx: RunContext,
+    workers: int,
+    sheet_name: str,
+    checkpoint: Callable[[], None],
+):
+    """
+    Lance le suivi continu jusqu'à SIGINT ou SIGTERM
+
+    Le dernier tour est clos par `checkpoint` par l'appelant, une fois les
+    ressources fermées dans l'ordre habituel.
+    """
+    daemon = PriceDaemon(cards, ctx, workers, sheet_name, checkpoint)
+    server = None
+    if settings.daemon_http_port:
+        try:
+            server = start_status_server(
+                daemon, settings.daemon_http_host, settings.daemon_http_port
+            )
+        except OSError as e:
+            logger.error(f"Impossible de démarrer le serveur d'état : {e}")
+
+    previous = {
+        signum: signal.signal(signum, daemon.stop)
+        for signum in (signal.SIGINT, signal.SIGTERM)
+    }
+    try:
+        daemon.run()
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+        if server is not None:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import Optional
+
+from history_store import PriceHistoryStore
+
+# Sources telles qu'enregistrées dans l'historique par card_processing
+SOURCES = ("Cardmarket", "Vinted")
+
+
+def stats_table(
+    history: PriceHistoryStore, card: str, days: int = 30, sources=SOURCES
+) -> str:
+    """Prix min, moyen et max d'une carte sur N jours, une ligne par source"""
+    lines = [
+        f"Prix de {card} sur {days} jours",
+        f"{'source':<12} {'min':>8} {'moyen':>8} {'max':>8} {'relevés':>8}",
+    ]
+    for source in sources:
+        stats = history.price_stats(card, source, days)
+        if stats is None:
+            lines.append(f"{source:<12} {'aucun relevé':>35}")
+            continue
+        lines.append(
+            f"{source:<12} {stats['min']:>8.2f} {stats['avg']:>8.2f} "
+            f"{stats['max']:>8.2f} {stats['count']:>8}"
+        )
+    return "\n".join(lines)
+
+
+def drops_table(
+    history: PriceHistoryStore, since: Optional[datetime] = None, sources=SOURCES
+) -> str:
+    """Cartes dont le prix a baissé depuis `since` (défaut : minuit), par source"""
+    lines = []
+    for source in sources:
+        drops = history.price_drops(source, since)
+        lines.append(f"Baisses de prix {source} : {len(drops)}")
+        for drop in drops:
+            lines.append(
+                f"  {drop['card']} : {drop['previous_price']:.2f}€ -> "
+                f"{drop['price']:.2f}€"
+            )
+    return "\n".join(lines)
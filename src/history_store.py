@@ -0,0 +1,285 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+import pytz
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_history (
+    card TEXT NOT NULL,
+    source TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    price REAL NOT NULL,
+    url TEXT,
+    PRIMARY KEY (card, source, ts, price)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_price_history_source_ts
+    ON price_history (source, ts);
+CREATE TABLE IF NOT EXISTS alerts (
+    card TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    url TEXT,
+    PRIMARY KEY (card, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sheet_exports (
+    day TEXT PRIMARY KEY
+);
+"""
+
+
+class PriceHistoryStore:
+    """
+    Historique des prix dans une base SQLite locale (mode WAL)
+
+    Les insertions sont mises en attente et écrites par lots (executemany) ;
+    les requêtes s'appuient sur la clé (card, source, ts, price) et l'index
+    (source, ts). Un même relevé enregistré deux fois (rejeu du journal) n'est
+    gardé qu'une fois ; deux prix différents relevés dans la même seconde
+    sont gardés tous les deux.
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 500):
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._pending: list[tuple] = []
+
+    def _migrate(self):
+        """
+        Ajoute le prix à la clé d'une base créée avec la clé (card, source,
+        ts), qui remplaçait un relevé par le suivant dans la même seconde
+        """
+        key = [
+            row[1]
+            for row in sorted(
+                self._conn.execute("PRAGMA table_info(price_history)"),
+                key=lambda row: row[5],
+            )
+            if row[5]
+        ]
+        if not key or "price" in key:
+            return
+        with self._conn:
+            self._conn.execute("ALTER TABLE price_history RENAME TO price_history_old")
+            self._conn.execute("DROP INDEX IF EXISTS idx_price_history_source_ts")
+            self._conn.executescript(SCHEMA)
+            self._conn.execute(
+                "INSERT INTO price_history SELECT card, source, ts, price, url "
+                "FROM price_history_old"
+            )
+            self._conn.execute("DROP TABLE price_history_old")
+        logger.info("Base d'historique migrée : le prix fait partie de la clé")
+
+    def add(
+        self,
+        card: str,
+        source: str,
+        price: float,
+        url: Optional[str] = None,
+        when: Optional[datetime] = None,
+    ):
+        """Met en attente un point d'historique"""
+        when = when or datetime.now(pytz.utc)
+        with self._lock:
+            self._pending.append((card, source, int(when.timestamp()), price, url))
+            should_flush = len(self._pending) >= self.batch_size
+        if should_flush:
+            self.flush()
+
+    def add_many(self, rows: Iterable[tuple]):
+        """Insère directement des lignes (card, source, ts, price, url)"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO price_history VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def flush(self):
+        """Écrit les points en attente"""
+        with self._lock:
+            rows, self._pending = self._pending, []
+        if rows:
+            self.add_many(rows)
+            logger.debug(f"{len(rows)} points d'historique enregistrés")
+
+    def price_stats(self, card: str, source: str, days: int = 30) -> Optional[dict]:
+        """Prix min, moyen, max et nombre de relevés d'une carte sur N jours"""
+        since = int((datetime.now(pytz.utc) - timedelta(days=days)).timestamp())
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT MIN(price), AVG(price), MAX(price), COUNT(*)
+                FROM price_history
+                WHERE card = ? AND source = ? AND ts >= ?
+                """,
+                (card, source, since),
+            ).fetchone()
+        if not row or not row[3]:
+            return None
+        return {"min": row[0], "avg": row[1], "max": row[2], "count": row[3]}
+
+    def price_drops(self, source: str, since: Optional[datetime] = None) -> list[dict]:
+        """
+        Cartes dont le dernier prix depuis `since` (défaut : minuit, heure de
+        Paris) est inférieur au dernier prix relevé avant
+
+        Quand plusieurs prix ont été relevés dans la même seconde, le plus bas
+        est retenu.
+        """
+        if since is None:
+            paris_tz = pytz.timezone("Europe/Paris")
+            since = datetime.now(paris_tz).replace(
+                hour=0, minute=0, second=0, microsecond=0
+            )
+        since_ts = int(since.timestamp())
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                WITH latest AS (
+                    SELECT card, MAX(ts) AS ts
+                    FROM price_history
+                    WHERE source = ? AND ts >= ?
+                    GROUP BY card
+                )
+                SELECT l.card,
+                    (SELECT MIN(p.price) FROM price_history p
+                     WHERE p.card = l.card AND p.source = ? AND p.ts = l.ts) AS price,
+                    (SELECT b.price FROM price_history b
+                     WHERE b.card = l.card AND b.source = ? AND b.ts < ?
+                     ORDER BY b.ts DESC, b.price LIMIT 1) AS previous
+                FROM latest l
+                ORDER BY l.card
+                """,
+                (source, since_ts, source, source, since_ts),
+            ).fetchall()
+        return [
+            {"card": card, "price": price, "previous_price": previous}
+            for card, price, previous in rows
+            if previous is not None and price < previous
+        ]
+
+    def card_stats(self, days: int = 30) -> dict[tuple[str, str], dict]:
+        """
+        Statistiques de toutes les cartes sur N jours, par (carte, source) :
+        moyenne, écart-type et nombre de relevés
+        """
+        since = int((datetime.now(pytz.utc) - timedelta(days=days)).timestamp())
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT card, source, AVG(price), AVG(price * price), COUNT(*)
+                FROM price_history
+                WHERE ts >= ?
+                GROUP BY card, source
+                """,
+                (since,),
+            ).fetchall()
+        stats = {}
+        for card, source, mean, mean_sq, count in rows:
+            variance = max(mean_sq - mean * mean, 0.0)
+            stats[(card, source)] = {
+                "mean": mean,
+                "std": variance**0.5,
+                "count": count,
+            }
+        return stats
+
+    def record_alert(self, card: str, url: Optional[str] = None):
+        """Mémorise une alerte envoyée pour une carte"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO alerts VALUES (?, ?, ?)",
+                (card, int(datetime.now(pytz.utc).timestamp()), url),
+            )
+            self._conn.commit()
+
+    def alert_counts(self, days: int = 30) -> dict[str, int]:
+        """Nombre d'alertes envoyées par carte sur N jours"""
+        since = int((datetime.now(pytz.utc) - timedelta(days=days)).timestamp())
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT card, COUNT(*) FROM alerts WHERE ts >= ? GROUP BY card",
+                (since,),
+            ).fetchall()
+        return dict(rows)
+
+    def daily_summary(self, day: str) -> list[list]:
+        """Une ligne par carte et source pour un jour (AAAA-MM-JJ, heure de Paris)"""
+        paris_tz = pytz.timezone("Europe/Paris")
+        start = paris_tz.localize(datetime.strptime(day, "%Y-%m-%d"))
+        end = start + timedelta(days=1)
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT card, source, MIN(price), AVG(price), MAX(price), COUNT(*)
+                FROM price_history
+                WHERE ts >= ? AND ts < ?
+                GROUP BY card, source
+                ORDER BY card, source
+                """,
+                (int(start.timestamp()), int(end.timestamp())),
+            ).fetchall()
+        display_day = start.strftime("%d/%m/%Y")
+        return [
+            [card, display_day, round(avg, 2), source, min_p, max_p, count]
+            for card, source, min_p, avg, max_p, count in rows
+        ]
+
+    def pending_export_days(self) -> list[str]:
+        """Jours terminés qui n'ont pas encore été exportés vers le sheet"""
+        paris_tz = pytz.timezone("Europe/Paris")
+        today = datetime.now(paris_tz).strftime("%Y-%m-%d")
+        with self._lock:
+            timestamps = self._conn.execute(
+                "SELECT MIN(ts) FROM price_history"
+            ).fetchone()[0]
+            exported = {
+                row[0] for row in self._conn.execute("SELECT day FROM sheet_exports")
+            }
+        if timestamps is None:
+            return []
+
+        days = []
+        day = datetime.fromtimestamp(timestamps, paris_tz).date()
+        last_exported = max(exported) if exported else None
+        while day.strftime("%Y-%m-%d") < today:
+            key = day.strftime("%Y-%m-%d")
+            if key not in exported and (last_exported is None or key > last_exported):
+                days.append(key)
+            day += timedelta(days=1)
+        return days
+
+    def mark_exported(self, day: str):
+        """Mémorise qu'un jour a été exporté vers le sheet"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO sheet_exports (day) VALUES (?)", (day,)
+            )
+            self._conn.commit()
+
+    def close(self):
+        """Écrit les points en attente et ferme la base"""
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "PriceHistoryStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
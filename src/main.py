@@ -1,92 +1,328 @@
 import argparse
-from scrapers.cardmarket import get_cardmarket_price
-from scrapers.vinted import get_vinted_prices
+import time
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import replace
+from scrapers.browser_pool import BrowserPool
 from dotenv import load_dotenv
 from sheets import (
-    get_cards_to_track,
     get_google_sheets_service,
     get_sheet_id,
-    update_card_prices,
-    update_vinted_price,
-    log_price_history,
+    export_history_summary,
 )
-from utils.logger import setup_logger
+from storage.backends import (
+    BACKENDS,
+    check_backend,
+    import_from_sheet,
+    open_store,
+    sync_due,
+    sync_to_sheet,
+)
+from storage.local_store import LocalCardStore
+from history_store import PriceHistoryStore
+from scheduler import RunBudget, prioritize_cards
+from card_processing import process_card
+from run_context import RunContext
+from run_journal import RunJournal
+from utils.logger import set_log_level, setup_logger
 from config import get_settings
-from utils.email_notifier import send_price_alert
+from utils.concurrency import DomainLimiter
+from utils.durations import parse_duration
+from utils.scrape_cache import ScrapeCache, last_checked
+from utils.startup_profile import startup_report
+from utils.metrics import metrics
+from utils.page_archive import PageArchive
+from utils.alert_outbox import AlertOutbox
+from utils.email_notifier import Mailer
 
 logger = setup_logger(__name__)
 settings = get_settings()
 
-def process_card(card, service, sheet_id, sheet_name, sources):
-    """Traite une carte individuelle"""
-    logger.info(f"\nTraitement de : {card.name_fr}")
+def process_cards_concurrently(cards, ctx: RunContext, workers: int):
+    """Traite plusieurs cartes en parallèle, chacune interrogeant ses sources en même temps"""
+    source_workers = settings.cardmarket_max_concurrency + settings.vinted_max_concurrency
+    with ThreadPoolExecutor(
+        max_workers=source_workers, thread_name_prefix="source"
+    ) as source_executor, ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix="card"
+    ) as card_executor:
+        card_ctx = replace(ctx, executor=source_executor)
+        futures = {
+            card_executor.submit(process_card, card, card_ctx): card for card in cards
+        }
+        for future in as_completed(futures):
+            card = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(f"Erreur lors du traitement de {card.name_fr} : {e}")
+
+
+def checkpoint_run(
+    ctx: RunContext, service, sheet_id: str, sheet_name: str
+) -> bool:
+    """
+    Envoie les écritures en attente : résumé journalier de l'historique,
+    stockage, publication d'un stockage local dans le sheet
+
+    Retourne True si toutes les écritures journalisées ont été envoyées.
+    """
+    if settings.history_sheet_mode == "daily" and service is not None:
+        ctx.history.flush()
+        export_history_summary(
+            service, sheet_id, settings.history_sheet_name, ctx.history
+        )
+
+    ctx.store.flush()
+    if (
+        isinstance(ctx.store, LocalCardStore)
+        and service is not None
+        and sync_due(ctx.store, parse_duration(settings.storage_sync_interval))
+    ):
+        with metrics.stage("storage_sync"):
+            sync_to_sheet(ctx.store, service, sheet_id, sheet_name)
+    if ctx.journal.pending_writes():
+        logger.warning(
+            "Des écritures n'ont pas pu être envoyées ; "
+            "relancer avec --resume pour les renvoyer"
+        )
+        return False
+    return True
+
 
-    cardmarket_price_info = None
-    vinted_price_info = None
-    latest_cardmarket_price = card.current_price
+def track_prices(
+    sheets_url: str,
+    sheet_name: str,
+    sources: list[str],
+    workers: int = 1,
+    max_age: Optional[timedelta] = None,
+    budget: Optional[RunBudget] = None,
+    vinted_mode: str = "search",
+    cardmarket_mode: str = "product",
+    metrics_json: Optional[str] = None,
+    metrics_prom: Optional[str] = None,
+    pipeline: bool = False,
+    resume: bool = False,
+    storage: Optional[str] = None,
+    daemon: bool = False,
+):
+    metrics.reset()
+    backend = storage or settings.storage_backend
+    try:
+        # Le sheet n'est ouvert que s'il sert de stockage ou de publication
+        service, sheet_id = None, sheets_url and get_sheet_id(sheets_url)
+        if backend == "sheets" or (
+            sheets_url and parse_duration(settings.storage_sync_interval)
+        ):
+            service = get_google_sheets_service(settings.google_sheets_credentials_file)
 
-    if "cardmarket" in sources and card.cardmarket_url:
-        cardmarket_price_info = get_cardmarket_price(card.cardmarket_url)
-        if cardmarket_price_info:
-            update_card_prices(
-                service, sheet_id, sheet_name, card.row, cardmarket_price_info
+        limiter = DomainLimiter(
+            {
+                "cardmarket": settings.cardmarket_max_concurrency,
+                "vinted": settings.vinted_max_concurrency,
+            }
+        )
+        pool_size = settings.browser_pool_size
+        if workers > 1 or pipeline or daemon:
+            # Un navigateur par page ouverte simultanément
+            pool_size = max(
+                pool_size,
+                settings.cardmarket_max_concurrency + settings.vinted_max_concurrency,
             )
-            log_price_history(
-                service,
-                sheet_id,
-                settings.history_sheet_name,
-                card.name_fr,
-                cardmarket_price_info.current_price,
-                "Cardmarket",
+
+        ttls = {
+            "cardmarket": max_age
+            if max_age is not None
+            else parse_duration(settings.cardmarket_ttl),
+            "vinted": max_age
+            if max_age is not None
+            else parse_duration(settings.vinted_ttl),
+        }
+
+        with RunJournal(
+            settings.journal_path, parse_duration(settings.journal_alert_retention)
+        ) as journal, BrowserPool(
+            size=pool_size, max_pages=settings.browser_max_pages
+        ) as pool, open_store(
+            backend, service, sheet_id, sheet_name, journal=journal
+        ) as store, PriceHistoryStore(
+            settings.history_db_path
+        ) as history, ScrapeCache(
+            settings.scrape_cache_path, ttls, settings.scrape_cache_max_entries
+        ) as cache, AlertOutbox(
+            Mailer.from_settings(),
+            digest_interval=parse_duration(settings.alert_digest_interval)
+            if settings.alert_mode == "digest"
+            else None,
+            journal=journal,
+        ) as outbox, (
+            PageArchive(
+                settings.page_archive_path,
+                level=settings.page_archive_level,
+                max_segment_bytes=settings.page_archive_segment_mb * 1024 * 1024,
+                retention=parse_duration(settings.page_archive_retention),
             )
-            latest_cardmarket_price = cardmarket_price_info.current_price
+            if settings.page_archive_path
+            else nullcontext()
+        ) as archive:
+            cards = store.get_cards()
+            if not cards and isinstance(store, LocalCardStore) and sheets_url:
+                # Premier lancement d'un stockage local : cartes reprises du sheet
+                import_from_sheet(
+                    store,
+                    get_google_sheets_service(settings.google_sheets_credentials_file),
+                    sheet_id,
+                    sheet_name,
+                )
+                cards = store.get_cards()
+            logger.info(f"Nombre de cartes trouvées : {len(cards)}")
 
-    if "vinted" in sources:
-        vinted_price_info = get_vinted_prices(card.name_fr)
-        if not vinted_price_info:
-            # Si on n'a pas de prix Vinted, on ne peut pas mettre à jour
-            logger.warning(
-                f"Pas de prix Vinted disponible pour {card.name_fr}, impossible de mettre à jour"
+            ctx = RunContext(
+                store=store,
+                sources=sources,
+                pool=pool,
+                limiter=limiter,
+                history=history,
+                cache=cache,
+                budget=budget,
+                journal=journal,
+                outbox=outbox,
             )
-            return
-
-        old_vinted_url = card.vinted_url
-
-        update_vinted_price(service, sheet_id, sheet_name, card.row, vinted_price_info)
-
-        if vinted_price_info and latest_cardmarket_price:
-            # Vérifie qu'on a un prix Cardmarket
-            vinted_price = vinted_price_info.min_price
-            price_diff = latest_cardmarket_price - vinted_price
-
-            # Si le prix Vinted est inférieur avec une différence minimale
-            if (
-                price_diff > 0
-                and (price_diff / latest_cardmarket_price * 100)
-                >= settings.min_price_diff_percent
-                and old_vinted_url != vinted_price_info.url
-            ):
-                send_price_alert(
-                    card_name=card.name_fr,
-                    cardmarket_price=latest_cardmarket_price,
-                    vinted_price=vinted_price,
-                    vinted_url=vinted_price_info.url,
-                    difference=price_diff,
+            if archive is not None:
+                # Cartes du relevé, pour rejouer les alertes (--replay)
+                archive.add(
+                    "sheet",
+                    "sheet_cards",
+                    sheet_name,
+                    [card.model_dump(mode="json") for card in cards],
                 )
 
-def track_prices(sheets_url: str, sheet_name: str, sources: list[str]):
-    try:
-        service = get_google_sheets_service(settings.google_sheets_credentials_file)
-        sheet_id = get_sheet_id(sheets_url)
+            resumed = journal.start(store.location, sheet_name, resume)
+            # Alertes jamais envoyées (arrêt brutal ou échec de l'envoi)
+            outbox.replay(journal.pending_alerts())
+            if resumed:
+                # Écritures perdues par l'exécution interrompue et cartes terminées
+                store.replay(journal.pending_writes())
+                if not daemon:
+                    cards = [card for card in cards if not journal.is_done(card)]
+                    logger.info(f"{len(cards)} cartes restant à traiter")
+
+            if cardmarket_mode == "listing" and "cardmarket" in sources:
+                from scrapers.cardmarket_listing import harvest_cardmarket_prices
+
+                # Seules les cartes dont le prix n'est plus frais sont relevées
+                due = [
+                    card
+                    for card in cards
+                    if not cache.is_fresh(
+                        "cardmarket", last_checked(card, "cardmarket", cache)
+                    )
+                ]
+                with metrics.stage("cardmarket_listing"):
+                    ctx.cardmarket_harvest = harvest_cardmarket_prices(due, pool)
+
+            if vinted_mode == "harvest" and "vinted" in sources:
+                from scrapers.vinted_harvest import harvest_vinted_prices
+
+                with metrics.stage("vinted_harvest"):
+                    ctx.vinted_harvest = harvest_vinted_prices(cards, pool)
+
+            if budget is not None:
+                # Avec un budget limité, les cartes les plus utiles passent d'abord
+                cards = prioritize_cards(cards, history, sources, cache)
 
-        cards = get_cards_to_track(service, sheet_id, sheet_name)
-        logger.info(f"Nombre de cartes trouvées : {len(cards)}")
+            if daemon:
+                from daemon import run_daemon
 
-        for card in cards:
-            process_card(card, service, sheet_id, sheet_name, sources)
+                def checkpoint():
+                    # Fin d'un tour : écritures envoyées, journal recommencé
+                    # même si des envois ont échoué (les écritures restent en
+                    # attente dans le stockage, les alertes dans le journal),
+                    # alertes en échec remises en file
+                    checkpoint_run(ctx, service, sheet_id, sheet_name)
+                    journal.restart(store.location, sheet_name)
+                    outbox.retry()
+                    cache.save()
+                    if archive is not None:
+                        archive.rotate()
+                    report_metrics(
+                        metrics_json or settings.metrics_json_path,
+                        metrics_prom or settings.metrics_prom_path,
+                    )
+
+                run_daemon(cards, ctx, workers, sheet_name, checkpoint)
+            elif pipeline:
+                # asyncio et le pool de processus ne servent qu'à ce mode
+                from pipeline import run_pipeline
+
+                run_pipeline(cards, ctx)
+            elif workers > 1:
+                process_cards_concurrently(cards, ctx, workers)
+            else:
+                for card in cards:
+                    process_card(card, ctx)
+            logger.info(f"Navigateurs lancés pendant l'exécution : {pool.launched}")
+            logger.info(
+                f"Cache de scraping : {cache.hits} réutilisations, {cache.misses} absents"
+            )
+
+            # Alertes restantes envoyées avant de clore le journal
+            outbox.close()
+            if checkpoint_run(ctx, service, sheet_id, sheet_name):
+                journal.complete()
 
     except Exception as e:
         logger.error(f"Erreur générale : {e}")
+    finally:
+        report_metrics(
+            metrics_json or settings.metrics_json_path,
+            metrics_prom or settings.metrics_prom_path,
+        )
+
+
+def report_metrics(json_path: str, prom_path: str):
+    """Affiche le récapitulatif des mesures et les exporte si demandé"""
+    logger.info(f"Mesures de l'exécution :\n{metrics.summary_table()}")
+    try:
+        if json_path:
+            metrics.write_json(json_path)
+        if prom_path:
+            metrics.write_prometheus(prom_path)
+    except OSError as e:
+        logger.error(f"Impossible d'écrire les mesures : {e}")
+
+
+def startup_modules(
+    sources: list[str],
+    vinted_mode: str,
+    pipeline: bool,
+    cardmarket_mode: str = "product",
+) -> list[str]:
+    """Modules importés par une exécution avec ces options, imports différés compris"""
+    modules = ["main", "googleapiclient.discovery", "google.oauth2.service_account"]
+    if "cardmarket" in sources or settings.vinted_fetch_mode == "browser":
+        modules.append("seleniumbase")
+    if "cardmarket" in sources and cardmarket_mode == "listing":
+        modules.append("scrapers.cardmarket_listing")
+    if "vinted" in sources:
+        if settings.vinted_fetch_mode == "http":
+            modules.append("requests")
+        if vinted_mode == "harvest":
+            modules.append("scrapers.vinted_harvest")
+    if pipeline:
+        modules.append("pipeline")
+    return modules
+
+
+def duration_arg(value: str) -> timedelta:
+    """Durée passée en argument (ex: 15m), pour le type= d'argparse"""
+    try:
+        return parse_duration(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
 
 def main():
     load_dotenv()
@@ -104,15 +340,262 @@ def main():
         default="all",
         help="Sources de prix à vérifier (défaut: all)",
     )
+    parser.add_argument(
+        "--workers",
+        "-w",
+        type=int,
+        default=1,
+        help="Nombre de cartes traitées en parallèle (défaut: 1)",
+    )
+    parser.add_argument(
+        "--max-age",
+        type=duration_arg,
+        help="Âge maximum des prix avant rafraîchissement, pour toutes les sources "
+        f"(ex: 30m, 6h ; défaut: {settings.cardmarket_ttl} Cardmarket, "
+        f"{settings.vinted_ttl} Vinted)",
+    )
+    parser.add_argument(
+        "--vinted-mode",
+        choices=["search", "harvest"],
+        default="search",
+        help="search : une recherche Vinted par carte ; harvest : parcours du "
+        "catalogue Lorcana complet comparé à toutes les cartes (défaut: search)",
+    )
+    parser.add_argument(
+        "--cardmarket-mode",
+        choices=["product", "listing"],
+        default="product",
+        help="product : une page produit par carte ; listing : listes des "
+        "extensions (colonne Set), pages produit seulement pour la tendance et "
+        "la moyenne 30 jours (défaut: product)",
+    )
+    parser.add_argument(
+        "--budget",
+        type=duration_arg,
+        help="Durée maximale de l'exécution (ex: 15m) ; les cartes prioritaires passent d'abord",
+    )
+    parser.add_argument(
+        "--max-pages",
+        type=int,
+        help="Nombre maximum de pages chargées ; les cartes prioritaires passent d'abord",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Pipeline asynchrone : chargement, parsing (pool de processus), "
+        "alertes et écritures se chevauchent",
+    )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Suivi continu : ressources gardées ouvertes, cartes relevées au "
+        "fil de leur échéance, état sur http://DAEMON_HTTP_HOST:DAEMON_HTTP_PORT",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Reprend l'exécution interrompue : cartes terminées ignorées, "
+        "écritures non envoyées rejouées",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        help="Fichier JSON des durées par étape et des compteurs de l'exécution",
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        help="Fichier texte Prometheus (textfile collector du node exporter)",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        type=str.upper,
+        help="Niveau de log (défaut: LOG_LEVEL)",
+    )
+
+    parser.add_argument(
+        "--storage",
+        choices=BACKENDS,
+        default=settings.storage_backend,
+        help="Stockage des cartes et des prix : Google Sheet ou fichier local "
+        f"(défaut: {settings.storage_backend})",
+    )
+    parser.add_argument(
+        "--import-sheet",
+        action="store_true",
+        help="Copie les cartes et les prix du sheet dans le stockage local, sans lancer le suivi",
+    )
+    parser.add_argument(
+        "--sync-sheet",
+        action="store_true",
+        help="Publie le stockage local dans le sheet (cellules modifiées), sans lancer le suivi",
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="ARCHIVE",
+        help="Rejoue parsing, correspondance et alertes sur une archive de pages, "
+        "sans navigateur ni réseau (rien n'est écrit ni envoyé)",
+    )
+    parser.add_argument(
+        "--replay-since",
+        type=duration_arg,
+        help="Avec --replay, seulement les pages chargées depuis cette durée (ex: 24h)",
+    )
+    parser.add_argument(
+        "--price-stats",
+        metavar="CARTE",
+        help="Affiche les prix min, moyen et max d'une carte (nom français) "
+        "dans l'historique, sans lancer le suivi",
+    )
+    parser.add_argument(
+        "--price-drops",
+        action="store_true",
+        help="Affiche les cartes dont le prix a baissé depuis minuit (ou "
+        "depuis --history-since), sans lancer le suivi",
+    )
+    parser.add_argument(
+        "--history-days",
+        type=int,
+        default=30,
+        help="Avec --price-stats, nombre de jours d'historique (défaut : 30)",
+    )
+    parser.add_argument(
+        "--history-since",
+        type=duration_arg,
+        help="Avec --price-drops, baisses depuis cette durée (ex: 7d)",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Affiche la durée d'import des modules nécessaires aux options "
+        "choisies, sans lancer le suivi",
+    )
 
     args = parser.parse_args()
+    if args.log_level:
+        set_log_level(args.log_level)
+
+    if args.price_stats or args.price_drops:
+        from history_report import drops_table, stats_table
 
-    if not settings.google_sheets_url:
+        with PriceHistoryStore(settings.history_db_path) as history:
+            if args.price_stats:
+                print(stats_table(history, args.price_stats, args.history_days))
+            if args.price_drops:
+                since = None
+                if args.history_since:
+                    since = datetime.now().astimezone() - args.history_since
+                print(drops_table(history, since))
+        return
+
+    try:
+        check_backend(args.storage)
+    except ValueError as e:
+        logger.error(f"Erreur: {e}")
+        exit(1)
+
+    if not settings.google_sheets_url and (
+        args.storage == "sheets" or args.import_sheet or args.sync_sheet
+    ):
         logger.error("Erreur: GOOGLE_SHEETS_URL non défini dans .env")
         exit(1)
 
+    if args.import_sheet or args.sync_sheet:
+        if args.storage == "sheets":
+            logger.error("Erreur: --import-sheet et --sync-sheet concernent un stockage local")
+            exit(1)
+        service = get_google_sheets_service(settings.google_sheets_credentials_file)
+        sheet_id = get_sheet_id(settings.google_sheets_url)
+        with open_store(args.storage) as store:
+            if args.import_sheet:
+                import_from_sheet(store, service, sheet_id, args.sheet_name)
+            if args.sync_sheet:
+                sync_to_sheet(store, service, sheet_id, args.sheet_name)
+        return
+
     sources = ["cardmarket", "vinted"] if args.sources == "all" else [args.sources]
-    track_prices(settings.google_sheets_url, args.sheet_name, sources)
+    if args.profile_startup:
+        print(
+            startup_report(
+                startup_modules(
+                    sources, args.vinted_mode, args.pipeline, args.cardmarket_mode
+                )
+            )
+        )
+        return
+
+    if args.replay:
+        from replay import replay_archive
+
+        since = None
+        if args.replay_since:
+            since = time.time() - args.replay_since.total_seconds()
+        report = replay_archive(
+            args.replay, sources, since, workers=settings.pipeline_parse_workers
+        )
+        print(report.table())
+        return
+
+    if args.daemon and (
+        args.pipeline
+        or args.budget
+        or args.max_pages
+        or args.vinted_mode != "search"
+        or args.cardmarket_mode != "product"
+    ):
+        logger.error(
+            "Erreur: --daemon relève les cartes une à une, sans --pipeline, "
+            "--budget, --max-pages ni modes harvest/listing"
+        )
+        exit(1)
+    if args.daemon and not all(
+        args.max_age
+        if args.max_age is not None
+        else parse_duration(getattr(settings, f"{source}_ttl"))
+        for source in sources
+    ):
+        logger.error(
+            "Erreur: --daemon a besoin d'un âge maximum non nul (--max-age, "
+            "CARDMARKET_TTL, VINTED_TTL), sans quoi les cartes seraient "
+            "relevées en continu"
+        )
+        exit(1)
+    if (
+        args.daemon
+        and settings.alert_mode == "digest"
+        and not parse_duration(settings.alert_digest_interval)
+    ):
+        logger.error(
+            "Erreur: avec --daemon, ALERT_MODE=digest a besoin d'un "
+            "ALERT_DIGEST_INTERVAL non nul : le résumé de fin d'exécution ne "
+            "serait jamais envoyé"
+        )
+        exit(1)
+
+    budget = None
+    if args.budget or args.max_pages:
+        budget = RunBudget(
+            max_seconds=args.budget.total_seconds()
+            if args.budget
+            else None,
+            max_pages=args.max_pages,
+        )
+
+    track_prices(
+        settings.google_sheets_url,
+        args.sheet_name,
+        sources,
+        args.workers,
+        args.max_age,
+        budget,
+        args.vinted_mode,
+        args.cardmarket_mode,
+        args.metrics_json,
+        args.metrics_prom,
+        args.pipeline,
+        args.resume,
+        args.storage,
+        args.daemon,
+    )
 
 
 if __name__ == "__main__":
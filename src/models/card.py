@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from datetime import datetime
 from typing import Optional
 
 
@@ -7,7 +8,13 @@ class Card(BaseModel):
 
     name_en: str
     name_fr: str
+    set_code: Optional[str] = None
     cardmarket_url: Optional[str]
     current_price: Optional[float]
+    trend_price: Optional[float] = None
+    avg_30_days: Optional[float] = None
+    min_price: Optional[float] = None
     vinted_url: Optional[str] = None
+    last_update: Optional[datetime] = None
+    vinted_last_update: Optional[datetime] = None
     row: int
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
+from typing import Optional
 
 
 class BasePriceInfo(BaseModel):
@@ -27,9 +28,44 @@ class PriceInfo(BasePriceInfo):
     class Config:
         from_attributes = True
 
+class VintedListing(BaseModel):
+    """Annonce Vinted correspondant à une carte"""
+
+    title: str = Field(description="Titre de l'annonce")
+    price: float = Field(description="Prix de l'annonce")
+    url: str = Field(description="URL de l'annonce")
+
+
 class VintedPriceInfo(BasePriceInfo):
     url: str = Field(description="URL de l'annonce")
-    urlSearch: str = Field(description="URL de la recherche sur Vinted", default=None)
+    urlSearch: Optional[str] = Field(
+        description="URL de la recherche sur Vinted", default=None
+    )
+    listing_count: int = Field(
+        default=0,
+        description="Nombre d'annonces correspondantes sur les pages parcourues",
+    )
+    median_price: Optional[float] = Field(
+        default=None,
+        description="Prix médian des annonces correspondantes des pages parcourues",
+    )
+    p25_price: Optional[float] = Field(
+        default=None,
+        description="Premier quartile des prix des annonces des pages parcourues",
+    )
+    pages_sampled: int = Field(
+        default=0, description="Nombre de pages de résultats parcourues"
+    )
+    all_pages: bool = Field(
+        default=False,
+        description=(
+            "Toutes les pages de résultats ont été parcourues : les statistiques "
+            "portent sur l'ensemble des annonces et non sur les moins chères"
+        ),
+    )
+    top_listings: list[VintedListing] = Field(
+        default_factory=list, description="Annonces les moins chères"
+    )
 
     class Config:
         from_attributes = True
@@ -0,0 +1,362 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from card_processing import (
+    harvested_cardmarket,
+    journaled_result,
+    notify_alert,
+    price_alert,
+    reserve_budget,
+    stale_sources,
+    write_card_prices,
+)
+from config import get_settings
+from models.price_info import PriceInfo, VintedPriceInfo
+from run_context import RunContext
+from scrapers.cardmarket import fetch_cardmarket_page, parse_cardmarket_page
+from scrapers.vinted import (
+    build_search_url,
+    fetch_vinted_search_page,
+    match_vinted_page,
+)
+from scrapers.vinted_listings import VintedPriceCollector
+from utils.logger import setup_logger
+from utils.metrics import metrics
+from utils.scrape_cache import cache_key
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+SOURCE_MODELS = {"cardmarket": PriceInfo, "vinted": VintedPriceInfo}
+
+
+def fetch_raw(
+    card, source: str, ctx: RunContext, page: int = 1
+) -> Optional[tuple[str, Any]]:
+    """
+    Charge les données brutes d'une carte pour une source, sans les analyser
+
+    Retourne (type, contenu) : HTML d'une page, champs lus dans la page ou
+    annonces JSON de l'API Vinted.
+    """
+    with metrics.card(card.name_fr), metrics.stage(f"{source}_fetch"):
+        if source == "cardmarket":
+            return fetch_cardmarket_page(card.cardmarket_url, ctx.pool)
+        return fetch_vinted_search_page(card.name_fr, page, ctx.pool)
+
+
+def parse_raw(kind: str, payload: Any, card_name: str):
+    """
+    Analyse des données brutes, exécutée dans un processus de parsing
+
+    Retourne un PriceInfo pour Cardmarket, les annonces correspondantes
+    de la page (VintedPage) pour Vinted.
+    """
+    if kind in ("cardmarket_html", "cardmarket_fields"):
+        return parse_cardmarket_page(kind, payload)
+    return match_vinted_page(kind, payload, card_name)
+
+
+def parse_raw_measured(kind: str, payload: Any, card_name: str) -> tuple[Any, dict]:
+    """
+    parse_raw dans un processus de parsing, avec les mesures (étapes et
+    compteurs) qu'il y a ajoutées, à fusionner dans celles du processus
+    principal
+    """
+    before = metrics.snapshot()
+    result = parse_raw(kind, payload, card_name)
+    return result, metrics.changes_since(before)
+
+
+@dataclass
+class _PendingCard:
+    """Carte en attente des résultats de toutes ses sources"""
+
+    card: Any
+    sources: list[str]
+    waiting: set[str]
+    results: dict[str, Any] = field(default_factory=dict)
+
+
+class CardPipeline:
+    """
+    Traitement des cartes en étapes asynchrones reliées par des files bornées
+
+    - chargement : pour chaque source, autant de tâches que de pages
+      simultanées autorisées ; le HTML Cardmarket est transmis tel quel,
+      les pages de résultats Vinted sont analysées une à une jusqu'à
+      connaître les annonces les moins chères
+    - parsing : dans un pool de processus, en dehors du GIL
+    - correspondance et alertes : regroupe les sources d'une carte, décide de
+      l'alerte et l'envoie sans bloquer les cartes suivantes
+    - écriture : une seule tâche applique les écritures Sheets et historique,
+      regroupées par le SheetWriteBuffer
+
+    Une étape en avance attend que la suivante libère de la place dans sa
+    file, ce qui borne la mémoire utilisée. Si une étape s'arrête sur une
+    erreur, les autres sont annulées au lieu d'attendre indéfiniment une
+    place dans sa file.
+    """
+
+    def __init__(
+        self, ctx: RunContext, parse_workers: int = 0, queue_size: int = 32
+    ):
+        self.ctx = ctx
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.queue_size = max(1, queue_size)
+        self.fetch_workers = {
+            "cardmarket": max(1, settings.cardmarket_max_concurrency),
+            "vinted": max(1, settings.vinted_max_concurrency),
+        }
+
+    async def run(self, cards: list):
+        loop = asyncio.get_running_loop()
+        self._fetch_queues = {
+            source: asyncio.Queue(self.queue_size) for source in self.fetch_workers
+        }
+        self._parse_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._match_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._write_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self._pending: dict[int, _PendingCard] = {}
+        self._alerts: list[asyncio.Future] = []
+
+        io_workers = sum(self.fetch_workers.values()) + 2
+        with ProcessPoolExecutor(self.parse_workers) as parsers, ThreadPoolExecutor(
+            io_workers, thread_name_prefix="pipeline"
+        ) as io:
+            self._parsers = parsers
+            self._io = io
+            # Processus de parsing démarrés avant les threads d'E/S
+            await asyncio.gather(
+                *(loop.run_in_executor(parsers, os.getpid) for _ in range(self.parse_workers))
+            )
+
+            fetchers = [
+                asyncio.create_task(self._fetch(source))
+                for source, count in self.fetch_workers.items()
+                for _ in range(count)
+            ]
+            parsers_tasks = [
+                asyncio.create_task(self._parse()) for _ in range(self.parse_workers)
+            ]
+            matcher = asyncio.create_task(self._match())
+            writer = asyncio.create_task(self._write())
+            driver = asyncio.create_task(
+                self._drain(cards, fetchers, parsers_tasks, matcher, writer)
+            )
+
+            tasks = [driver, *fetchers, *parsers_tasks, matcher, writer]
+            try:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+                for task in done:
+                    if not task.cancelled() and task.exception() is not None:
+                        logger.error(f"Arrêt du pipeline : {task.exception()!r}")
+                        raise task.exception()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _drain(self, cards: list, fetchers, parsers_tasks, matcher, writer):
+        """Envoie les cartes, puis arrête les étapes dans l'ordre"""
+        await self._produce(cards)
+        for source, count in self.fetch_workers.items():
+            for _ in range(count):
+                await self._fetch_queues[source].put(None)
+        await asyncio.gather(*fetchers)
+        for _ in parsers_tasks:
+            await self._parse_queue.put(None)
+        await asyncio.gather(*parsers_tasks)
+        await self._match_queue.put(None)
+        await matcher
+        await self._write_queue.put(None)
+        await writer
+        for result in await asyncio.gather(*self._alerts, return_exceptions=True):
+            if isinstance(result, Exception):
+                logger.error(f"Erreur lors de l'envoi d'une alerte : {result}")
+
+    async def _produce(self, cards: list):
+        """Répartit les cartes entre les sources à charger"""
+        ctx = self.ctx
+        for card in cards:
+            logger.info(f"\nTraitement de : {card.name_fr}")
+            sources = stale_sources(card, ctx)
+            if not reserve_budget(card, ctx, sources):
+                continue
+            waiting = {
+                source
+                for source in sources
+                if source != "cardmarket" or card.cardmarket_url
+            }
+            if not waiting:
+                continue
+            self._pending[card.row] = _PendingCard(card, sources, set(waiting))
+
+            for source in sorted(waiting):
+                if source == "cardmarket" and harvested_cardmarket(card, ctx):
+                    # Prix déjà relevé sur la liste de l'extension
+                    await self._match_queue.put(
+                        (card, source, ctx.cardmarket_harvest[card.cardmarket_url])
+                    )
+                    continue
+                if source == "vinted" and ctx.vinted_harvest is not None:
+                    # Prix déjà récupérés par la moisson du catalogue
+                    await self._match_queue.put(
+                        (card, source, ctx.vinted_harvest.get(card.name_fr))
+                    )
+                    continue
+                journaled = journaled_result(ctx, source, cache_key(card, source))
+                if journaled is not None:
+                    await self._match_queue.put(
+                        (card, source, SOURCE_MODELS[source].model_validate(journaled))
+                    )
+                    continue
+                if ctx.cache is not None:
+                    cached = ctx.cache.get(source, cache_key(card, source))
+                    if cached is not None:
+                        metrics.incr("cache_hits", source=source)
+                        await self._match_queue.put(
+                            (card, source, SOURCE_MODELS[source].model_validate(cached))
+                        )
+                        continue
+                    metrics.incr("cache_misses", source=source)
+                await self._fetch_queues[source].put(card)
+
+    async def _fetch(self, source: str):
+        loop = asyncio.get_running_loop()
+        queue = self._fetch_queues[source]
+        while (card := await queue.get()) is not None:
+            if source == "vinted":
+                await self._match_queue.put((card, source, await self._fetch_vinted(card)))
+                continue
+            try:
+                raw = await loop.run_in_executor(
+                    self._io, fetch_raw, card, source, self.ctx
+                )
+            except Exception as e:
+                logger.error(f"Erreur de chargement {source} pour {card.name_fr} : {e}")
+                raw = None
+            if raw is None:
+                await self._match_queue.put((card, source, None))
+            else:
+                await self._parse_queue.put((card, source, raw))
+
+    async def _fetch_vinted(self, card) -> Optional[VintedPriceInfo]:
+        """
+        Parcourt les pages de résultats Vinted d'une carte
+
+        Chaque page est analysée avant de charger la suivante, pour s'arrêter
+        dès que les annonces les moins chères sont connues : les pages d'une
+        même carte ne passent donc pas par la file de parsing.
+        """
+        loop = asyncio.get_running_loop()
+        collector = VintedPriceCollector(
+            settings.vinted_top_k, stop_early=not settings.vinted_full_stats
+        )
+        for page in range(1, settings.vinted_max_pages + 1):
+            try:
+                raw = await loop.run_in_executor(
+                    self._io, fetch_raw, card, "vinted", self.ctx, page
+                )
+                if raw is None:
+                    break
+                with metrics.stage("vinted_parse", card=card.name_fr):
+                    vinted_page, changes = await loop.run_in_executor(
+                        self._parsers, parse_raw_measured, *raw, card.name_fr
+                    )
+                metrics.merge(changes, card.name_fr)
+            except Exception as e:
+                logger.error(f"Erreur de chargement vinted pour {card.name_fr} : {e}")
+                break
+            collector.add(vinted_page)
+            if collector.complete:
+                break
+
+        result = collector.result(build_search_url(card.name_fr))
+        if result is not None:
+            self._record(card, "vinted", result)
+        return result
+
+    def _record(self, card, source: str, result):
+        """Met en cache et journalise un résultat de scraping"""
+        if self.ctx.cache is not None:
+            self.ctx.cache.put(source, cache_key(card, source), result)
+        if self.ctx.journal is not None:
+            self.ctx.journal.record_result(source, cache_key(card, source), result)
+
+    async def _parse(self):
+        loop = asyncio.get_running_loop()
+        while (item := await self._parse_queue.get()) is not None:
+            card, source, (kind, payload) = item
+            try:
+                with metrics.stage(f"{source}_parse", card=card.name_fr):
+                    result, changes = await loop.run_in_executor(
+                        self._parsers, parse_raw_measured, kind, payload, card.name_fr
+                    )
+                metrics.merge(changes, card.name_fr)
+            except Exception as e:
+                logger.error(f"Erreur de parsing {source} pour {card.name_fr} : {e}")
+                result = None
+
+            if result is not None:
+                self._record(card, source, result)
+            await self._match_queue.put((card, source, result))
+
+    async def _match(self):
+        loop = asyncio.get_running_loop()
+        while (item := await self._match_queue.get()) is not None:
+            card, source, result = item
+            pending = self._pending[card.row]
+            pending.results[source] = result
+            pending.waiting.discard(source)
+            if pending.waiting:
+                continue
+            del self._pending[card.row]
+
+            cardmarket_price_info = pending.results.get("cardmarket")
+            vinted_price_info = pending.results.get("vinted")
+            await self._write_queue.put(
+                (card, pending.sources, cardmarket_price_info, vinted_price_info)
+            )
+            alert = price_alert(
+                card, pending.sources, cardmarket_price_info, vinted_price_info
+            )
+            if alert is not None:
+                self._alerts.append(
+                    loop.run_in_executor(self._io, notify_alert, self.ctx, alert)
+                )
+            metrics.incr("cards_processed")
+
+    async def _write(self):
+        loop = asyncio.get_running_loop()
+        while (item := await self._write_queue.get()) is not None:
+            card, sources, cardmarket_price_info, vinted_price_info = item
+            try:
+                with metrics.stage("pipeline_write"):
+                    await loop.run_in_executor(
+                        self._io,
+                        write_card_prices,
+                        card,
+                        self.ctx,
+                        sources,
+                        cardmarket_price_info,
+                        vinted_price_info,
+                    )
+            except Exception as e:
+                logger.error(f"Erreur d'écriture pour {card.name_fr} : {e}")
+                continue
+            if self.ctx.journal is not None:
+                self.ctx.journal.record_done(card)
+
+
+def run_pipeline(cards: list, ctx: RunContext):
+    """Traite les cartes avec le pipeline asynchrone"""
+    pipeline = CardPipeline(
+        ctx,
+        parse_workers=settings.pipeline_parse_workers,
+        queue_size=settings.pipeline_queue_size,
+    )
+    asyncio.run(pipeline.run(cards))
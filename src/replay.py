@@ -0,0 +1,208 @@
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Optional
+
+from card_processing import price_alert
+from config import get_settings
+from models.card import Card
+from models.price_info import PriceInfo, VintedPriceInfo
+from pipeline import parse_raw
+from scrapers.cardmarket_listing import listing_price_info, product_key
+from scrapers.html_parsers import extract_cardmarket_listing
+from scrapers.vinted import build_search_url
+from scrapers.vinted_listings import VintedPriceCollector
+from utils.logger import setup_logger
+from utils.page_archive import ArchivedPage, ArchiveReader
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+# Types de pages rejouées : pages produit Cardmarket, listes d'extensions et
+# pages de recherche Vinted, en HTML ou réduites aux champs lus dans la page
+# (les pages du catalogue moissonné sont archivées mais ne sont pas
+# rattachées à une carte)
+REPLAY_KINDS = {
+    "cardmarket_html",
+    "cardmarket_fields",
+    "cardmarket_listing",
+    "vinted_html",
+    "vinted_items",
+    "vinted_api",
+}
+REPLAY_BATCH = 256
+
+
+@dataclass
+class ReplayReport:
+    """Résultat du rejeu d'une archive"""
+
+    pages: Counter = field(default_factory=Counter)
+    failures: Counter = field(default_factory=Counter)
+    failed_urls: list[str] = field(default_factory=list)
+    cardmarket: dict[str, PriceInfo] = field(default_factory=dict)
+    vinted: dict[str, VintedPriceInfo] = field(default_factory=dict)
+    alerts: list[dict] = field(default_factory=list)
+    cards: int = 0
+    seconds: float = 0.0
+
+    def table(self, max_lines: int = 20) -> str:
+        lines = [
+            f"Rejeu : {sum(self.pages.values())} pages en {self.seconds:.1f} s, "
+            f"{self.cards} cartes",
+            f"{'type':<22} {'pages':>8} {'échecs':>8}",
+        ]
+        for kind in sorted(self.pages):
+            lines.append(f"{kind:<22} {self.pages[kind]:>8} {self.failures[kind]:>8}")
+        lines.append(
+            f"Prix obtenus : {len(self.cardmarket)} Cardmarket, {len(self.vinted)} Vinted"
+        )
+        if self.failed_urls:
+            lines.append("Pages sans résultat :")
+            lines.extend(f"  {url}" for url in self.failed_urls[:max_lines])
+            if len(self.failed_urls) > max_lines:
+                lines.append(f"  ... et {len(self.failed_urls) - max_lines} autres")
+        lines.append(f"Alertes : {len(self.alerts)}")
+        for alert in self.alerts[:max_lines]:
+            lines.append(
+                f"  {alert['card_name']} : {alert['vinted_price']}€ sur Vinted, "
+                f"{alert['cardmarket_price']}€ sur Cardmarket ({alert['vinted_url']})"
+            )
+        if len(self.alerts) > max_lines:
+            lines.append(f"  ... et {len(self.alerts) - max_lines} autres")
+        return "\n".join(lines)
+
+
+def _parse_entry(job: tuple[str, object, str]):
+    kind, payload, card_name = job
+    if kind == "cardmarket_listing":
+        return extract_cardmarket_listing(payload)
+    return parse_raw(kind, payload, card_name)
+
+
+def latest_cards(reader: ArchiveReader, since: Optional[float] = None) -> list[Card]:
+    """Cartes lues dans le sheet lors de la dernière exécution archivée"""
+    snapshots = list(reader.select({"sheet_cards"}, since))
+    if not snapshots:
+        return []
+    return [Card.model_validate(card) for card in reader.read(snapshots[-1])]
+
+
+def _latest_pages(
+    entries: list[ArchivedPage],
+) -> dict[tuple[str, str, int], ArchivedPage]:
+    """Dernière version archivée de chaque page (type, clé, numéro)"""
+    latest = {}
+    for entry in entries:
+        latest[(entry.kind, entry.key, entry.page)] = entry
+    return latest
+
+
+def replay_archive(
+    path: str,
+    sources: list[str],
+    since: Optional[float] = None,
+    workers: int = 0,
+) -> ReplayReport:
+    """
+    Rejoue parsing, correspondance et alertes à partir d'une archive de pages
+
+    Aucun navigateur, aucun accès réseau : seules les pages archivées depuis
+    `since` (la dernière version de chacune) sont analysées, dans un pool de
+    processus. Les alertes sont calculées comme lors d'une exécution normale
+    à partir des cartes du dernier relevé archivé, mais ne sont pas envoyées
+    et rien n'est écrit dans le sheet.
+    """
+    started = time.perf_counter()
+    report = ReplayReport()
+    wanted_kinds = {
+        kind for kind in REPLAY_KINDS if kind.split("_")[0] in sources
+    }
+
+    with ArchiveReader(path) as reader:
+        cards = latest_cards(reader, since)
+        report.cards = len(cards)
+        if not cards:
+            logger.warning(
+                "Aucune liste de cartes dans l'archive : pages analysées sans alertes"
+            )
+        entries = list(_latest_pages(list(reader.select(wanted_kinds, since))).values())
+
+        # Pages décompressées par lots pour borner la mémoire utilisée
+        workers = workers or os.cpu_count() or 1
+        executor = ProcessPoolExecutor(workers) if workers > 1 else None
+        results = []
+        try:
+            for start in range(0, len(entries), REPLAY_BATCH):
+                jobs = [
+                    (entry.kind, reader.read(entry), entry.key)
+                    for entry in entries[start : start + REPLAY_BATCH]
+                ]
+                if executor is None:
+                    results.extend(_parse_entry(job) for job in jobs)
+                else:
+                    results.extend(executor.map(_parse_entry, jobs, chunksize=16))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    collectors: dict[str, dict[int, object]] = {}
+    listing_items = []
+    for entry, result in zip(entries, results):
+        report.pages[entry.kind] += 1
+        failed = (
+            result is None
+            or (entry.kind == "cardmarket_listing" and not result)
+            or (entry.kind in ("vinted_html", "vinted_items") and not result.size)
+        )
+        if failed:
+            report.failures[entry.kind] += 1
+            report.failed_urls.append(entry.url or entry.key)
+            continue
+        if entry.kind in ("cardmarket_html", "cardmarket_fields"):
+            report.cardmarket[entry.key] = result
+        elif entry.kind == "cardmarket_listing":
+            listing_items.extend(result)
+        else:
+            collectors.setdefault(entry.key, {})[entry.page] = result
+
+    for card_name, vinted_pages in collectors.items():
+        collector = VintedPriceCollector(
+            settings.vinted_top_k, stop_early=not settings.vinted_full_stats
+        )
+        for page in sorted(vinted_pages):
+            collector.add(vinted_pages[page])
+            if collector.complete:
+                break
+        price_info = collector.result(build_search_url(card_name))
+        if price_info is not None:
+            report.vinted[card_name] = price_info
+
+    # Lignes des listes d'extensions pour les cartes sans page produit archivée
+    by_product = {
+        product_key(card.cardmarket_url): card
+        for card in cards
+        if card.cardmarket_url and card.cardmarket_url not in report.cardmarket
+    }
+    for item in listing_items:
+        card = by_product.get(product_key(item.url))
+        if card is None:
+            continue
+        price_info = listing_price_info(item, card)
+        if price_info is not None:
+            report.cardmarket[card.cardmarket_url] = price_info
+
+    for card in cards:
+        alert = price_alert(
+            card,
+            sources,
+            report.cardmarket.get(card.cardmarket_url),
+            report.vinted.get(card.name_fr),
+        )
+        if alert is not None:
+            report.alerts.append(alert)
+
+    report.seconds = time.perf_counter() - started
+    return report
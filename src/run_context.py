@@ -0,0 +1,34 @@
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Optional
+
+from history_store import PriceHistoryStore
+from models.price_info import PriceInfo, VintedPriceInfo
+from run_journal import RunJournal
+from scheduler import RunBudget
+from scrapers.browser_pool import BrowserPool
+from storage.base import CardStore
+from utils.alert_outbox import AlertOutbox
+from utils.concurrency import DomainLimiter
+from utils.scrape_cache import ScrapeCache
+
+
+@dataclass
+class RunContext:
+    """Ressources partagées par toutes les cartes d'une exécution"""
+
+    store: CardStore
+    sources: list[str]
+    pool: Optional[BrowserPool] = None
+    limiter: Optional[DomainLimiter] = None
+    executor: Optional[Executor] = None
+    history: Optional[PriceHistoryStore] = None
+    cache: Optional[ScrapeCache] = None
+    budget: Optional[RunBudget] = None
+    journal: Optional[RunJournal] = None
+    outbox: Optional[AlertOutbox] = None
+    # Résultats de la moisson du catalogue Vinted (--vinted-mode harvest)
+    vinted_harvest: Optional[dict[str, VintedPriceInfo]] = None
+    # Prix relevés sur les listes d'extensions Cardmarket (--cardmarket-mode
+    # listing), par URL de carte
+    cardmarket_harvest: Optional[dict[str, PriceInfo]] = None
@@ -0,0 +1,331 @@
+import json
+import os
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Optional
+
+from pydantic import BaseModel
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def card_key(card) -> str:
+    """Identifiant d'une carte dans le journal (ligne et nom)"""
+    return f"{card.row}:{card.name_fr}"
+
+
+class RunJournal:
+    """
+    Journal d'exécution en ajout seul (une ligne JSON par événement)
+
+    Chaque résultat de scraping, carte terminée, écriture mise en attente
+    dans le SheetWriteBuffer, envoi groupé réussi et alerte mise en file ou
+    envoyée y est ajouté au fil de l'eau. Après un arrêt brutal, --resume
+    reprend l'exécution interrompue : cartes terminées ignorées, résultats
+    déjà obtenus réutilisés, écritures et alertes non envoyées rejouées.
+
+    Les alertes envoyées sont conservées d'une exécution à l'autre pendant
+    alert_retention, pour ne jamais alerter deux fois sur la même annonce ;
+    les alertes mises en file mais jamais envoyées le sont aussi, pour être
+    renvoyées par l'exécution suivante.
+    """
+
+    def __init__(self, path: str, alert_retention: timedelta = timedelta(days=30)):
+        self.path = path
+        self.alert_retention = alert_retention
+        # Réentrant : restart() enchaîne complete() et start() sans laisser
+        # un autre thread écrire entre les deux
+        self._lock = threading.RLock()
+        self._file = None
+        self.seq = 0
+        self._alerts: dict[tuple[str, str], float] = {}
+        self._queued_alerts: dict[tuple[str, str], tuple[dict, float]] = {}
+        self._reset_run()
+        self._load()
+
+    def _reset_run(self):
+        self.run_info: Optional[dict] = None
+        # Seule une exécution reprise (--resume) réutilise les résultats
+        self.resumed = False
+        self._results: dict[str, tuple[dict, float]] = {}
+        self._done: set[str] = set()
+        self._writes: list[tuple[int, str, Any]] = []
+        self._flushed: dict[str, int] = {}
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Dernière ligne tronquée par un arrêt brutal
+                    continue
+                self._apply(record)
+
+    def _apply(self, record: dict):
+        kind = record.get("type")
+        self.seq = max(self.seq, record.get("seq", 0))
+        if kind == "run_start":
+            self._reset_run()
+            self.run_info = record
+        elif kind == "run_end":
+            self._reset_run()
+        elif kind == "result":
+            # Anciens journaux sans date : celle du début de l'exécution
+            ts = record.get("ts") or (self.run_info or {}).get("ts", 0)
+            self._results[f"{record['source']}:{record['key']}"] = (record["data"], ts)
+        elif kind == "done":
+            self._done.add(record["card"])
+        elif kind == "write":
+            self._writes.append((record["seq"], record["kind"], record["payload"]))
+        elif kind == "flushed":
+            self._flushed[record["kind"]] = record["upto"]
+            self._writes = [
+                write
+                for write in self._writes
+                if write[1] != record["kind"] or write[0] > record["upto"]
+            ]
+        elif kind == "alert_queued":
+            alert = record["alert"]
+            self._queued_alerts[(alert["card_name"], alert["vinted_url"])] = (
+                alert,
+                record.get("ts", time.time()),
+            )
+        elif kind == "alert":
+            self._alerts[(record["card"], record["url"])] = record["ts"]
+            self._queued_alerts.pop((record["card"], record["url"]), None)
+
+    def _append(self, record: dict) -> int:
+        with self._lock:
+            self.seq += 1
+            record["seq"] = self.seq
+            self._apply(record)
+            if self._file is not None:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._file.flush()
+            return self.seq
+
+    @property
+    def interrupted(self) -> bool:
+        """Indique si l'exécution précédente s'est arrêtée avant la fin"""
+        return self.run_info is not None
+
+    def start(self, sheet_id: str, sheet_name: str, resume: bool = False) -> bool:
+        """
+        Ouvre le journal pour une exécution
+
+        Retourne True si l'exécution interrompue précédente est reprise.
+        """
+        resumed = (
+            resume
+            and self.interrupted
+            and self.run_info.get("sheet_id") == sheet_id
+            and self.run_info.get("sheet_name") == sheet_name
+        )
+        if not resumed:
+            if self.interrupted:
+                logger.warning(
+                    "L'exécution précédente a été interrompue ; "
+                    "--resume permet de la reprendre"
+                )
+            self._compact()
+
+        self.resumed = resumed
+        journal_dir = os.path.dirname(self.path)
+        if journal_dir and not os.path.exists(journal_dir):
+            os.makedirs(journal_dir)
+        self._truncate_partial_line()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+        if resumed:
+            logger.info(
+                f"Reprise de l'exécution interrompue : {len(self._done)} cartes terminées, "
+                f"{len(self.pending_writes())} écritures à renvoyer"
+            )
+        else:
+            self._append(
+                {
+                    "type": "run_start",
+                    "ts": time.time(),
+                    "sheet_id": sheet_id,
+                    "sheet_name": sheet_name,
+                }
+            )
+        return resumed
+
+    def _truncate_partial_line(self):
+        """
+        Supprime la dernière ligne si elle a été tronquée par un arrêt brutal,
+        pour que le prochain événement ne lui soit pas accolé
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) == b"\n":
+                return
+            # Recherche du dernier saut de ligne en remontant par blocs
+            end = size
+            while end > 0:
+                start = max(0, end - 4096)
+                f.seek(start)
+                index = f.read(end - start).rfind(b"\n")
+                if index != -1:
+                    end = start + index + 1
+                    break
+                end = start
+            logger.warning(
+                f"Dernière ligne du journal tronquée ({size - end} octets) supprimée"
+            )
+            f.truncate(end)
+
+    def _compact(self):
+        """Réécrit le journal en ne gardant que les alertes récentes"""
+        self._reset_run()
+        limit = time.time() - self.alert_retention.total_seconds()
+        self._alerts = {key: ts for key, ts in self._alerts.items() if ts >= limit}
+        self._queued_alerts = {
+            key: queued for key, queued in self._queued_alerts.items() if queued[1] >= limit
+        }
+        if not os.path.exists(self.path):
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for (card, url), ts in self._alerts.items():
+                record = {"type": "alert", "card": card, "url": url, "ts": ts}
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            for alert, ts in self._queued_alerts.values():
+                record = {"type": "alert_queued", "alert": alert, "ts": ts}
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def result(
+        self, source: str, key: str, max_age: Optional[timedelta] = None
+    ) -> Optional[dict]:
+        """
+        Résultat déjà obtenu par l'exécution reprise, ou None
+
+        Hors reprise (--resume), ou si le résultat date de plus de max_age,
+        la page doit être rechargée.
+        """
+        with self._lock:
+            if not self.resumed:
+                return None
+            journaled = self._results.get(f"{source}:{key}")
+        if journaled is None:
+            return None
+        data, ts = journaled
+        if max_age is not None and time.time() - ts >= max_age.total_seconds():
+            return None
+        return data
+
+    def record_result(self, source: str, key: str, value: BaseModel):
+        """Enregistre le résultat d'un scraping"""
+        self._append(
+            {
+                "type": "result",
+                "ts": time.time(),
+                "source": source,
+                "key": key,
+                "data": value.model_dump(mode="json"),
+            }
+        )
+
+    def is_done(self, card) -> bool:
+        """Indique si la carte a été entièrement traitée"""
+        with self._lock:
+            return card_key(card) in self._done
+
+    def record_done(self, card):
+        """Marque la carte comme traitée (écritures mises en attente)"""
+        self._append({"type": "done", "card": card_key(card)})
+
+    def record_write(self, kind: str, payload: Any) -> int:
+        """
+        Enregistre une écriture mise en attente dans le SheetWriteBuffer
+
+        kind vaut "update" (plages de cellules) ou "history:<onglet>" (ligne
+        d'historique).
+        """
+        return self._append({"type": "write", "kind": kind, "payload": payload})
+
+    def record_flushed(self, kind: str, upto: int):
+        """Les écritures de ce type jusqu'à `upto` ont été envoyées"""
+        self._append({"type": "flushed", "kind": kind, "upto": upto})
+
+    def pending_writes(self) -> list[tuple[str, Any]]:
+        """Écritures enregistrées mais pas encore envoyées au sheet"""
+        with self._lock:
+            return [
+                (kind, payload)
+                for seq, kind, payload in self._writes
+                if seq > self._flushed.get(kind, 0)
+            ]
+
+    def alert_sent(self, card_name: str, url: str) -> bool:
+        """Indique si une alerte a déjà été envoyée pour cette annonce"""
+        with self._lock:
+            return (card_name, url) in self._alerts
+
+    def record_alert_queued(self, alert: dict):
+        """Enregistre une alerte mise en file d'envoi"""
+        self._append({"type": "alert_queued", "alert": alert, "ts": time.time()})
+
+    def pending_alerts(self) -> list[dict]:
+        """Alertes mises en file mais jamais envoyées (arrêt brutal ou échec)"""
+        with self._lock:
+            return [alert for alert, _ in self._queued_alerts.values()]
+
+    def record_alert(self, card_name: str, url: str):
+        """Enregistre une alerte envoyée"""
+        self._append(
+            {"type": "alert", "card": card_name, "url": url, "ts": time.time()}
+        )
+
+    def complete(self):
+        """Termine l'exécution : seul l'état des alertes est conservé"""
+        self._append({"type": "run_end", "ts": time.time()})
+        self.close()
+        self._compact()
+
+    def restart(self, sheet_id: str, sheet_name: str) -> list[tuple[str, Any]]:
+        """
+        Termine l'exécution en cours et en commence une nouvelle (tour du
+        suivi continu), quel que soit l'état des envois
+
+        Les alertes en file sont conservées comme par complete() ; les
+        écritures pas encore envoyées sont recopiées dans la nouvelle
+        exécution, pour être marquées envoyées par le prochain envoi réussi
+        ou rejouées par --resume. Retourne ces écritures.
+        """
+        with self._lock:
+            pending = self.pending_writes()
+            self.complete()
+            self.start(sheet_id, sheet_name)
+            for kind, payload in pending:
+                self.record_write(kind, payload)
+        if pending:
+            logger.warning(
+                f"{len(pending)} écritures pas encore envoyées reportées au tour suivant"
+            )
+        return pending
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> "RunJournal":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
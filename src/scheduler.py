@@ -0,0 +1,116 @@
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+import pytz
+
+from history_store import PriceHistoryStore
+from models.card import Card
+from utils.logger import setup_logger
+from utils.scrape_cache import ScrapeCache, last_checked
+
+logger = setup_logger(__name__)
+
+# Fenêtre d'historique utilisée pour estimer la volatilité et les alertes
+HISTORY_DAYS = 30
+# Volatilité supposée d'une carte sans historique suffisant
+DEFAULT_VOLATILITY = 0.2
+# Âge retenu pour une carte jamais mise à jour, et âge maximum pris en compte
+MAX_AGE_HOURS = 24 * 7
+
+
+class RunBudget:
+    """
+    Budget d'une exécution : durée maximale et/ou nombre de pages maximum
+
+    Les pages sont réservées avant de traiter une carte ; une fois le budget
+    épuisé, les cartes restantes sont ignorées.
+    """
+
+    def __init__(
+        self, max_seconds: Optional[float] = None, max_pages: Optional[int] = None
+    ):
+        self.deadline = time.monotonic() + max_seconds if max_seconds else None
+        self.max_pages = max_pages
+        self.pages = 0
+        self._lock = threading.Lock()
+
+    def try_reserve(self, pages: int) -> bool:
+        """Réserve des pages pour une carte, retourne False si le budget est épuisé"""
+        with self._lock:
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                return False
+            if self.max_pages is not None and self.pages + pages > self.max_pages:
+                return False
+            self.pages += pages
+            return True
+
+
+def card_priority(
+    card: Card,
+    stats: dict[tuple[str, str], dict],
+    alerts: dict[str, int],
+    sources: list[str],
+    now: datetime,
+    cache: Optional[ScrapeCache] = None,
+) -> float:
+    """
+    Estime l'intérêt de rafraîchir une carte
+
+    Le score croît avec le prix (un écart de 10% compte plus sur une carte
+    chère), la volatilité récente (écart-type / moyenne), l'ancienneté du
+    dernier relevé et la proportion de relevés Vinted ayant déclenché
+    une alerte.
+    """
+    price = card.current_price or 1.0
+
+    volatilities = []
+    for source in ("Cardmarket", "Vinted"):
+        source_stats = stats.get((card.name_fr, source))
+        if source_stats and source_stats["count"] >= 2 and source_stats["mean"]:
+            volatilities.append(source_stats["std"] / source_stats["mean"])
+    volatility = max(volatilities) if volatilities else DEFAULT_VOLATILITY
+
+    updates = [
+        last_checked(card, source, cache)
+        for source in ("cardmarket", "vinted")
+        if source in sources
+    ]
+    age_hours = 0.0
+    for last_update in updates:
+        if last_update is None:
+            age_hours = MAX_AGE_HOURS
+            break
+        age = (now - last_update).total_seconds() / 3600
+        age_hours = max(age_hours, min(age, MAX_AGE_HOURS))
+
+    vinted_stats = stats.get((card.name_fr, "Vinted"))
+    scrapes = vinted_stats["count"] if vinted_stats else 0
+    alert_rate = alerts.get(card.name_fr, 0) / (scrapes + 1)
+
+    return price * (volatility + 0.01) * (age_hours + 1) * (1 + alert_rate)
+
+
+def prioritize_cards(
+    cards: list[Card],
+    history: PriceHistoryStore,
+    sources: list[str],
+    cache: Optional[ScrapeCache] = None,
+) -> list[Card]:
+    """Trie les cartes de la plus à la moins intéressante à rafraîchir"""
+    stats = history.card_stats(HISTORY_DAYS)
+    alerts = history.alert_counts(HISTORY_DAYS)
+    now = datetime.now(pytz.timezone("Europe/Paris"))
+
+    scored = [
+        (card_priority(card, stats, alerts, sources, now, cache), card)
+        for card in cards
+    ]
+    scored.sort(key=lambda item: item[0], reverse=True)
+    if scored:
+        logger.info(
+            f"Priorités calculées : {scored[0][1].name_fr} en tête "
+            f"(score {scored[0][0]:.2f})"
+        )
+    return [card for _, card in scored]
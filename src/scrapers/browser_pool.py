@@ -0,0 +1,177 @@
+import queue
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Iterator, Optional
+
+from config import get_settings
+from scrapers.resource_blocking import apply_resource_blocking
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+
+def default_sb_kwargs() -> dict:
+    """
+    Options SB par défaut : mode UC sans interface, et stratégie de
+    chargement BROWSER_PAGE_LOAD_STRATEGY ("none" rend la main dès la
+    réponse reçue ; chaque scraper attend ensuite l'élément dont il a besoin)
+    """
+    return {
+        "uc": True,
+        "headless": True,
+        "page_load_strategy": settings.browser_page_load_strategy,
+    }
+
+
+class BrowserSession:
+    """Session SeleniumBase gardée ouverte pour être réutilisée"""
+
+    def __init__(self, **sb_kwargs):
+        # seleniumbase n'est importé qu'au lancement du premier navigateur
+        from seleniumbase import SB
+
+        self._context = SB(**sb_kwargs)
+        self.sb = self._context.__enter__()
+        self.pages = 0
+        self.last_source: Optional[str] = None
+
+    def prepare(self, source: str):
+        """Prépare la session pour une source : état vierge et ressources bloquées"""
+        if source == self.last_source:
+            return
+        if self.last_source is not None:
+            self.reset()
+        apply_resource_blocking(self.sb, source)
+        self.last_source = source
+
+    def reset(self):
+        """Efface les cookies et le stockage local avant de changer de source"""
+        try:
+            self.sb.delete_all_cookies()
+            self.sb.clear_local_storage()
+            self.sb.clear_session_storage()
+        except Exception as e:
+            logger.debug(f"Réinitialisation partielle de la session : {e}")
+        try:
+            self.sb.open("about:blank")
+        except Exception as e:
+            logger.debug(f"Impossible d'ouvrir about:blank : {e}")
+
+    def is_alive(self) -> bool:
+        """Vérifie que le navigateur répond encore"""
+        try:
+            return bool(self.sb.driver.window_handles)
+        except Exception:
+            return False
+
+    def close(self):
+        """Ferme le navigateur"""
+        try:
+            self._context.__exit__(None, None, None)
+        except Exception as e:
+            logger.warning(f"Erreur lors de la fermeture du navigateur : {e}")
+
+
+class BrowserPool:
+    """
+    Pool de navigateurs réutilisés d'une carte à l'autre
+
+    Args:
+        size: Nombre maximum de navigateurs ouverts en même temps
+        max_pages: Nombre de pages après lequel une session est recyclée
+        **sb_kwargs: Options transmises à SB (uc, headless, ...)
+    """
+
+    def __init__(self, size: int = 2, max_pages: int = 50, **sb_kwargs):
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.sb_kwargs = sb_kwargs or default_sb_kwargs()
+        self._idle: "queue.LifoQueue[BrowserSession]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._sessions: set[BrowserSession] = set()
+        self.launched = 0
+
+    def _acquire(self) -> BrowserSession:
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            with metrics.stage("browser_start"):
+                session = BrowserSession(**self.sb_kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._sessions.add(session)
+            self.launched += 1
+        metrics.incr("browsers_launched")
+        logger.debug(f"Nouveau navigateur lancé ({self.launched} depuis le début)")
+        return session
+
+    def _release(self, session: BrowserSession):
+        try:
+            if not session.is_alive():
+                logger.warning("Navigateur planté, la session sera recréée")
+                metrics.incr("browser_crashes")
+                self._discard(session)
+            elif session.pages >= self.max_pages:
+                logger.debug(f"Session recyclée après {session.pages} pages")
+                self._discard(session)
+            else:
+                self._idle.put(session)
+        finally:
+            self._slots.release()
+
+    def _discard(self, session: BrowserSession):
+        with self._lock:
+            self._sessions.discard(session)
+        session.close()
+
+    @contextmanager
+    def session(self, source: str) -> Iterator:
+        """Emprunte un navigateur pour une source donnée et le rend au pool"""
+        session = self._acquire()
+        try:
+            session.prepare(source)
+            session.pages += 1
+            yield session.sb
+        finally:
+            self._release(session)
+
+    def close(self):
+        """Ferme tous les navigateurs du pool"""
+        with self._lock:
+            sessions = list(self._sessions)
+            self._sessions.clear()
+        for session in sessions:
+            session.close()
+        while not self._idle.empty():
+            self._idle.get_nowait()
+
+    def __enter__(self) -> "BrowserPool":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+@contextmanager
+def borrow_browser(pool: Optional[BrowserPool], source: str) -> Iterator:
+    """Emprunte un navigateur au pool, ou en ouvre un temporaire sans pool"""
+    if pool is None:
+        from seleniumbase import SB
+
+        with ExitStack() as stack:
+            with metrics.stage("browser_start"):
+                sb = stack.enter_context(SB(**default_sb_kwargs()))
+            metrics.incr("browsers_launched")
+            apply_resource_blocking(sb, source)
+            yield sb
+    else:
+        with pool.session(source) as sb:
+            yield sb
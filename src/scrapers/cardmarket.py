@@ -1,77 +1,121 @@
-from seleniumbase import SB
-from bs4 import BeautifulSoup
+import logging
 from models.price_info import PriceInfo
-from typing import Optional
+from typing import Any, Optional
 from datetime import datetime
+from scrapers.browser_pool import BrowserPool, borrow_browser
+from scrapers.html_parsers import extract_cardmarket_fields
+from scrapers.page_scripts import extract_cardmarket_fields_in_page, in_page_extraction
 from utils.logger import setup_logger
+from utils.metrics import metrics
+from utils.page_archive import archive_page
 
 logger = setup_logger(__name__)
 
+def _parse_euro(text: str) -> float:
+    return float(text.replace("€", "").replace(",", ".").strip())
+
+
+def price_info_from_fields(fields: dict[str, str]) -> PriceInfo:
+    """Construit un PriceInfo à partir des couples libellé / valeur de la page"""
+    current_price = _parse_euro(fields["De"]) if "De" in fields else 0
+    trend_price = (
+        _parse_euro(fields["Tendance des prix"]) if "Tendance des prix" in fields else 0
+    )
+    avg_30_days = (
+        _parse_euro(fields["Prix moyen 30 jours"])
+        if "Prix moyen 30 jours" in fields
+        else 0
+    )
+    available_items = (
+        int(fields["Articles disponibles"]) if "Articles disponibles" in fields else 0
+    )
+
+    return PriceInfo.model_validate(
+        {
+            "current_price": current_price,
+            "trend_price": trend_price,
+            "avg_30_days": avg_30_days,
+            "available_items": available_items,
+            "min_price": current_price,
+            "last_update": datetime.now(),
+        }
+    )
+
+
 def parse_price_info(html_content: str) -> Optional[PriceInfo]:
     """Parse les informations de prix depuis le HTML de la page"""
-    try:
-        soup = BeautifulSoup(html_content, "html.parser")
+    return parse_cardmarket_page("cardmarket_html", html_content)
 
-        info_container = soup.find("div", class_="info-list-container")
-        if not info_container:
-            return None
 
-        # Helper function to get price from dt/dd pairs
-        def get_price_by_label(label: str) -> float:
-            dt = info_container.find("dt", string=label)
-            if dt:
-                dd = dt.find_next("dd")
-                if dd:
-                    text = dd.get_text().strip()
-                    return float(text.replace("€", "").replace(",", ".").strip())
-            return 0
-
-        # Prix actuel (De)
-        current_price = get_price_by_label("De")
-
-        # Prix tendance
-        trend_price = get_price_by_label("Tendance des prix")
-
-        # Moyenne 30 jours
-        avg_30_days = get_price_by_label("Prix moyen 30 jours")
-
-        # Nombre d'items disponibles
-        available_dt = info_container.find("dt", string="Articles disponibles")
-        available_items = 0
-        if available_dt:
-            available_dd = available_dt.find_next("dd")
-            if available_dd:
-                available_items = int(available_dd.text.strip())
-
-        return PriceInfo.model_validate(
-            {
-                "current_price": current_price,
-                "trend_price": trend_price,
-                "avg_30_days": avg_30_days,
-                "available_items": available_items,
-                "min_price": current_price,
-                "last_update": datetime.now(),
-            }
-        )
+def parse_cardmarket_page(kind: str, payload: Any) -> Optional[PriceInfo]:
+    """
+    Informations de prix d'une page chargée par fetch_cardmarket_page :
+    couples libellé / valeur lus dans la page ("cardmarket_fields") ou HTML
+    ("cardmarket_html")
+    """
+    try:
+        if kind == "cardmarket_fields":
+            fields = payload
+        else:
+            fields = extract_cardmarket_fields(payload)
+        if fields is None:
+            return None
+        return price_info_from_fields(fields)
     except Exception as e:
         logger.error(f"Error parsing price info: {str(e)}")
         return None
 
 
-def get_cardmarket_price(card_url: str) -> Optional[PriceInfo]:
-    """Récupère les informations de prix d'une carte sur Cardmarket"""
-    with SB(uc=True, headless=True) as sb:
+def fetch_cardmarket_page(
+    card_url: str, pool: Optional[BrowserPool] = None
+) -> Optional[tuple[str, Any]]:
+    """
+    Charge la page produit d'une carte sur Cardmarket, sans l'analyser
+
+    Retourne ("cardmarket_fields", couples libellé / valeur lus dans la
+    page) ou, si l'extraction dans la page est désactivée ou échoue,
+    ("cardmarket_html", HTML de la page) ; None si la page n'a pas pu être
+    chargée.
+    """
+    with borrow_browser(pool, "cardmarket") as sb:
         try:
-            sb.open(card_url)
+            with metrics.stage("cardmarket_open"):
+                sb.open(card_url)
+            metrics.incr("pages_fetched", source="cardmarket")
 
             # Attendre que les infos soient chargées
-            sb.wait_for_element("#mainContent", timeout=10)
+            with metrics.stage("cardmarket_wait"):
+                sb.wait_for_element("#mainContent", timeout=10)
+
+            if in_page_extraction():
+                fields = extract_cardmarket_fields_in_page(sb)
+                if fields is not None:
+                    archive_page("cardmarket", "cardmarket_fields", card_url, fields, card_url)
+                    return "cardmarket_fields", fields
 
-            # Récupérer le contenu HTML et le parser
-            page_content = sb.get_page_source()
-            return parse_price_info(page_content)
+            with metrics.stage("cardmarket_page_source"):
+                page_content = sb.get_page_source()
+            archive_page("cardmarket", "cardmarket_html", card_url, page_content, card_url)
+            return "cardmarket_html", page_content
 
         except Exception as e:
             logger.error(f"Error getting price from Cardmarket: {str(e)}")
-            logger.error(sb.get_page_source())
+            metrics.incr("scrape_errors", source="cardmarket")
+            if logger.isEnabledFor(logging.DEBUG):
+                # Début de la page reçue (captcha, page d'erreur...)
+                try:
+                    logger.debug("Page reçue : %.2000s", sb.get_page_source())
+                except Exception:
+                    pass
             return None
+
+
+def get_cardmarket_price(
+    card_url: str, pool: Optional[BrowserPool] = None
+) -> Optional[PriceInfo]:
+    """Récupère les informations de prix d'une carte sur Cardmarket"""
+    raw = fetch_cardmarket_page(card_url, pool)
+    if raw is None:
+        return None
+    with metrics.stage("cardmarket_parse"):
+        return parse_cardmarket_page(*raw)
@@ -0,0 +1,196 @@
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Iterator, Optional
+from urllib.parse import urlparse
+
+from config import get_settings
+from models.card import Card
+from models.price_info import PriceInfo
+from scrapers.browser_pool import BrowserPool, borrow_browser
+from scrapers.cardmarket import _parse_euro
+from scrapers.html_parsers import (
+    CARDMARKET_PRODUCT_PATH,
+    CardmarketListingItem,
+    extract_cardmarket_listing,
+)
+from utils.logger import setup_logger
+from utils.metrics import metrics
+from utils.page_archive import archive_page
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+SINGLES_SEGMENT = CARDMARKET_PRODUCT_PATH.strip("/").split("/")[-1]
+
+
+def product_key(url: str) -> str:
+    """
+    Chemin d'une page produit sans préfixe de langue, pour rapprocher les
+    liens de la liste des URL du sheet (/fr/Lorcana/... et /en/Lorcana/...)
+    """
+    segments = [s for s in urlparse(url).path.lower().split("/") if s]
+    if segments and len(segments[0]) == 2:
+        segments = segments[1:]
+    return "/".join(segments)
+
+
+def configured_set_slugs() -> dict[str, str]:
+    """Correspondance code d'extension -> nom dans les URL (CARDMARKET_SET_SLUGS)"""
+    slugs = {}
+    for entry in settings.cardmarket_set_slugs.split(","):
+        code, _, slug = entry.partition(":")
+        if code.strip() and slug.strip():
+            slugs[code.strip()] = slug.strip()
+    return slugs
+
+
+def listing_base_url(cards: list[Card], slug: Optional[str] = None) -> Optional[str]:
+    """
+    URL de la liste des cartes d'une extension, déduite de l'URL produit
+    d'une de ses cartes (…/Products/Singles/<extension>/<carte>)
+    """
+    for card in cards:
+        parsed = urlparse(card.cardmarket_url)
+        segments = parsed.path.split("/")
+        if SINGLES_SEGMENT not in segments:
+            continue
+        index = segments.index(SINGLES_SEGMENT)
+        if index + 1 >= len(segments) or not (slug or segments[index + 1]):
+            continue
+        path = "/".join(segments[: index + 1] + [slug or segments[index + 1]])
+        return f"{parsed.scheme}://{parsed.netloc}{path}"
+    return None
+
+
+def needs_product_page(card: Card, today: Optional[date] = None) -> bool:
+    """
+    La carte doit-elle passer par sa page produit ?
+
+    La liste ne donne ni le prix tendance ni la moyenne 30 jours : ils sont
+    repris du sheet, et la page produit est chargée s'ils manquent ou, pour
+    chaque carte, un jour sur CARDMARKET_PRODUCT_REFRESH_DAYS (les cartes
+    sont réparties sur les jours selon leur ligne).
+    """
+    if card.trend_price is None or card.avg_30_days is None:
+        return True
+    period = settings.cardmarket_product_refresh_days
+    if period <= 0:
+        return False
+    today = today or date.today()
+    return card.row % period == today.toordinal() % period
+
+
+def listing_price_info(item: CardmarketListingItem, card: Card) -> Optional[PriceInfo]:
+    """PriceInfo d'une ligne de la liste, complété par les valeurs du sheet"""
+    try:
+        current_price = _parse_euro(item.price_text or "")
+        available_items = int((item.available_text or "0").replace(".", "") or 0)
+        return PriceInfo.model_validate(
+            {
+                "current_price": current_price,
+                "trend_price": card.trend_price,
+                "avg_30_days": card.avg_30_days,
+                "available_items": available_items,
+                "min_price": current_price,
+                "last_update": datetime.now(),
+            }
+        )
+    except ValueError as e:
+        logger.debug("Ligne ignorée pour %s : %s", card.name_fr, e)
+        return None
+
+
+def fetch_listing_page(url: str, pool: Optional[BrowserPool] = None) -> Optional[str]:
+    """Charge une page de la liste des cartes d'une extension"""
+    with borrow_browser(pool, "cardmarket") as sb:
+        try:
+            with metrics.stage("cardmarket_open"):
+                sb.open(url)
+            metrics.incr("pages_fetched", source="cardmarket")
+            with metrics.stage("cardmarket_wait"):
+                sb.wait_for_element("#mainContent", timeout=10)
+            with metrics.stage("cardmarket_page_source"):
+                page_content = sb.get_page_source()
+            archive_page("cardmarket", "cardmarket_listing", url, page_content, url)
+            return page_content
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement de la liste Cardmarket {url} : {e}")
+            metrics.incr("scrape_errors", source="cardmarket")
+            return None
+
+
+def iter_listing_pages(
+    base_url: str, max_pages: int, pool: Optional[BrowserPool] = None
+) -> Iterator[list[CardmarketListingItem]]:
+    """Parcourt les pages de la liste d'une extension jusqu'à une page vide"""
+    for page in range(1, max_pages + 1):
+        url = f"{base_url}?site={page}&perSite={settings.cardmarket_listing_per_page}"
+        page_content = fetch_listing_page(url, pool)
+        if page_content is None:
+            return
+        with metrics.stage("cardmarket_parse"):
+            items = extract_cardmarket_listing(page_content)
+        if not items:
+            return
+        yield items
+
+
+def harvest_cardmarket_prices(
+    cards: list[Card],
+    pool: Optional[BrowserPool] = None,
+    max_pages: Optional[int] = None,
+) -> dict[str, PriceInfo]:
+    """
+    Relève les prix Cardmarket des cartes depuis les listes de leurs
+    extensions (colonne Set) ; clé : URL Cardmarket de la carte
+
+    Une page de liste donne le prix « à partir de » et le nombre d'articles
+    de plusieurs dizaines de cartes. Le parcours d'une extension s'arrête dès
+    que toutes ses cartes ont été trouvées. Les cartes absentes du résultat
+    (champs manquants, rafraîchissement périodique, carte introuvable dans la
+    liste) passent par leur page produit.
+    """
+    max_pages = max_pages or settings.cardmarket_listing_max_pages
+    slugs = configured_set_slugs()
+    today = date.today()
+
+    by_set: dict[str, dict[str, Card]] = defaultdict(dict)
+    product_pages = 0
+    for card in cards:
+        if not card.cardmarket_url or not card.set_code:
+            continue
+        if needs_product_page(card, today):
+            product_pages += 1
+            continue
+        by_set[card.set_code][product_key(card.cardmarket_url)] = card
+
+    harvested: dict[str, PriceInfo] = {}
+    pages = 0
+    for set_code, wanted in by_set.items():
+        base_url = listing_base_url(list(wanted.values()), slugs.get(set_code))
+        if base_url is None:
+            logger.warning(f"Liste Cardmarket introuvable pour l'extension {set_code}")
+            continue
+        remaining = dict(wanted)
+        for items in iter_listing_pages(base_url, max_pages, pool):
+            pages += 1
+            for item in items:
+                card = remaining.pop(product_key(item.url), None)
+                if card is None:
+                    continue
+                price_info = listing_price_info(item, card)
+                if price_info is not None:
+                    harvested[card.cardmarket_url] = price_info
+            if not remaining:
+                break
+        if remaining:
+            logger.info(
+                f"Extension {set_code} : {len(remaining)} cartes absentes de la liste"
+            )
+
+    logger.info(
+        f"Listes Cardmarket : {pages} pages, {len(harvested)} cartes relevées, "
+        f"{product_pages} pages produit à charger"
+    )
+    metrics.incr("cardmarket_listing_pages", pages)
+    return harvested
@@ -0,0 +1,232 @@
+from typing import NamedTuple, Optional
+
+from config import get_settings
+from utils.logger import setup_logger
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:  # lxml est optionnel, BeautifulSoup sert de repli
+    etree = None
+    lxml_html = None
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+CARDMARKET_LABELS = (
+    "De",
+    "Tendance des prix",
+    "Prix moyen 30 jours",
+    "Articles disponibles",
+)
+VINTED_FULL_ROW_CLASS = "feed-grid__item--full-row"
+VINTED_OVERLAY_SUFFIX = "--overlay-link"
+CARDMARKET_ROW_ID_PREFIX = "productRow"
+CARDMARKET_PRODUCT_PATH = "/Products/Singles/"
+VINTED_PRICE_CLASS = "web_ui__Text__text web_ui__Text__subtitle web_ui__Text__left web_ui__Text__clickable web_ui__Text__underline-none"
+
+
+class VintedItem(NamedTuple):
+    """Annonce brute extraite d'une page de catalogue Vinted"""
+
+    title: str
+    price_text: Optional[str]
+    url: str
+
+
+class CardmarketListingItem(NamedTuple):
+    """Ligne brute d'une liste de cartes d'une extension Cardmarket"""
+
+    url: str
+    name: str
+    price_text: Optional[str]
+    available_text: Optional[str]
+
+
+if etree is not None:
+    # Sélecteurs compilés une seule fois
+    _XP_PRODUCT_ROWS = etree.XPath("//div[starts-with(@id, $prefix)]")
+    _XP_PRODUCT_LINK = etree.XPath(".//a[contains(@href, $path)][1]")
+    _XP_COL_BY_CLASS = etree.XPath(
+        ".//div[contains(concat(' ', normalize-space(@class), ' '), $cls)][1]"
+    )
+    _XP_INFO_CONTAINER = etree.XPath(
+        "//div[contains(concat(' ', normalize-space(@class), ' '), ' info-list-container ')]"
+    )
+    _XP_DD_BY_LABEL = etree.XPath("(.//dt[string() = $label])[1]/following::dd[1]")
+    _XP_FEED_ITEMS = etree.XPath(
+        "//div[contains(concat(' ', normalize-space(@class), ' '), ' feed-grid__item ')]"
+    )
+    _XP_OVERLAY_LINK = etree.XPath(
+        ".//a[substring(@data-testid, string-length(@data-testid) - $n + 1) = $suffix][1]"
+    )
+    _XP_PRICE = etree.XPath(".//span[@class = $cls][1]")
+
+
+def _slice_from(html_content: str, class_name: str) -> Optional[str]:
+    """
+    Retourne le HTML à partir de la balise ouvrante portant class_name, pour
+    ne pas analyser l'en-tête et les scripts qui la précèdent
+    """
+    index = html_content.find(class_name)
+    if index == -1:
+        return None
+    start = html_content.rfind("<", 0, index)
+    return html_content[start if start != -1 else index :]
+
+
+def _soup(fragment: str):
+    """Arbre BeautifulSoup ; bs4 n'est importé que si ce backend est utilisé"""
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(fragment, "html.parser")
+
+
+def _backend() -> str:
+    if settings.html_parser_backend == "lxml" and etree is None:
+        return "bs4"
+    return settings.html_parser_backend
+
+
+def extract_cardmarket_fields(html_content: str) -> Optional[dict[str, str]]:
+    """
+    Extrait le texte des <dd> associés aux libellés de info-list-container
+
+    Retourne None si le bloc est absent de la page.
+    """
+    fragment = _slice_from(html_content, "info-list-container")
+    if fragment is None:
+        return None
+
+    fields: dict[str, str] = {}
+    if _backend() == "lxml":
+        root = lxml_html.fromstring(fragment)
+        containers = _XP_INFO_CONTAINER(root)
+        if not containers:
+            return None
+        for label in CARDMARKET_LABELS:
+            dd = _XP_DD_BY_LABEL(containers[0], label=label)
+            if dd:
+                fields[label] = dd[0].text_content().strip()
+        return fields
+
+    soup = _soup(fragment)
+    info_container = soup.find("div", class_="info-list-container")
+    if not info_container:
+        return None
+    for label in CARDMARKET_LABELS:
+        dt = info_container.find("dt", string=label)
+        if dt:
+            dd = dt.find_next("dd")
+            if dd:
+                fields[label] = dd.get_text().strip()
+    return fields
+
+
+def _first_text(element) -> str:
+    """
+    Texte du premier <span> de l'élément, ou de l'élément lui-même
+
+    Cardmarket affiche le nombre d'articles deux fois (un <span> par taille
+    d'écran).
+    """
+    spans = element.findall(".//span")
+    return (spans[0] if spans else element).text_content().strip()
+
+
+def extract_cardmarket_listing(html_content: str) -> list[CardmarketListingItem]:
+    """
+    Extrait lien, nom, prix « à partir de » et nombre d'articles des lignes
+    d'une liste de cartes (page Singles d'une extension)
+    """
+    fragment = _slice_from(html_content, "table-body")
+    if fragment is None:
+        return []
+
+    items: list[CardmarketListingItem] = []
+    if _backend() == "lxml":
+        root = lxml_html.fromstring(fragment)
+        for row in _XP_PRODUCT_ROWS(root, prefix=CARDMARKET_ROW_ID_PREFIX):
+            link = _XP_PRODUCT_LINK(row, path=CARDMARKET_PRODUCT_PATH)
+            if not link:
+                continue
+            price = _XP_COL_BY_CLASS(row, cls=" col-price ")
+            available = _XP_COL_BY_CLASS(row, cls=" col-availability ")
+            items.append(
+                CardmarketListingItem(
+                    url=link[0].get("href", ""),
+                    name=link[0].text_content().strip(),
+                    price_text=price[0].text_content().strip() if price else None,
+                    available_text=_first_text(available[0]) if available else None,
+                )
+            )
+        return items
+
+    soup = _soup(fragment)
+    for row in soup.find_all(
+        "div", id=lambda x: x and x.startswith(CARDMARKET_ROW_ID_PREFIX)
+    ):
+        link = row.find("a", href=lambda x: x and CARDMARKET_PRODUCT_PATH in x)
+        if not link:
+            continue
+        price = row.find("div", class_="col-price")
+        available = row.find("div", class_="col-availability")
+        items.append(
+            CardmarketListingItem(
+                url=link.get("href", ""),
+                name=link.get_text().strip(),
+                price_text=price.get_text().strip() if price else None,
+                available_text=(available.find("span") or available).get_text().strip()
+                if available
+                else None,
+            )
+        )
+    return items
+
+
+def extract_vinted_items(html_content: str) -> list[VintedItem]:
+    """Extrait titre, prix et lien des annonces de la grille Vinted (hors publicités)"""
+    fragment = _slice_from(html_content, "feed-grid")
+    if fragment is None:
+        return []
+
+    items: list[VintedItem] = []
+    if _backend() == "lxml":
+        root = lxml_html.fromstring(fragment)
+        for item in _XP_FEED_ITEMS(root):
+            if VINTED_FULL_ROW_CLASS in (item.get("class") or "").split():
+                logger.debug("Ignorer l'élément full-row (probablement une publicité)")
+                continue
+            link = _XP_OVERLAY_LINK(
+                item, n=len(VINTED_OVERLAY_SUFFIX), suffix=VINTED_OVERLAY_SUFFIX
+            )
+            if not link:
+                continue
+            price = _XP_PRICE(item, cls=VINTED_PRICE_CLASS)
+            items.append(
+                VintedItem(
+                    title=link[0].get("title", ""),
+                    price_text=price[0].text_content().strip() if price else None,
+                    url=link[0].get("href", ""),
+                )
+            )
+        return items
+
+    soup = _soup(fragment)
+    for item in soup.find_all("div", class_="feed-grid__item"):
+        if VINTED_FULL_ROW_CLASS in item.get("class", []):
+            logger.debug("Ignorer l'élément full-row (probablement une publicité)")
+            continue
+        link = item.find(
+            "a", {"data-testid": lambda x: x and x.endswith(VINTED_OVERLAY_SUFFIX)}
+        )
+        if not link:
+            continue
+        price = item.find("span", class_=VINTED_PRICE_CLASS)
+        items.append(
+            VintedItem(
+                title=link.get("title", ""),
+                price_text=price.text.strip() if price else None,
+                url=link.get("href", ""),
+            )
+        )
+    return items
@@ -0,0 +1,111 @@
+from typing import Any, Optional
+
+from config import get_settings
+from scrapers.html_parsers import (
+    CARDMARKET_LABELS,
+    VINTED_FULL_ROW_CLASS,
+    VINTED_OVERLAY_SUFFIX,
+    VINTED_PRICE_CLASS,
+)
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+# Scripts exécutés dans la page (execute_script) : seuls les champs utiles
+# sont renvoyés en JSON, au lieu du DOM complet sérialisé. Ils reprennent
+# les règles des parseurs de html_parsers, qui servent de repli.
+
+# arguments : libellés recherchés ; null si le bloc est absent
+CARDMARKET_FIELDS_SCRIPT = """
+const container = document.querySelector("div.info-list-container");
+if (!container) {
+    return null;
+}
+const dts = Array.from(container.querySelectorAll("dt"));
+const fields = {};
+for (const label of arguments[0]) {
+    const dt = dts.find((el) => el.textContent === label);
+    let dd = dt ? dt.nextElementSibling : null;
+    while (dd && dd.tagName !== "DD") {
+        dd = dd.nextElementSibling;
+    }
+    if (dd) {
+        fields[label] = dd.textContent.trim();
+    }
+}
+return fields;
+"""
+
+# arguments : classe des publicités, suffixe du lien de l'annonce, classe
+# du prix ; [titre, prix, lien] par annonce, null si la grille est absente
+VINTED_ITEMS_SCRIPT = """
+const [fullRowClass, overlaySuffix, priceClass] = arguments;
+if (!document.querySelector("div.feed-grid")) {
+    return null;
+}
+const items = [];
+for (const item of document.querySelectorAll("div.feed-grid__item")) {
+    if (item.classList.contains(fullRowClass)) {
+        continue;
+    }
+    const link = item.querySelector(`a[data-testid$="${overlaySuffix}"]`);
+    if (!link) {
+        continue;
+    }
+    const price = Array.from(item.querySelectorAll("span")).find(
+        (span) => span.getAttribute("class") === priceClass
+    );
+    items.push([
+        link.getAttribute("title") || "",
+        price ? price.textContent.trim() : null,
+        link.getAttribute("href") || "",
+    ]);
+}
+return items;
+"""
+
+
+def in_page_extraction() -> bool:
+    """Les champs sont-ils extraits dans le navigateur (BROWSER_EXTRACTION=script) ?"""
+    return settings.browser_extraction == "script"
+
+
+def _run_script(sb, source: str, script: str, *args) -> Optional[Any]:
+    try:
+        with metrics.stage(f"{source}_extract"):
+            result = sb.execute_script(script, *args)
+    except Exception as e:
+        logger.debug("Extraction %s dans la page impossible : %s", source, e)
+        result = None
+    if result is None:
+        # Le HTML complet sera récupéré et analysé par les parseurs Python
+        metrics.incr("extraction_fallbacks", source=source)
+    return result
+
+
+def extract_cardmarket_fields_in_page(sb) -> Optional[dict[str, str]]:
+    """
+    Couples libellé / valeur de info-list-container, lus dans la page
+
+    Retourne None si le bloc est absent ou si le script a échoué.
+    """
+    return _run_script(sb, "cardmarket", CARDMARKET_FIELDS_SCRIPT, list(CARDMARKET_LABELS))
+
+
+def extract_vinted_items_in_page(sb) -> Optional[list[list]]:
+    """
+    [titre, prix, lien] de chaque annonce de la grille Vinted (hors
+    publicités), lus dans la page
+
+    Retourne None si la grille est absente ou si le script a échoué.
+    """
+    return _run_script(
+        sb,
+        "vinted",
+        VINTED_ITEMS_SCRIPT,
+        VINTED_FULL_ROW_CLASS,
+        VINTED_OVERLAY_SUFFIX,
+        VINTED_PRICE_CLASS,
+    )
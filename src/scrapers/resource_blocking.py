@@ -0,0 +1,85 @@
+from typing import Optional
+
+from config import get_settings
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+# Motifs d'URL bloqués par catégorie (syntaxe de Network.setBlockedURLs :
+# `*` remplace n'importe quelle suite de caractères)
+BLOCK_PROFILES: dict[str, dict[str, list[str]]] = {
+    "off": {},
+    "lean": {
+        "images": [
+            "*.png*",
+            "*.jpg*",
+            "*.jpeg*",
+            "*.gif*",
+            "*.webp*",
+            "*.avif*",
+            "*.svg*",
+            "*.ico*",
+        ],
+        "fonts": ["*.woff*", "*.ttf*", "*.otf*", "*.eot*"],
+        "css": ["*.css*"],
+        "media": ["*.mp4*", "*.webm*", "*.mp3*"],
+        "trackers": [
+            "*google-analytics.com*",
+            "*googletagmanager.com*",
+            "*googlesyndication.com*",
+            "*doubleclick.net*",
+            "*adservice.google.*",
+            "*amazon-adsystem.com*",
+            "*facebook.net*",
+            "*connect.facebook.*",
+            "*hotjar.com*",
+            "*criteo.*",
+            "*taboola.com*",
+            "*adnxs.com*",
+            "*scorecardresearch.com*",
+            "*onetrust.com*",
+            "*cookielaw.org*",
+            "*sentry.io*",
+        ],
+    },
+}
+
+
+def site_allowlist(source: str) -> set[str]:
+    """Catégories ou motifs jamais bloqués pour une source (réglages *_BLOCK_ALLOWLIST)"""
+    raw = getattr(settings, f"{source}_block_allowlist", "")
+    return {entry.strip() for entry in raw.split(",") if entry.strip()}
+
+
+def blocked_url_patterns(source: str, profile: Optional[str] = None) -> list[str]:
+    """Motifs d'URL à bloquer pour une source selon le profil de blocage"""
+    profile = profile or settings.browser_block_profile
+    if profile not in BLOCK_PROFILES:
+        logger.warning(f"Profil de blocage inconnu : {profile}, aucun blocage")
+        return []
+    allowed = site_allowlist(source)
+    return [
+        pattern
+        for category, patterns in BLOCK_PROFILES[profile].items()
+        if category not in allowed
+        for pattern in patterns
+        if pattern not in allowed
+    ]
+
+
+def apply_resource_blocking(sb, source: str):
+    """
+    Bloque dans le navigateur les ressources inutiles au scraping d'une source
+
+    Les requêtes correspondant aux motifs sont refusées par Chrome (CDP
+    Network.setBlockedURLs) avant même d'être envoyées. Appelé à chaque
+    changement de source, la liste remplaçant la précédente.
+    """
+    patterns = blocked_url_patterns(source)
+    try:
+        sb.execute_cdp_cmd("Network.enable", {})
+        sb.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        logger.debug(f"{len(patterns)} motifs d'URL bloqués pour {source}")
+    except Exception as e:
+        logger.warning(f"Blocage des ressources impossible pour {source} : {e}")
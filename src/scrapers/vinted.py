@@ -1,96 +1,196 @@
-from seleniumbase import SB
-from bs4 import BeautifulSoup
-from typing import Optional
-from datetime import datetime
-import pytz
-from models.price_info import VintedPriceInfo
+from typing import Any, Iterator, Optional
+from config import get_settings
+from models.price_info import VintedListing, VintedPriceInfo
+from scrapers.browser_pool import BrowserPool, borrow_browser
 from utils.logger import setup_logger
-from utils.string_matcher import is_title_match
+from utils.metrics import metrics
+from utils.page_archive import archive_page
+from scrapers.html_parsers import VintedItem, extract_vinted_items
+from scrapers.page_scripts import extract_vinted_items_in_page, in_page_extraction
+from scrapers.vinted_api import (
+    VintedBlockedError,
+    fetch_vinted_items_http,
+    match_vinted_api_items,
+)
+from scrapers.vinted_listings import VintedPage, VintedPriceCollector
+from utils.string_matcher import TitleMatcher
 
 logger = setup_logger(__name__)
+settings = get_settings()
+
+
+def match_vinted_listings(html_content: str, card_name: str) -> VintedPage:
+    """Annonces d'une page de recherche Vinted correspondant à la carte"""
+    return match_vinted_items(extract_vinted_items(html_content), card_name)
+
+
+def match_vinted_items(items: list[VintedItem], card_name: str) -> VintedPage:
+    """Annonces correspondant à la carte parmi celles d'une page de recherche"""
+    logger.debug("Recherche des annonces pour '%s'", card_name)
+
+    # Nettoyer les titres en ne gardant que la partie avant ", marque"
+    titles = [item.title.split(", marque")[0] for item in items]
+    matches = TitleMatcher([card_name]).title_matches(titles)
+
+    listings = []
+    for item, title, is_match in zip(items, titles, matches):
+        logger.debug("Analyse de l'annonce : %s", title)
+
+        if not is_match:
+            logger.debug("Titre non correspondant ignoré : %s", title)
+            continue
+
+        # Si le titre correspond, chercher le prix
+        logger.debug("Prix trouvé : %s", item.price_text)
+        if not item.price_text:
+            continue
+        try:
+            price = float(item.price_text.replace("€", "").replace(",", "."))
+        except ValueError:
+            logger.error(f"Impossible de convertir le prix en float : {item.price_text}")
+            continue
+        listings.append(VintedListing(title=title, price=price, url=item.url))
+
+    return VintedPage(listings, len(items))
 
 
 def parse_vinted_listings(
     html_content: str, card_name: str
 ) -> Optional[VintedPriceInfo]:
-    """Parse les annonces Vinted depuis le HTML de la page"""
+    """Parse les annonces Vinted depuis le HTML d'une page de recherche"""
     try:
-        soup = BeautifulSoup(html_content, "html.parser")
-        logger.debug(f"Recherche des annonces pour '{card_name}'")
-
-        for item in soup.find_all("div", class_="feed-grid__item"):
-            # Ignorer les éléments avec la classe feed-grid__item--full-row
-            if "feed-grid__item--full-row" in item.get("class", []):
-                logger.info("Ignorer l'élément full-row (probablement une publicité)")
-                continue
-
-            link = item.find(
-                "a", {"data-testid": lambda x: x and x.endswith("--overlay-link")}
-            )
-            if not link:
-                continue
-
-            # Nettoyer le titre en ne gardant que la partie avant ", marque"
-            full_title = link.get("title", "")
-            title = (
-                full_title.split(", marque")[0]
-                if ", marque" in full_title
-                else full_title
-            )
-            logger.debug(f"Analyse de l'annonce : {title}")
-
-            # Utiliser le nouveau système de correspondance
-            if not is_title_match(card_name, title):
-                logger.info(f"Titre non correspondant ignoré : {title}")
-                continue
-
-            # Si le titre correspond, chercher le prix
-            price_text = item.find(
-                "span",
-                class_="web_ui__Text__text web_ui__Text__subtitle web_ui__Text__left web_ui__Text__clickable web_ui__Text__underline-none",
-            )
-            logger.debug(f"Prix trouvé : {price_text}")
-            if price_text:
-                try:
-                    price = float(
-                        price_text.text.strip().replace("€", "").replace(",", ".")
-                    )
-                    logger.debug(f"Premier prix valide trouvé pour '{title}' : {price}€")
-
-                    paris_tz = pytz.timezone("Europe/Paris")
-                    current_time = datetime.now(paris_tz)
-                    item_url = link.get("href", "")
-
-                    return VintedPriceInfo(
-                        min_price=price, last_update=current_time, url=item_url
-                    )
-                except ValueError:
-                    logger.error(f"Impossible de convertir le prix en float : {price_text.text}")
-                    continue
-
-        logger.debug(f"Aucun prix trouvé sur Vinted pour la carte '{card_name}'")
-        return None
+        collector = VintedPriceCollector(settings.vinted_top_k)
+        collector.add(match_vinted_listings(html_content, card_name))
+        price_info = collector.result()
+        if price_info is None:
+            logger.debug(f"Aucun prix trouvé sur Vinted pour la carte '{card_name}'")
+        return price_info
 
     except Exception as e:
         logger.error(f"Error parsing Vinted listings: {str(e)}")
         return None
 
 
-def get_vinted_prices(card_name: str) -> Optional[VintedPriceInfo]:
-    """Récupère les prix d'une carte sur Vinted"""
-    search_url = f"https://www.vinted.fr/catalog?search_text=Lorcana+{card_name.replace(' ', '+')}&order=price_low_to_high&page=1&price_from=2&catalog[]=3224"
-    logger.debug(f"URL de recherche : {search_url}")
+def build_search_url(card_name: str, page: int = 1) -> str:
+    """URL de la recherche Vinted d'une carte, triée par prix croissant"""
+    return f"{settings.vinted_base_url}/catalog?search_text=Lorcana+{card_name.replace(' ', '+')}&order=price_low_to_high&page={page}&price_from=2&catalog[]=3224"
+
+
+def fetch_vinted_page(
+    search_url: str, pool: Optional[BrowserPool] = None
+) -> Optional[tuple[str, Any]]:
+    """
+    Charge une page de recherche Vinted dans le navigateur
 
-    with SB(uc=True, headless=True) as sb:
+    Retourne ("vinted_items", [titre, prix, lien] des annonces lus dans la
+    page) ou, si l'extraction dans la page est désactivée ou échoue,
+    ("vinted_html", HTML de la page) ; None si la page n'a pas pu être
+    chargée.
+    """
+    with borrow_browser(pool, "vinted") as sb:
         try:
-            sb.open(search_url)
-            sb.wait_for_element("div.feed-grid", timeout=20)
-            page_content = sb.get_page_source()
-
-            vintedPriceInfo = parse_vinted_listings(page_content, card_name)
-            if vintedPriceInfo:
-                vintedPriceInfo.urlSearch = search_url
-            return vintedPriceInfo
+            with metrics.stage("vinted_open"):
+                sb.open(search_url)
+            metrics.incr("pages_fetched", source="vinted")
+            with metrics.stage("vinted_wait"):
+                sb.wait_for_element("div.feed-grid", timeout=20)
+            if in_page_extraction():
+                items = extract_vinted_items_in_page(sb)
+                if items is not None:
+                    return "vinted_items", items
+            with metrics.stage("vinted_page_source"):
+                return "vinted_html", sb.get_page_source()
         except Exception as e:
             logger.error(f"Error getting prices from Vinted: {str(e)}")
+            metrics.incr("scrape_errors", source="vinted")
+            return None
+
+
+def fetch_vinted_search_page(
+    card_name: str, page: int, pool: Optional[BrowserPool] = None
+) -> Optional[tuple[str, Any]]:
+    """
+    Charge une page de la recherche d'une carte, sans l'analyser
+
+    Retourne ("vinted_api", annonces JSON), ("vinted_items", annonces lues
+    dans la page) ou ("vinted_html", HTML de la page), ou None si la page
+    n'a pas pu être chargée. En mode "http",
+    l'API du catalogue est interrogée directement ; le navigateur n'est
+    utilisé que si Vinted bloque la requête.
+    """
+    search_url = build_search_url(card_name, page)
+    raw = None
+    if settings.vinted_fetch_mode == "http":
+        try:
+            raw = ("vinted_api", fetch_vinted_items_http(card_name, page))
+        except VintedBlockedError as e:
+            logger.warning(f"Accès HTTP à Vinted refusé ({e}), utilisation du navigateur")
+            metrics.incr("vinted_browser_fallbacks")
+    if raw is None:
+        raw = fetch_vinted_page(search_url, pool)
+        if raw is None:
             return None
+    archive_page("vinted", raw[0], card_name, raw[1], search_url, page)
+    return raw
+
+
+def match_vinted_page(kind: str, payload: Any, card_name: str) -> VintedPage:
+    """Annonces correspondant à la carte sur une page chargée par fetch_vinted_search_page"""
+    if kind == "vinted_api":
+        return match_vinted_api_items(payload, card_name)
+    if kind == "vinted_items":
+        return match_vinted_items([VintedItem(*item) for item in payload], card_name)
+    return match_vinted_listings(payload, card_name)
+
+
+def iter_vinted_pages(
+    card_name: str, pool: Optional[BrowserPool] = None, max_pages: Optional[int] = None
+) -> Iterator[VintedPage]:
+    """
+    Parcourt les pages de résultats de la recherche d'une carte
+
+    Chaque page n'est chargée que lorsqu'elle est demandée : il suffit
+    d'arrêter l'itération pour ne pas charger les suivantes.
+    """
+    for page in range(1, (max_pages or settings.vinted_max_pages) + 1):
+        raw = fetch_vinted_search_page(card_name, page, pool)
+        if raw is None:
+            return
+        with metrics.stage("vinted_parse"):
+            vinted_page = match_vinted_page(*raw, card_name)
+        yield vinted_page
+        if vinted_page.last or not vinted_page.size:
+            return
+
+
+def get_vinted_prices(
+    card_name: str, pool: Optional[BrowserPool] = None
+) -> Optional[VintedPriceInfo]:
+    """
+    Récupère les prix d'une carte sur Vinted
+
+    Les pages de résultats (triés par prix croissant) sont parcourues
+    jusqu'à connaître les VINTED_TOP_K annonces correspondantes les moins
+    chères, dans la limite de VINTED_MAX_PAGES.
+    """
+    search_url = build_search_url(card_name)
+    logger.debug(f"URL de recherche : {search_url}")
+
+    collector = VintedPriceCollector(
+        settings.vinted_top_k, stop_early=not settings.vinted_full_stats
+    )
+    for vinted_page in iter_vinted_pages(card_name, pool):
+        collector.add(vinted_page)
+        if collector.complete:
+            break
+
+    vintedPriceInfo = collector.result(search_url)
+    if vintedPriceInfo is None:
+        logger.debug(f"Aucun prix trouvé sur Vinted pour la carte '{card_name}'")
+    else:
+        logger.debug(
+            f"{vintedPriceInfo.listing_count} annonces pour '{card_name}' sur "
+            f"{collector.pages} pages{'' if collector.exhausted else ' (échantillon)'}, "
+            f"médiane {vintedPriceInfo.median_price}€"
+        )
+    return vintedPriceInfo
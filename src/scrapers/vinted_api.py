@@ -0,0 +1,176 @@
+import threading
+from functools import lru_cache
+from typing import Optional
+
+from config import get_settings
+from models.price_info import VintedListing, VintedPriceInfo
+from scrapers.vinted_listings import VintedPage, VintedPriceCollector
+from utils.logger import setup_logger
+from utils.metrics import metrics
+from utils.string_matcher import TitleMatcher
+
+logger = setup_logger(__name__)
+
+CATALOG_ID = 3224
+PAGE_SIZE = 96
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36"
+    ),
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "fr-FR,fr;q=0.9",
+}
+
+
+class VintedBlockedError(Exception):
+    """Vinted refuse l'accès HTTP direct (anti-bot, quota, session invalide)"""
+
+
+class VintedApiClient:
+    """
+    Client HTTP pour le catalogue Vinted, sans navigateur
+
+    Une visite de la page d'accueil fournit les cookies de session
+    (access_token_web) nécessaires à l'API ; elle est refaite une fois si
+    l'API répond 401.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 10, pool_size: int = 10):
+        # requests n'est importé qu'à la création du client (mode "http")
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._bootstrap_lock = threading.Lock()
+        self._bootstrapped = False
+
+    def _bootstrap(self, force: bool = False):
+        """Récupère les cookies de session depuis la page d'accueil"""
+        with self._bootstrap_lock:
+            if self._bootstrapped and not force:
+                return
+            if force:
+                self.session.cookies.clear()
+            with metrics.stage("vinted_http_bootstrap"):
+                response = self.session.get(f"{self.base_url}/", timeout=self.timeout)
+            if response.status_code in (403, 429):
+                raise VintedBlockedError(f"page d'accueil : HTTP {response.status_code}")
+            self._bootstrapped = True
+
+    def search(
+        self,
+        search_text: str,
+        page: int = 1,
+        per_page: int = PAGE_SIZE,
+        order: str = "price_low_to_high",
+    ) -> list[dict]:
+        """Retourne une page d'annonces du catalogue Lorcana"""
+        import requests
+
+        params = {
+            "search_text": search_text,
+            "catalog_ids": CATALOG_ID,
+            "order": order,
+            "price_from": 2,
+            "page": page,
+            "per_page": per_page,
+        }
+        try:
+            self._bootstrap()
+            for attempt in range(2):
+                with metrics.stage("vinted_http"):
+                    response = self.session.get(
+                        f"{self.base_url}/api/v2/catalog/items",
+                        params=params,
+                        timeout=self.timeout,
+                    )
+                metrics.incr("pages_fetched", source="vinted_api")
+                if response.status_code == 401 and attempt == 0:
+                    logger.debug("Session Vinted expirée, nouvelle initialisation")
+                    metrics.incr("retries", source="vinted_api")
+                    self._bootstrap(force=True)
+                    continue
+                break
+        except requests.RequestException as e:
+            raise VintedBlockedError(f"erreur réseau : {e}") from e
+
+        if response.status_code != 200:
+            raise VintedBlockedError(f"HTTP {response.status_code}")
+        try:
+            payload = response.json()
+        except ValueError as e:
+            raise VintedBlockedError("réponse non JSON (captcha ?)") from e
+        return payload.get("items", [])
+
+
+@lru_cache()
+def get_vinted_client() -> VintedApiClient:
+    """Retourne le client HTTP Vinted partagé"""
+    settings = get_settings()
+    return VintedApiClient(settings.vinted_base_url)
+
+
+def item_price(item: dict) -> Optional[float]:
+    """Extrait le prix d'une annonce ({"amount": "3.5"} ou "3,50")"""
+    price = item.get("price")
+    if isinstance(price, dict):
+        price = price.get("amount")
+    if price is None:
+        return None
+    try:
+        return float(str(price).replace("€", "").replace(",", ".").strip())
+    except ValueError:
+        return None
+
+
+def match_vinted_api_items(
+    items: list[dict], card_name: str, per_page: int = PAGE_SIZE
+) -> VintedPage:
+    """Annonces de l'API correspondant à la carte, dans l'ordre des résultats"""
+    titles = [item.get("title", "").split(", marque")[0] for item in items]
+    matches = TitleMatcher([card_name]).title_matches(titles)
+
+    listings = []
+    for item, title, is_match in zip(items, titles, matches):
+        if not is_match:
+            logger.debug("Titre non correspondant ignoré : %s", title)
+            continue
+
+        price = item_price(item)
+        if price is None:
+            logger.error(f"Impossible de convertir le prix en float : {item.get('price')}")
+            continue
+        listings.append(VintedListing(title=title, price=price, url=item.get("url", "")))
+
+    return VintedPage(listings, len(items), last=len(items) < per_page)
+
+
+def parse_vinted_api_items(
+    items: list[dict], card_name: str
+) -> Optional[VintedPriceInfo]:
+    """Annonce la moins chère d'une page de l'API, comme parse_vinted_listings"""
+    collector = VintedPriceCollector(get_settings().vinted_top_k)
+    collector.add(match_vinted_api_items(items, card_name))
+    price_info = collector.result()
+    if price_info is None:
+        logger.debug(f"Aucun prix trouvé sur Vinted pour la carte '{card_name}'")
+    return price_info
+
+
+def fetch_vinted_items_http(card_name: str, page: int = 1) -> list[dict]:
+    """
+    Annonces brutes d'une page de la recherche d'une carte via l'API du
+    catalogue Vinted
+
+    Lève VintedBlockedError si Vinted refuse la requête.
+    """
+    return get_vinted_client().search(
+        f"Lorcana {card_name}", page=page, per_page=PAGE_SIZE
+    )
@@ -0,0 +1,316 @@
+import json
+import os
+import re
+import time
+from datetime import datetime
+from typing import Iterator, NamedTuple, Optional
+
+import pytz
+
+from config import get_settings
+from models.card import Card
+from models.price_info import VintedPriceInfo
+from scrapers.browser_pool import BrowserPool, borrow_browser
+from scrapers.html_parsers import VintedItem, extract_vinted_items
+from scrapers.page_scripts import extract_vinted_items_in_page, in_page_extraction
+from scrapers.vinted import build_search_url
+from scrapers.vinted_api import VintedBlockedError, get_vinted_client, item_price
+from utils.durations import parse_duration
+from utils.logger import setup_logger
+from utils.metrics import metrics
+from utils.page_archive import archive_page
+from utils.string_matcher import TitleMatcher
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+ITEM_ID_RE = re.compile(r"/items/(\d+)")
+
+
+class HarvestedListing(NamedTuple):
+    """Annonce du catalogue Lorcana récupérée pendant une moisson"""
+
+    id: str
+    title: str
+    price: float
+    url: str
+
+
+class HarvestState:
+    """
+    État persistant entre deux moissons : annonces déjà vues, meilleure
+    annonce connue par carte et cartes dont le catalogue a été entièrement
+    parcouru depuis qu'elles sont suivies (`covered`)
+    """
+
+    def __init__(self, path: str, max_seen: int = 50000):
+        self.path = path
+        self.max_seen = max_seen
+        self.seen: dict[str, float] = {}
+        self.best: dict[str, dict] = {}
+        self.covered: set[str] = set()
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                self.seen = data.get("seen", {})
+                self.best = data.get("best", {})
+                self.covered = set(data.get("covered", []))
+            except (OSError, ValueError) as e:
+                logger.warning(f"État de moisson Vinted illisible, il sera recréé : {e}")
+
+    def save(self):
+        """Enregistre l'état en ne gardant que les annonces vues le plus récemment"""
+        if len(self.seen) > self.max_seen:
+            recent = sorted(self.seen.items(), key=lambda kv: kv[1])[-self.max_seen :]
+            self.seen = dict(recent)
+        state_dir = os.path.dirname(self.path)
+        if state_dir and not os.path.exists(state_dir):
+            os.makedirs(state_dir)
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"seen": self.seen, "best": self.best, "covered": sorted(self.covered)},
+                    f,
+                )
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Impossible d'enregistrer l'état de moisson Vinted : {e}")
+
+
+def _listing_id(listing: dict) -> Optional[int]:
+    """Identifiant numérique d'une meilleure annonce (URL pour les anciens états)"""
+    listing_id = listing.get("id") or ""
+    if not listing_id:
+        match = ITEM_ID_RE.search(listing.get("url", ""))
+        listing_id = match.group(1) if match else ""
+    return int(listing_id) if listing_id.isdigit() else None
+
+
+def expired_listings(
+    best: dict[str, dict], pages: list[list[HarvestedListing]], order: str
+) -> list[str]:
+    """
+    Cartes dont la meilleure annonce retenue a disparu du catalogue
+
+    Les pages parcourues forment le début du catalogue trié : une annonce qui
+    devrait s'y trouver selon le tri mais n'y figure plus a été vendue ou
+    retirée. En newest_first, c'est le cas d'une annonce plus récente
+    (identifiant plus grand) que toutes celles de la dernière page ; en tri
+    par prix, d'une annonce strictement à l'intérieur de la plage de prix
+    parcourue. Les autres tris ne permettent pas de conclure.
+    """
+    if not pages or not pages[-1]:
+        return []
+    present = {listing.id for listings in pages for listing in listings}
+    prices = [listing.price for listings in pages for listing in listings]
+
+    if order == "newest_first":
+        last_ids = [int(listing.id) for listing in pages[-1] if listing.id.isdigit()]
+        if not last_ids:
+            return []
+        boundary = max(last_ids)
+
+        def covered(listing: dict) -> bool:
+            listing_id = _listing_id(listing)
+            return listing_id is not None and listing_id > boundary
+
+    elif order == "price_low_to_high":
+        ceiling = max(prices)
+
+        def covered(listing: dict) -> bool:
+            return listing["price"] < ceiling
+
+    elif order == "price_high_to_low":
+        floor = min(prices)
+
+        def covered(listing: dict) -> bool:
+            return listing["price"] > floor
+
+    else:
+        return []
+
+    return [
+        name
+        for name, listing in best.items()
+        if covered(listing) and str(_listing_id(listing)) not in present
+    ]
+
+
+def build_catalog_url(page: int, order: str) -> str:
+    """URL d'une page du catalogue Lorcana complet"""
+    return f"{settings.vinted_base_url}/catalog?order={order}&page={page}&price_from=2&catalog[]=3224"
+
+
+def _fetch_page_browser(
+    page: int, order: str, pool: Optional[BrowserPool]
+) -> list[HarvestedListing]:
+    listings = []
+    catalog_url = build_catalog_url(page, order)
+    with borrow_browser(pool, "vinted") as sb:
+        with metrics.stage("vinted_open"):
+            sb.open(catalog_url)
+        metrics.incr("pages_fetched", source="vinted")
+        with metrics.stage("vinted_wait"):
+            sb.wait_for_element("div.feed-grid", timeout=20)
+        raw_items = extract_vinted_items_in_page(sb) if in_page_extraction() else None
+        if raw_items is None:
+            with metrics.stage("vinted_page_source"):
+                page_content = sb.get_page_source()
+    if raw_items is not None:
+        archive_page("vinted", "vinted_catalog_items", "", raw_items, catalog_url, page)
+        items = [VintedItem(*item) for item in raw_items]
+    else:
+        archive_page("vinted", "vinted_catalog_html", "", page_content, catalog_url, page)
+        items = extract_vinted_items(page_content)
+    for item in items:
+        match = ITEM_ID_RE.search(item.url)
+        if not item.price_text or not match:
+            continue
+        try:
+            price = float(item.price_text.replace("€", "").replace(",", "."))
+        except ValueError:
+            continue
+        listings.append(
+            HarvestedListing(match.group(1), item.title.split(", marque")[0], price, item.url)
+        )
+    return listings
+
+
+def _fetch_page(
+    page: int, order: str, pool: Optional[BrowserPool]
+) -> list[HarvestedListing]:
+    """Récupère une page du catalogue par l'API, ou par le navigateur si bloqué"""
+    if settings.vinted_fetch_mode == "http":
+        try:
+            items = get_vinted_client().search("", page=page, order=order)
+            archive_page(
+                "vinted", "vinted_catalog_api", "", items, build_catalog_url(page, order), page
+            )
+            listings = []
+            for item in items:
+                price = item_price(item)
+                if price is None:
+                    continue
+                listings.append(
+                    HarvestedListing(
+                        str(item.get("id", "")),
+                        item.get("title", "").split(", marque")[0],
+                        price,
+                        item.get("url", ""),
+                    )
+                )
+            return listings
+        except VintedBlockedError as e:
+            logger.warning(f"Accès HTTP à Vinted refusé ({e}), utilisation du navigateur")
+            metrics.incr("vinted_browser_fallbacks")
+    return _fetch_page_browser(page, order, pool)
+
+
+def iter_catalog_pages(
+    max_pages: int, order: str, pool: Optional[BrowserPool] = None
+) -> Iterator[list[HarvestedListing]]:
+    """Parcourt les pages du catalogue Lorcana jusqu'à une page vide"""
+    for page in range(1, max_pages + 1):
+        try:
+            listings = _fetch_page(page, order, pool)
+        except Exception as e:
+            logger.error(f"Erreur lors de la moisson Vinted (page {page}): {e}")
+            return
+        if not listings:
+            return
+        yield listings
+
+
+def harvest_vinted_prices(
+    cards: list[Card],
+    pool: Optional[BrowserPool] = None,
+    max_pages: Optional[int] = None,
+    order: Optional[str] = None,
+) -> dict[str, VintedPriceInfo]:
+    """
+    Parcourt le catalogue Lorcana complet et retourne la meilleure annonce de
+    chaque carte suivie (clé : nom FR)
+
+    Chaque page d'annonces est comparée en un seul lot à toutes les cartes
+    suivies (TitleMatcher), annonces déjà vues comprises. La moisson s'arrête
+    dès qu'une page ne contient que des annonces déjà vues, sauf si une carte
+    n'est pas couverte (nouvellement suivie, ou dont la meilleure annonce a
+    été retirée) : le catalogue est alors parcouru jusqu'à max_pages pour
+    retrouver ses annonces encore en vente. Les meilleures annonces sont
+    retenues pendant VINTED_HARVEST_LISTING_MAX_AGE après leur dernier
+    relevé, sauf si elles manquent aux pages parcourues alors qu'elles
+    devraient y figurer (expired_listings).
+    """
+    max_pages = max_pages or settings.vinted_harvest_max_pages
+    order = order or settings.vinted_harvest_order
+    state = HarvestState(settings.vinted_harvest_state_path)
+    tracked = {card.name_fr for card in cards}
+    matcher = TitleMatcher(sorted(tracked))
+    max_age = parse_duration(settings.vinted_harvest_listing_max_age).total_seconds()
+
+    now = time.time()
+    best: dict[str, dict] = {
+        name: listing
+        for name, listing in state.best.items()
+        if name in tracked and now - listing["seen_at"] < max_age
+    }
+    # Cartes dont la meilleure annonce a vieilli : à rechercher à nouveau
+    covered = (state.covered & tracked) - (set(state.best) - set(best))
+    full_scan = bool(tracked - covered)
+    if full_scan:
+        logger.info(
+            f"{len(tracked - covered)} cartes à rechercher dans tout le catalogue Vinted"
+        )
+
+    pages: list[list[HarvestedListing]] = []
+    for listings in iter_catalog_pages(max_pages, order, pool):
+        pages.append(listings)
+        seen_page = all(listing.id in state.seen for listing in listings)
+
+        matches = matcher.match([listing.title for listing in listings])
+        for listing, names in zip(listings, matches):
+            state.seen[listing.id] = now
+            for name in names:
+                current = best.get(name)
+                if current is not None and current.get("id") == listing.id:
+                    # Annonce retenue toujours en vente : relevé rafraîchi
+                    current.update(price=listing.price, seen_at=now)
+                elif current is None or listing.price < current["price"]:
+                    best[name] = {
+                        "id": listing.id,
+                        "price": listing.price,
+                        "url": listing.url,
+                        "seen_at": now,
+                    }
+
+        if seen_page and not full_scan:
+            logger.info(f"Page {len(pages)} déjà vue, fin de la moisson Vinted")
+            break
+
+    expired = expired_listings(best, pages, order)
+    for name in expired:
+        del best[name]
+    if expired:
+        logger.info(f"{len(expired)} meilleures annonces Vinted disparues du catalogue")
+
+    state.best = best
+    # Après un parcours complet, toutes les cartes suivies sont couvertes ;
+    # celles dont l'annonce a disparu devront être recherchées à nouveau
+    state.covered = (tracked if full_scan else covered) - set(expired)
+    state.save()
+    logger.info(
+        f"Moisson Vinted : {len(pages)} pages, {len(best)} cartes avec une annonce"
+    )
+
+    paris_tz = pytz.timezone("Europe/Paris")
+    return {
+        name: VintedPriceInfo(
+            min_price=listing["price"],
+            last_update=datetime.fromtimestamp(listing["seen_at"], paris_tz),
+            url=listing["url"],
+            urlSearch=build_search_url(name),
+        )
+        for name, listing in best.items()
+    }
@@ -0,0 +1,81 @@
+import statistics
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+import pytz
+
+from models.price_info import VintedListing, VintedPriceInfo
+
+
+class VintedPage(NamedTuple):
+    """Annonces correspondant à la carte sur une page de résultats"""
+
+    listings: list[VintedListing]
+    size: int  # nombre total d'annonces de la page, correspondantes ou non
+    last: bool = False  # dernière page des résultats
+
+
+class VintedPriceCollector:
+    """
+    Accumule les annonces correspondant à une carte, page après page
+
+    Les résultats étant triés par prix croissant, aucune annonce moins chère
+    ne peut apparaître sur les pages suivantes une fois top_k annonces
+    trouvées : `complete` indique alors qu'il est inutile de charger la page
+    suivante. La dernière page des résultats termine aussi la recherche.
+
+    Le nombre d'annonces, la médiane et le premier quartile ne portent que
+    sur les pages chargées : après un arrêt anticipé, ils décrivent les
+    annonces les moins chères et sous-estiment la répartition réelle des
+    prix. Avec stop_early=False, la recherche continue jusqu'à la dernière
+    page des résultats (dans la limite de pages de l'appelant).
+    """
+
+    def __init__(self, top_k: int = 5, stop_early: bool = True):
+        self.top_k = max(1, top_k)
+        self.stop_early = stop_early
+        self.pages = 0
+        self.exhausted = False
+        self._listings: list[VintedListing] = []
+        self._urls: set[str] = set()
+
+    def add(self, page: VintedPage):
+        self.pages += 1
+        if page.last or page.size == 0:
+            self.exhausted = True
+        for listing in page.listings:
+            # Une annonce peut glisser d'une page à l'autre entre deux chargements
+            if listing.url in self._urls:
+                continue
+            self._urls.add(listing.url)
+            self._listings.append(listing)
+
+    @property
+    def complete(self) -> bool:
+        if self.exhausted:
+            return True
+        return self.stop_early and len(self._listings) >= self.top_k
+
+    def result(self, search_url: Optional[str] = None) -> Optional[VintedPriceInfo]:
+        """Annonce la moins chère et répartition des prix, ou None si aucune annonce"""
+        if not self._listings:
+            return None
+        listings = sorted(self._listings, key=lambda listing: listing.price)
+        prices = [listing.price for listing in listings]
+        p25 = (
+            statistics.quantiles(prices, n=4, method="inclusive")[0]
+            if len(prices) > 1
+            else prices[0]
+        )
+        return VintedPriceInfo(
+            min_price=prices[0],
+            last_update=datetime.now(pytz.timezone("Europe/Paris")),
+            url=listings[0].url,
+            urlSearch=search_url,
+            listing_count=len(prices),
+            median_price=round(statistics.median(prices), 2),
+            p25_price=round(p25, 2),
+            pages_sampled=self.pages,
+            all_pages=self.exhausted,
+            top_listings=listings[: self.top_k],
+        )
@@ -1,22 +1,28 @@
 from datetime import datetime
+import hashlib
+import json
+import threading
+import time
 import pytz
-from typing import List
+from typing import Any, List, Optional
 from pydantic import BaseModel
-from googleapiclient.discovery import build
-from google.oauth2 import service_account
 from urllib.parse import urlparse
 
+from config import get_settings
 from models.price_info import PriceInfo, VintedPriceInfo
 from models.card import Card
 from utils.logger import setup_logger
+from utils.metrics import metrics
 
 logger = setup_logger(__name__)
+settings = get_settings()
 
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
 # Indices des colonnes dans le Google Sheet
 COL_NAME_EN = 0
 COL_NAME_FR = 1
+COL_SET = 2
 COL_CARDMARKET_URL = 8
 COL_CURRENT_PRICE = 9  # J - Prix actuel
 COL_TREND_PRICE = 10  # K - Prix tendance
@@ -29,6 +35,57 @@ COL_VINTED_LAST_UPDATE = 16  # Q - Dernière MAJ Vinted
 COL_VINTED_URL = 17  # R - URL Vinted
 COL_VINTED_URL_SEARCH = 18  # S - URL de recherche Vinted
 
+# Plages lues par get_cards_to_track : les colonnes D à H ne sont pas utilisées
+NAME_COLUMNS = "A2:C"
+PRICE_COLUMNS = "I2:S"
+NAME_COLUMNS_WIDTH = 3
+PRICE_COLUMNS_START = COL_CARDMARKET_URL
+
+# Cellules écrites par update_card_prices et update_vinted_price
+WRITTEN_COLUMNS = (
+    COL_CURRENT_PRICE,
+    COL_TREND_PRICE,
+    COL_AVG_30_DAYS,
+    COL_AVAILABLE_ITEMS,
+    COL_MIN_PRICE,
+    COL_LAST_UPDATE,
+    COL_VINTED_MIN,
+    COL_VINTED_LAST_UPDATE,
+    COL_VINTED_URL,
+    COL_VINTED_URL_SEARCH,
+)
+
+# Colonne de chaque champ des enregistrements de carte (storage.base.FIELDS)
+FIELD_COLUMNS = {
+    "name_en": COL_NAME_EN,
+    "name_fr": COL_NAME_FR,
+    "set_code": COL_SET,
+    "cardmarket_url": COL_CARDMARKET_URL,
+    "current_price": COL_CURRENT_PRICE,
+    "trend_price": COL_TREND_PRICE,
+    "avg_30_days": COL_AVG_30_DAYS,
+    "available_items": COL_AVAILABLE_ITEMS,
+    "min_price": COL_MIN_PRICE,
+    "last_update": COL_LAST_UPDATE,
+    "vinted_min": COL_VINTED_MIN,
+    "vinted_last_update": COL_VINTED_LAST_UPDATE,
+    "vinted_url": COL_VINTED_URL,
+    "vinted_url_search": COL_VINTED_URL_SEARCH,
+}
+TEXT_FIELDS = (
+    "name_en",
+    "name_fr",
+    "set_code",
+    "cardmarket_url",
+    "vinted_url",
+    "vinted_url_search",
+)
+DATETIME_FIELDS = ("last_update", "vinted_last_update")
+SHEET_DATETIME_FORMAT = "%d/%m/%Y %H:%M:%S"
+
+# Le client googleapiclient (httplib2) n'est pas thread-safe
+_api_lock = threading.Lock()
+
 
 class CardToTrack(BaseModel):
     """Représente une carte à suivre"""
@@ -38,12 +95,37 @@ class CardToTrack(BaseModel):
 
 
 def get_google_sheets_service(credentials_file: str):
-    """Initialise le service Google Sheets"""
+    """
+    Initialise le service Google Sheets
+
+    Le client est construit à partir du document de découverte fourni avec
+    google-api-python-client, sans le télécharger ; la bibliothèque n'est
+    importée qu'ici.
+    """
+    from google.oauth2 import service_account
+    from googleapiclient.discovery import build
+
     SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
     credentials = service_account.Credentials.from_service_account_file(
         credentials_file, scopes=SCOPES
     )
-    return build("sheets", "v4", credentials=credentials)
+    return build(
+        "sheets",
+        "v4",
+        credentials=credentials,
+        static_discovery=True,
+        cache_discovery=False,
+    )
+
+
+def _execute(request):
+    """Exécute une requête Google API en sérialisant les appels entre threads"""
+    # methodId : "sheets.spreadsheets.values.batchUpdate" -> "batchUpdate"
+    method = getattr(request, "methodId", "") or "unknown"
+    metrics.incr("sheets_api_calls", method=method.rsplit(".", 1)[-1])
+    with _api_lock:
+        with metrics.stage("sheets_api"):
+            return request.execute()
 
 
 def get_sheet_id(sheets_url: str) -> str:
@@ -52,49 +134,341 @@ def get_sheet_id(sheets_url: str) -> str:
     return path.split("/")[3]
 
 
-def get_cards_to_track(service, sheet_id: str, sheet_name: str) -> List[Card]:
-    """Récupère la liste des cartes à suivre depuis le Google Sheet"""
+def _parse_price(row: list, col: int) -> Optional[float]:
+    """Convertit une cellule de prix au format européen (12,50 €) en float"""
     try:
-        result = (
-            service.spreadsheets()
-            .values()
-            .get(
-                spreadsheetId=sheet_id,
-                range=f"{sheet_name}!A2:S",
-            )
-            .execute()
-        )
+        value = row[col]
+        if not value:
+            return None
+        return float(str(value).replace("€", "").replace(",", ".").strip())
+    except (ValueError, IndexError):
+        return None
 
-        rows = result.get("values", [])
-        cards = []
 
-        for i, row in enumerate(rows, start=2):
-            # Conversion du prix avec gestion des erreurs
+def _parse_datetime(row: list, col: int) -> Optional[datetime]:
+    """Convertit une cellule de date (JJ/MM/AAAA HH:MM:SS, heure de Paris)"""
+    try:
+        value = row[col]
+        if not value:
+            return None
+        paris_tz = pytz.timezone("Europe/Paris")
+        return paris_tz.localize(datetime.strptime(value.strip(), "%d/%m/%Y %H:%M:%S"))
+    except (ValueError, IndexError):
+        return None
+
+
+def _normalize_cell(value: Any) -> Any:
+    """Valeur comparable d'une cellule : "12,50 €" (lu) et 12.5 (écrit) sont égaux"""
+    if value is None or value == "":
+        return ""
+    if isinstance(value, (int, float)):
+        return round(float(value), 2)
+    text = str(value).strip()
+    try:
+        return round(float("".join(text.replace("€", "").split()).replace(",", ".")), 2)
+    except ValueError:
+        return text
+
+
+class SheetSnapshot:
+    """
+    Dernières valeurs connues des cellules écrites, ligne par ligne
+
+    Remplie par get_cards_to_track puis à chaque écriture : les fonctions
+    de mise à jour n'envoient que les cellules dont la valeur a changé.
+    """
+
+    def __init__(self):
+        self._rows: dict[int, dict[int, Any]] = {}
+        self._lock = threading.Lock()
+
+    def update(self, row: int, cells: dict[int, Any]):
+        """Mémorise les valeurs lues ou écrites pour une ligne"""
+        with self._lock:
+            known = self._rows.setdefault(row, {})
+            for col, value in cells.items():
+                known[col] = _normalize_cell(value)
+
+    def changed(self, row: int, cells: dict[int, Any]) -> dict[int, Any]:
+        """Cellules dont la valeur diffère de la dernière valeur connue"""
+        with self._lock:
+            known = self._rows.get(row, {})
+            return {
+                col: value
+                for col, value in cells.items()
+                if col not in known or known[col] != _normalize_cell(value)
+            }
+
+
+def _column_letter(col: int) -> str:
+    return chr(65 + col)
+
+
+def _row_ranges(sheet_name: str, row: int, cells: dict[int, Any]) -> list[dict]:
+    """Plages à écrire pour des cellules d'une ligne, les colonnes voisines étant regroupées"""
+    groups: list[list[int]] = []
+    for col in sorted(cells):
+        if groups and groups[-1][-1] == col - 1:
+            groups[-1].append(col)
+        else:
+            groups.append([col])
+    return [
+        {
+            "range": f"{sheet_name}!{_column_letter(cols[0])}{row}:{_column_letter(cols[-1])}{row}",
+            "values": [[cells[col] for col in cols]],
+        }
+        for cols in groups
+    ]
+
+
+def _changed_ranges(
+    sheet_name: str,
+    row: int,
+    cells: dict[int, Any],
+    timestamp_col: int,
+    timestamp: str,
+    snapshot: Optional[SheetSnapshot],
+) -> list[dict]:
+    """
+    Plages à écrire pour une mise à jour de ligne
+
+    Sans snapshot, toutes les cellules sont écrites. Avec un snapshot, seules
+    les cellules modifiées le sont, et la date n'est écrite que si une valeur
+    a changé (SHEET_TIMESTAMP_POLICY=changed) ou à chaque relevé (always).
+    """
+    if snapshot is None:
+        changed = dict(cells)
+    else:
+        changed = snapshot.changed(row, cells)
+        metrics.incr("sheet_cells_unchanged", len(cells) - len(changed))
+    if changed or snapshot is None or settings.sheet_timestamp_policy == "always":
+        changed[timestamp_col] = timestamp
+    if snapshot is not None:
+        snapshot.update(row, changed)
+    metrics.incr("sheet_cells_written", len(changed))
+    return _row_ranges(sheet_name, row, changed)
+
+
+class SheetWriteBuffer:
+    """
+    Accumule les écritures du Google Sheet pour les envoyer par lots
+
+    Les cellules sont envoyées en un seul batchUpdate et l'historique en un
+    seul append par onglet, dès que max_rows écritures sont en attente ou que
+    max_seconds se sont écoulées depuis le dernier envoi, puis à la fermeture.
+
+    Avec un journal (RunJournal), chaque écriture mise en attente et chaque
+    envoi réussi y sont enregistrés, pour rejouer après un arrêt brutal les
+    écritures jamais envoyées.
+    """
+
+    def __init__(
+        self,
+        service,
+        sheet_id: str,
+        max_rows: int = 200,
+        max_seconds: float = 60,
+        journal=None,
+    ):
+        self.service = service
+        self.sheet_id = sheet_id
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self._updates: list[dict] = []
+        self._history: dict[str, list[list]] = {}
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self.journal = journal
+        self.api_calls = 0
+
+    def add_update(self, data: list[dict]):
+        """Ajoute des plages à écrire ({"range": ..., "values": ...})"""
+        with self._lock:
+            self._updates.extend(data)
+            if self.journal is not None:
+                self.journal.record_write("update", data)
+        self._flush_if_needed()
+
+    def add_history_row(self, history_sheet_name: str, row: list):
+        """Ajoute une ligne à insérer dans l'onglet d'historique"""
+        with self._lock:
+            self._history.setdefault(history_sheet_name, []).append(row)
+            if self.journal is not None:
+                self.journal.record_write(f"history:{history_sheet_name}", row)
+        self._flush_if_needed()
+
+    def replay(self, writes: list[tuple[str, Any]]):
+        """
+        Remet en attente des écritures issues du journal
+
+        Elles y figurent déjà : le prochain envoi réussi les marquera envoyées.
+        """
+        with self._lock:
+            for kind, payload in writes:
+                if kind == "update":
+                    self._updates.extend(payload)
+                else:
+                    sheet = kind.removeprefix("history:")
+                    self._history.setdefault(sheet, []).append(payload)
+
+    def pending(self) -> int:
+        """Nombre d'écritures en attente"""
+        with self._lock:
+            return len(self._updates) + sum(len(r) for r in self._history.values())
+
+    def _flush_if_needed(self):
+        if (
+            self.pending() >= self.max_rows
+            or time.monotonic() - self._last_flush >= self.max_seconds
+        ):
+            self.flush()
+
+    def flush(self):
+        """Envoie toutes les écritures en attente"""
+        with self._lock:
+            updates, self._updates = self._updates, []
+            history, self._history = self._history, {}
+            self._last_flush = time.monotonic()
+            journal_seq = self.journal.seq if self.journal is not None else 0
+
+        if updates:
+            try:
+                body = {"valueInputOption": "RAW", "data": updates}
+                _execute(
+                    self.service.spreadsheets()
+                    .values()
+                    .batchUpdate(spreadsheetId=self.sheet_id, body=body)
+                )
+                self.api_calls += 1
+                logger.info(f"{len(updates)} plages écrites dans le sheet")
+                if self.journal is not None:
+                    self.journal.record_flushed("update", journal_seq)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'écriture groupée dans le sheet: {e}")
+                # Remises en attente pour le prochain envoi
+                with self._lock:
+                    self._updates = updates + self._updates
+
+        for history_sheet_name, rows in history.items():
             try:
-                current_price = (
-                    float(
-                        row[COL_CURRENT_PRICE]
-                        .replace("€", "")
-                        .replace(",", ".")
-                        .strip()
+                _execute(
+                    self.service.spreadsheets()
+                    .values()
+                    .append(
+                        spreadsheetId=self.sheet_id,
+                        range=f"{history_sheet_name}!A1",
+                        valueInputOption="RAW",
+                        insertDataOption="INSERT_ROWS",
+                        body={"values": rows},
+                    )
+                )
+                self.api_calls += 1
+                logger.info(f"{len(rows)} lignes ajoutées à '{history_sheet_name}'")
+                if self.journal is not None:
+                    self.journal.record_flushed(
+                        f"history:{history_sheet_name}", journal_seq
                     )
-                    if row[COL_CURRENT_PRICE]
-                    else None
+            except Exception as e:
+                logger.error(
+                    f"Erreur lors de l'enregistrement groupé de l'historique: {e}"
                 )
-            except (ValueError, IndexError):
-                current_price = None
+                with self._lock:
+                    self._history[history_sheet_name] = rows + self._history.get(
+                        history_sheet_name, []
+                    )
+
+    def __enter__(self) -> "SheetWriteBuffer":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
 
+
+def _write_ranges(
+    service, sheet_id: str, data: list[dict], buffer: Optional[SheetWriteBuffer]
+):
+    """Écrit des plages immédiatement, ou via le buffer s'il est fourni"""
+    if buffer is not None:
+        buffer.add_update(data)
+        return
+
+    body = {"valueInputOption": "RAW", "data": data}
+    _execute(
+        service.spreadsheets()
+        .values()
+        .batchUpdate(spreadsheetId=sheet_id, body=body)
+    )
+
+
+def _read_rows(service, sheet_id: str, sheet_name: str) -> list[tuple[int, list]]:
+    """
+    Lignes du sheet (numéro, valeurs), reconstituées avec les indices de
+    colonnes du sheet complet
+
+    Seules les colonnes utilisées sont lues (A:C et I:S, en un batchGet).
+    """
+    result = _execute(
+        service.spreadsheets()
+        .values()
+        .batchGet(
+            spreadsheetId=sheet_id,
+            ranges=[
+                f"{sheet_name}!{NAME_COLUMNS}",
+                f"{sheet_name}!{PRICE_COLUMNS}",
+            ],
+        )
+    )
+
+    name_rows, price_rows = (
+        value_range.get("values", []) for value_range in result.get("valueRanges", [])
+    )
+    rows = []
+    for i, names in enumerate(name_rows, start=2):
+        prices = price_rows[i - 2] if i - 2 < len(price_rows) else []
+        rows.append(
+            (
+                i,
+                (names + [""] * NAME_COLUMNS_WIDTH)[:NAME_COLUMNS_WIDTH]
+                + [""] * (PRICE_COLUMNS_START - NAME_COLUMNS_WIDTH)
+                + prices,
+            )
+        )
+    return rows
+
+
+def get_cards_to_track(
+    service, sheet_id: str, sheet_name: str, snapshot: Optional[SheetSnapshot] = None
+) -> List[Card]:
+    """
+    Récupère la liste des cartes à suivre depuis le Google Sheet
+
+    Seules les colonnes utilisées sont lues (A:C et I:S, en un batchGet) ;
+    le snapshot, s'il est fourni, reçoit les valeurs des cellules écrites.
+    """
+    try:
+        cards = []
+        for i, row in _read_rows(service, sheet_id, sheet_name):
             card = Card(
                 name_en=row[COL_NAME_EN],
                 name_fr=row[COL_NAME_FR],
-                cardmarket_url=row[COL_CARDMARKET_URL],
-                current_price=current_price,
+                set_code=row[COL_SET].strip() or None,
+                cardmarket_url=row[COL_CARDMARKET_URL] if len(row) > COL_CARDMARKET_URL else None,
+                current_price=_parse_price(row, COL_CURRENT_PRICE),
+                trend_price=_parse_price(row, COL_TREND_PRICE),
+                avg_30_days=_parse_price(row, COL_AVG_30_DAYS),
+                min_price=_parse_price(row, COL_MIN_PRICE),
                 vinted_url=row[COL_VINTED_URL]
                 if len(row) > COL_VINTED_URL
                 else None,
+                last_update=_parse_datetime(row, COL_LAST_UPDATE),
+                vinted_last_update=_parse_datetime(row, COL_VINTED_LAST_UPDATE),
                 row=i,
             )
             cards.append(card)
+            if snapshot is not None:
+                snapshot.update(
+                    i, {col: row[col] for col in WRITTEN_COLUMNS if col < len(row)}
+                )
 
         return cards
 
@@ -103,95 +477,188 @@ def get_cards_to_track(service, sheet_id: str, sheet_name: str) -> List[Card]:
         return []
 
 
-def update_card_prices(
-    service, sheet_id: str, sheet_name: str, row: int, price_info: PriceInfo
-):
-    """Met à jour les prix Cardmarket pour une carte"""
-    try:
-        ranges = [
-            f"{sheet_name}!{chr(65 + COL_MIN_PRICE)}{row}",
-        ]
-        batch_result = (
-            service.spreadsheets()
-            .values()
-            .batchGet(spreadsheetId=sheet_id, ranges=ranges)
-            .execute()
+def sheet_fingerprint(service, sheet_id: str, sheet_name: str) -> str:
+    """
+    Empreinte des colonnes qui définissent les cartes suivies (noms, set et
+    URL Cardmarket)
+
+    L'API Google Sheets ne fournit ni etag ni date de modification : ces
+    seules colonnes sont lues (un batchGet léger) pour savoir si des cartes
+    ont été ajoutées, retirées ou modifiées, sans relire les prix. Les
+    colonnes écrites par le suivi n'en font pas partie.
+    """
+    url_column = _column_letter(COL_CARDMARKET_URL)
+    result = _execute(
+        service.spreadsheets()
+        .values()
+        .batchGet(
+            spreadsheetId=sheet_id,
+            ranges=[
+                f"{sheet_name}!{NAME_COLUMNS}",
+                f"{sheet_name}!{url_column}2:{url_column}",
+            ],
+        )
+    )
+    values = [value_range.get("values", []) for value_range in result.get("valueRanges", [])]
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode()).hexdigest()
+
+
+def read_records(service, sheet_id: str, sheet_name: str) -> list[dict]:
+    """
+    Lit toutes les lignes du sheet sous forme d'enregistrements (champs de
+    storage.base.FIELDS, dates au format ISO), pour l'import dans un
+    stockage local
+    """
+    records = []
+    for i, row in _read_rows(service, sheet_id, sheet_name):
+        record = {"row": i}
+        for field, col in FIELD_COLUMNS.items():
+            if field in DATETIME_FIELDS:
+                value = _parse_datetime(row, col)
+                record[field] = value.isoformat() if value else None
+            elif field in TEXT_FIELDS:
+                value = str(row[col]).strip() if col < len(row) else ""
+                record[field] = value or None
+            else:
+                record[field] = _parse_price(row, col)
+        if record["available_items"] is not None:
+            record["available_items"] = int(record["available_items"])
+        records.append(record)
+    return records
+
+
+def _sheet_value(field: str, value: Any) -> Any:
+    """Valeur d'un champ d'enregistrement telle qu'écrite dans le sheet"""
+    if value is None:
+        return ""
+    if field in DATETIME_FIELDS:
+        paris_tz = pytz.timezone("Europe/Paris")
+        return (
+            datetime.fromisoformat(value).astimezone(paris_tz).strftime(SHEET_DATETIME_FORMAT)
         )
+    return value
 
-        value_ranges = batch_result.get("valueRanges", [])
-        current_min = float("inf")
-        if value_ranges and value_ranges[0].get("values"):
-            try:
-                value = value_ranges[0]["values"][0][0]
-                if value and str(value).strip():
-                    current_min = float(value)
-            except (ValueError, IndexError):
-                current_min = float("inf")
 
+def write_records(
+    service,
+    sheet_id: str,
+    sheet_name: str,
+    records: list[dict],
+    batch_size: int = 5000,
+) -> int:
+    """
+    Publie des enregistrements dans le sheet, ligne par ligne (champ "row")
+
+    Le sheet est lu une fois ; seules les cellules dont la valeur diffère
+    sont envoyées, par batchUpdate de batch_size plages. Retourne le nombre
+    de cellules écrites.
+    """
+    # L'API omet les cellules vides en fin de ligne : elles valent ""
+    snapshot = SheetSnapshot()
+    for i, row in _read_rows(service, sheet_id, sheet_name):
+        snapshot.update(
+            i, {col: row[col] if col < len(row) else "" for col in FIELD_COLUMNS.values()}
+        )
+
+    written = 0
+    with SheetWriteBuffer(
+        service, sheet_id, max_rows=batch_size, max_seconds=float("inf")
+    ) as buffer:
+        for record in records:
+            cells = {
+                col: _sheet_value(field, record.get(field))
+                for field, col in FIELD_COLUMNS.items()
+            }
+            changed = snapshot.changed(record["row"], cells)
+            if not changed:
+                continue
+            snapshot.update(record["row"], changed)
+            buffer.add_update(_row_ranges(sheet_name, record["row"], changed))
+            written += len(changed)
+    return written
+
+
+def update_card_prices(
+    service,
+    sheet_id: str,
+    sheet_name: str,
+    row: int,
+    price_info: PriceInfo,
+    current_min: Optional[float] = None,
+    buffer: Optional[SheetWriteBuffer] = None,
+    snapshot: Optional[SheetSnapshot] = None,
+):
+    """
+    Met à jour les prix Cardmarket pour une carte
+
+    current_min est le prix minimum lu par get_cards_to_track (None si vide).
+    Avec un snapshot, seules les cellules modifiées sont écrites.
+    """
+    try:
         new_min = (
             min(current_min, price_info.current_price)
-            if current_min != 0
+            if current_min
             else price_info.current_price
         )
 
         paris_tz = pytz.timezone("Europe/Paris")
         current_time = datetime.now(paris_tz).strftime("%d/%m/%Y %H:%M:%S")
 
-        data = [
+        data = _changed_ranges(
+            sheet_name,
+            row,
             {
-                "range": f"{sheet_name}!{chr(65 + COL_CURRENT_PRICE)}{row}:{chr(65 + COL_LAST_UPDATE)}{row}",
-                "values": [
-                    [
-                        price_info.current_price,
-                        price_info.trend_price,
-                        price_info.avg_30_days,
-                        price_info.available_items,
-                        new_min,
-                        current_time,
-                    ]
-                ],
-            }
-        ]
-
-        body = {"valueInputOption": "RAW", "data": data}
-
-        service.spreadsheets().values().batchUpdate(
-            spreadsheetId=sheet_id, body=body
-        ).execute()
+                COL_CURRENT_PRICE: price_info.current_price,
+                COL_TREND_PRICE: price_info.trend_price,
+                COL_AVG_30_DAYS: price_info.avg_30_days,
+                COL_AVAILABLE_ITEMS: price_info.available_items,
+                COL_MIN_PRICE: new_min,
+            },
+            COL_LAST_UPDATE,
+            current_time,
+            snapshot,
+        )
+        if data:
+            _write_ranges(service, sheet_id, data, buffer)
 
     except Exception as e:
         logger.error(f"Erreur lors de la mise à jour des prix dans le sheet: {e}")
 
 
 def update_vinted_price(
-    service, sheet_id: str, sheet_name: str, row: int, price_info: VintedPriceInfo
+    service,
+    sheet_id: str,
+    sheet_name: str,
+    row: int,
+    price_info: VintedPriceInfo,
+    buffer: Optional[SheetWriteBuffer] = None,
+    snapshot: Optional[SheetSnapshot] = None,
 ):
-    """Met à jour le prix Vinted et la date pour une carte"""
+    """
+    Met à jour le prix Vinted et la date pour une carte
+
+    Avec un snapshot, seules les cellules modifiées sont écrites.
+    """
     try:
         paris_tz = pytz.timezone("Europe/Paris")
         current_time = price_info.last_update.astimezone(paris_tz).strftime(
             "%d/%m/%Y %H:%M:%S"
         )
 
-        data = [
+        data = _changed_ranges(
+            sheet_name,
+            row,
             {
-                "range": f"{sheet_name}!P{row}:S{row}",
-                "values": [
-                    [
-                        price_info.min_price,
-                        current_time,
-                        price_info.url,
-                        price_info.urlSearch,
-                    ]
-                ],
-            }
-        ]
-
-        body = {"valueInputOption": "RAW", "data": data}
-
-        service.spreadsheets().values().batchUpdate(
-            spreadsheetId=sheet_id, body=body
-        ).execute()
+                COL_VINTED_MIN: price_info.min_price,
+                COL_VINTED_URL: price_info.url,
+                COL_VINTED_URL_SEARCH: price_info.urlSearch,
+            },
+            COL_VINTED_LAST_UPDATE,
+            current_time,
+            snapshot,
+        )
+        if data:
+            _write_ranges(service, sheet_id, data, buffer)
 
     except Exception as e:
         logger.error(f"Erreur lors de la mise à jour du prix Vinted dans le sheet: {e}")
@@ -204,6 +671,7 @@ def log_price_history(
     card_name: str,
     price: float,
     source: str,
+    buffer: Optional[SheetWriteBuffer] = None,
 ):
     """Enregistre une entrée de prix dans l'onglet d'historique."""
     try:
@@ -217,15 +685,26 @@ def log_price_history(
             source,
         ]
 
+        if buffer is not None:
+            buffer.add_history_row(history_sheet_name, row_to_append)
+            logger.debug(
+                f"Historique de prix pour '{card_name}' mis en attente : {price}€ ({source})"
+            )
+            return
+
         body = {"values": [row_to_append]}
 
-        service.spreadsheets().values().append(
-            spreadsheetId=sheet_id,
-            range=f"{history_sheet_name}!A1",
-            valueInputOption="RAW",
-            insertDataOption="INSERT_ROWS",
-            body=body,
-        ).execute()
+        _execute(
+            service.spreadsheets()
+            .values()
+            .append(
+                spreadsheetId=sheet_id,
+                range=f"{history_sheet_name}!A1",
+                valueInputOption="RAW",
+                insertDataOption="INSERT_ROWS",
+                body=body,
+            )
+        )
         logger.info(
             f"Historique de prix pour '{card_name}' enregistré : {price}€ ({source})"
         )
@@ -234,3 +713,35 @@ def log_price_history(
         logger.error(
             f"Erreur lors de l'enregistrement de l'historique pour '{card_name}': {e}"
         )
+
+
+def export_history_summary(
+    service,
+    sheet_id: str,
+    history_sheet_name: str,
+    history_store,
+):
+    """
+    Exporte vers l'onglet d'historique un résumé journalier (prix moyen, min,
+    max et nombre de relevés par carte et source) des jours non exportés
+    """
+    for day in history_store.pending_export_days():
+        rows = history_store.daily_summary(day)
+        try:
+            if rows:
+                _execute(
+                    service.spreadsheets()
+                    .values()
+                    .append(
+                        spreadsheetId=sheet_id,
+                        range=f"{history_sheet_name}!A1",
+                        valueInputOption="RAW",
+                        insertDataOption="INSERT_ROWS",
+                        body={"values": rows},
+                    )
+                )
+            history_store.mark_exported(day)
+            logger.info(f"Historique du {day} exporté ({len(rows)} lignes)")
+        except Exception as e:
+            logger.error(f"Erreur lors de l'export de l'historique du {day}: {e}")
+            break
@@ -0,0 +1 @@
+# Fichier vide pour marquer le dossier comme un package Python
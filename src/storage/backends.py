@@ -0,0 +1,121 @@
+import importlib.util
+import json
+import os
+import time
+from datetime import timedelta
+
+from config import get_settings
+from sheets import read_records, write_records
+from storage.base import CardStore
+from storage.local_store import (
+    CsvCardStore,
+    LocalCardStore,
+    ParquetCardStore,
+    SQLiteCardStore,
+)
+from storage.sheets_store import SheetsStore
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+LOCAL_BACKENDS = {
+    "sqlite": (SQLiteCardStore, "data/cards.db"),
+    "csv": (CsvCardStore, "data/cards.csv"),
+    "parquet": (ParquetCardStore, "data/cards.parquet"),
+}
+BACKENDS = ("sheets",) + tuple(LOCAL_BACKENDS)
+
+
+def check_backend(backend: str):
+    """Vérifie que le stockage existe et que ses dépendances sont installées"""
+    if backend != "sheets" and backend not in LOCAL_BACKENDS:
+        raise ValueError(f"Stockage inconnu : {backend} (choix : {', '.join(BACKENDS)})")
+    if backend == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise ValueError(
+            "Le stockage parquet nécessite le paquet pyarrow (pip install pyarrow)"
+        )
+
+
+def open_store(
+    backend: str,
+    service=None,
+    sheet_id: str = "",
+    sheet_name: str = "",
+    journal=None,
+) -> CardStore:
+    """
+    Ouvre le stockage des cartes : Google Sheet ("sheets") ou fichier local
+    ("sqlite", "csv", "parquet" ; chemin STORAGE_PATH ou chemin par défaut)
+    """
+    check_backend(backend)
+    if backend == "sheets":
+        return SheetsStore(service, sheet_id, sheet_name, journal=journal)
+    store_class, default_path = LOCAL_BACKENDS[backend]
+    return store_class(
+        settings.storage_path or default_path,
+        journal,
+        max_rows=settings.storage_flush_rows,
+        max_seconds=settings.storage_flush_seconds,
+    )
+
+
+def import_from_sheet(
+    store: LocalCardStore, service, sheet_id: str, sheet_name: str
+) -> int:
+    """Copie toutes les lignes du sheet (cartes et prix) dans un stockage local"""
+    records = read_records(service, sheet_id, sheet_name)
+    store.import_records(records)
+    logger.info(f"{len(records)} cartes importées du sheet dans {store.path}")
+    return len(records)
+
+
+def sync_to_sheet(
+    store: LocalCardStore, service, sheet_id: str, sheet_name: str
+) -> int:
+    """
+    Publie le stockage local dans le sheet, pour consultation
+
+    Seules les cellules modifiées depuis la dernière publication sont
+    envoyées, par lots de STORAGE_SYNC_BATCH plages.
+    """
+    store.flush()
+    written = write_records(
+        service,
+        sheet_id,
+        sheet_name,
+        store.records(),
+        batch_size=settings.storage_sync_batch,
+    )
+    _save_sync_time(store)
+    logger.info(f"Stockage {store.path} publié dans le sheet : {written} cellules écrites")
+    return written
+
+
+def _load_sync_state() -> dict:
+    try:
+        with open(settings.storage_sync_state_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_sync_time(store: LocalCardStore):
+    state = _load_sync_state()
+    state[store.location] = time.time()
+    state_dir = os.path.dirname(settings.storage_sync_state_path)
+    if state_dir and not os.path.exists(state_dir):
+        os.makedirs(state_dir)
+    try:
+        with open(settings.storage_sync_state_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+    except OSError as e:
+        logger.warning(f"Impossible d'enregistrer la date de publication : {e}")
+
+
+def sync_due(store: LocalCardStore, interval: timedelta) -> bool:
+    """La dernière publication du stockage date-t-elle de plus de `interval` ?"""
+    if not interval:
+        return False
+    last = _load_sync_state().get(store.location)
+    return last is None or time.time() - last >= interval.total_seconds()
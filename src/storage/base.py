@@ -0,0 +1,130 @@
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Optional
+
+import pytz
+
+from models.card import Card
+from models.price_info import PriceInfo, VintedPriceInfo
+
+# Champs d'un enregistrement de carte, communs à tous les stockages ; les
+# dates sont au format ISO 8601
+IDENTITY_FIELDS = ("name_en", "name_fr", "set_code", "cardmarket_url")
+CARDMARKET_FIELDS = (
+    "current_price",
+    "trend_price",
+    "avg_30_days",
+    "available_items",
+    "min_price",
+    "last_update",
+)
+VINTED_FIELDS = ("vinted_min", "vinted_last_update", "vinted_url", "vinted_url_search")
+FIELDS = ("row",) + IDENTITY_FIELDS + CARDMARKET_FIELDS + VINTED_FIELDS
+
+
+def cardmarket_fields(price_info: PriceInfo, current_min: Optional[float]) -> dict[str, Any]:
+    """Champs mis à jour par un relevé Cardmarket (hors date)"""
+    return {
+        "current_price": price_info.current_price,
+        "trend_price": price_info.trend_price,
+        "avg_30_days": price_info.avg_30_days,
+        "available_items": price_info.available_items,
+        "min_price": min(current_min, price_info.current_price)
+        if current_min
+        else price_info.current_price,
+    }
+
+
+def vinted_fields(price_info: VintedPriceInfo) -> dict[str, Any]:
+    """Champs mis à jour par un relevé Vinted (hors date)"""
+    return {
+        "vinted_min": price_info.min_price,
+        "vinted_url": price_info.url,
+        "vinted_url_search": price_info.urlSearch,
+    }
+
+
+def now_iso() -> str:
+    return datetime.now(pytz.timezone("Europe/Paris")).isoformat(timespec="seconds")
+
+
+def _parse_iso(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def record_to_card(record: dict) -> Card:
+    """Carte à suivre correspondant à un enregistrement"""
+    return Card(
+        name_en=record.get("name_en") or "",
+        name_fr=record.get("name_fr") or "",
+        set_code=record.get("set_code"),
+        cardmarket_url=record.get("cardmarket_url"),
+        current_price=record.get("current_price"),
+        trend_price=record.get("trend_price"),
+        avg_30_days=record.get("avg_30_days"),
+        min_price=record.get("min_price"),
+        vinted_url=record.get("vinted_url"),
+        last_update=_parse_iso(record.get("last_update")),
+        vinted_last_update=_parse_iso(record.get("vinted_last_update")),
+        row=record["row"],
+    )
+
+
+class CardStore(ABC):
+    """
+    Stockage des cartes suivies et de leurs prix
+
+    Interface commune au Google Sheet (SheetsStore) et aux stockages locaux
+    (SQLite, CSV, Parquet) : lecture des cartes, mise à jour des prix d'une
+    ligne, historique des relevés. Les écritures peuvent être mises en
+    attente ; flush les envoie, close les envoie et libère le stockage.
+    """
+
+    # Identifiant du stockage, enregistré par le journal d'exécution
+    location: str = ""
+
+    @abstractmethod
+    def get_cards(self) -> list[Card]:
+        """Cartes à suivre"""
+
+    def fingerprint(self) -> Optional[str]:
+        """
+        Empreinte de la liste des cartes, qui change quand des cartes sont
+        ajoutées, retirées ou modifiées en dehors du suivi (--daemon), ou
+        None si le stockage n'est modifié que par le suivi
+        """
+        return None
+
+    @abstractmethod
+    def update_card_prices(
+        self, row: int, price_info: PriceInfo, current_min: Optional[float] = None
+    ):
+        """Met à jour les prix Cardmarket d'une ligne"""
+
+    @abstractmethod
+    def update_vinted_price(self, row: int, price_info: VintedPriceInfo):
+        """Met à jour le prix Vinted d'une ligne"""
+
+    @abstractmethod
+    def log_price_history(self, card_name: str, price: float, source: str):
+        """Ajoute un relevé à l'historique du stockage (HISTORY_SHEET_MODE=append)"""
+
+    def replay(self, writes: list[tuple[str, Any]]):
+        """Remet en attente des écritures issues du journal (--resume)"""
+
+    def flush(self):
+        """Envoie les écritures en attente"""
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self) -> "CardStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,303 @@
+import csv
+import os
+import sqlite3
+import threading
+import time
+from abc import abstractmethod
+from typing import Any, Iterable, Optional
+
+from config import get_settings
+from models.card import Card
+from models.price_info import PriceInfo, VintedPriceInfo
+from storage.base import (
+    FIELDS,
+    CardStore,
+    cardmarket_fields,
+    now_iso,
+    record_to_card,
+    vinted_fields,
+)
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+INT_FIELDS = ("row", "available_items")
+FLOAT_FIELDS = ("current_price", "trend_price", "avg_30_days", "min_price", "vinted_min")
+
+
+def _ensure_dir(path: str):
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+
+class LocalCardStore(CardStore):
+    """
+    Base des stockages locaux : cartes gardées en mémoire, écritures par lots
+
+    Toutes les lignes sont lues en une fois ; les mises à jour modifient
+    l'enregistrement en mémoire et marquent la ligne à écrire. Les lignes
+    modifiées sont écrites dès que max_rows sont en attente ou que
+    max_seconds se sont écoulées, puis à la fermeture. Comme
+    pour le sheet, la date n'est mise à jour que si une valeur a changé
+    (SHEET_TIMESTAMP_POLICY=changed) ou à chaque relevé (always).
+
+    Avec un journal, chaque écriture en attente et chaque écriture sur disque
+    y sont enregistrées, pour rejouer après un arrêt brutal celles qui
+    n'ont pas été écrites.
+
+    L'historique des relevés n'est pas dupliqué ici : la base
+    PriceHistoryStore (HISTORY_DB_PATH) le garde déjà.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        journal=None,
+        max_rows: int = 1000,
+        max_seconds: float = 30,
+    ):
+        self.path = path
+        self.location = os.path.abspath(path)
+        self.journal = journal
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self._records: Optional[dict[int, dict]] = None
+        self._dirty: set[int] = set()
+        self._lock = threading.RLock()
+        self._last_flush = time.monotonic()
+
+    # Lecture et écriture propres à chaque format
+
+    @abstractmethod
+    def _load_records(self) -> Iterable[dict]:
+        """Tous les enregistrements du fichier"""
+
+    @abstractmethod
+    def _write_records(self, records: list[dict], all_records: dict[int, dict]):
+        """Écrit les enregistrements modifiés (all_records : état complet)"""
+
+    # Interface commune
+
+    def _ensure_loaded(self) -> dict[int, dict]:
+        with self._lock:
+            if self._records is None:
+                self._records = {
+                    record["row"]: record for record in self._load_records()
+                }
+            return self._records
+
+    def records(self) -> list[dict]:
+        """Tous les enregistrements, triés par ligne (écritures en attente comprises)"""
+        records = self._ensure_loaded()
+        with self._lock:
+            return [dict(records[row]) for row in sorted(records)]
+
+    def get_cards(self) -> list[Card]:
+        return [record_to_card(record) for record in self.records()]
+
+    def import_records(self, records: list[dict]):
+        """Remplace ou ajoute des lignes complètes (import depuis le sheet)"""
+        current = self._ensure_loaded()
+        with self._lock:
+            for record in records:
+                current[record["row"]] = {field: record.get(field) for field in FIELDS}
+                self._dirty.add(record["row"])
+        self.flush()
+
+    def _apply(
+        self,
+        row: int,
+        fields: dict[str, Any],
+        timestamp_field: Optional[str] = None,
+        timestamp: Optional[str] = None,
+        journal: bool = True,
+    ):
+        records = self._ensure_loaded()
+        with self._lock:
+            record = records.setdefault(row, {field: None for field in FIELDS} | {"row": row})
+            changed = {
+                field: value for field, value in fields.items() if record.get(field) != value
+            }
+            metrics.incr("store_fields_unchanged", len(fields) - len(changed))
+            if timestamp_field and (
+                changed or settings.sheet_timestamp_policy == "always"
+            ):
+                changed[timestamp_field] = timestamp
+            if not changed:
+                return
+            record.update(changed)
+            self._dirty.add(row)
+            if journal and self.journal is not None:
+                self.journal.record_write("store", {"row": row, "fields": changed})
+        self._flush_if_needed()
+
+    def update_card_prices(
+        self, row: int, price_info: PriceInfo, current_min: Optional[float] = None
+    ):
+        self._apply(row, cardmarket_fields(price_info, current_min), "last_update", now_iso())
+
+    def update_vinted_price(self, row: int, price_info: VintedPriceInfo):
+        self._apply(
+            row,
+            vinted_fields(price_info),
+            "vinted_last_update",
+            price_info.last_update.isoformat(timespec="seconds"),
+        )
+
+    def log_price_history(self, card_name: str, price: float, source: str):
+        """Rien à écrire : chaque relevé est déjà dans PriceHistoryStore"""
+
+    def replay(self, writes: list[tuple[str, Any]]):
+        for kind, payload in writes:
+            if kind == "store":
+                self._apply(payload["row"], payload["fields"], journal=False)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._dirty)
+
+    def _flush_if_needed(self):
+        if (
+            self.pending() >= self.max_rows
+            or time.monotonic() - self._last_flush >= self.max_seconds
+        ):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._dirty:
+                return
+            dirty = [dict(self._records[row]) for row in sorted(self._dirty)]
+            self._dirty = set()
+            journal_seq = self.journal.seq if self.journal is not None else 0
+
+            try:
+                self._write_records(dirty, self._records)
+                if self.journal is not None:
+                    self.journal.record_flushed("store", journal_seq)
+            except (OSError, sqlite3.Error) as e:
+                logger.error(f"Erreur d'écriture dans le stockage {self.path} : {e}")
+                self._dirty.update(record["row"] for record in dirty)
+                return
+        logger.debug("%d lignes écrites dans %s", len(dirty), self.path)
+
+
+class SQLiteCardStore(LocalCardStore):
+    """Cartes dans une base SQLite locale (mode WAL, écritures par executemany)"""
+
+    def __init__(self, path: str, journal=None, **kwargs):
+        super().__init__(path, journal, **kwargs)
+        _ensure_dir(path)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        columns = ", ".join(
+            f"{field} INTEGER PRIMARY KEY" if field == "row" else field for field in FIELDS
+        )
+        self._conn.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS cards ({columns});
+            """
+        )
+
+    def _load_records(self) -> Iterable[dict]:
+        cursor = self._conn.execute(f"SELECT {', '.join(FIELDS)} FROM cards")
+        for values in cursor:
+            yield dict(zip(FIELDS, values))
+
+    def _write_records(self, records: list[dict], all_records: dict[int, dict]):
+        placeholders = ", ".join("?" for _ in FIELDS)
+        updates = ", ".join(f"{field}=excluded.{field}" for field in FIELDS[1:])
+        with self._conn:
+            self._conn.executemany(
+                f"INSERT INTO cards ({', '.join(FIELDS)}) VALUES ({placeholders}) "
+                f"ON CONFLICT(row) DO UPDATE SET {updates}",
+                [tuple(record.get(field) for field in FIELDS) for record in records],
+            )
+
+    def close(self):
+        super().close()
+        self._conn.close()
+
+
+def _typed(field: str, value: Any) -> Any:
+    """Valeur typée d'un champ lu dans un fichier CSV (texte)"""
+    if value is None or value == "":
+        return None
+    if field in INT_FIELDS:
+        return int(float(value))
+    if field in FLOAT_FIELDS:
+        return float(value)
+    return value
+
+
+class CsvCardStore(LocalCardStore):
+    """
+    Cartes dans un fichier CSV, réécrit entièrement à chaque envoi (fichier
+    temporaire puis remplacement)
+    """
+
+    def __init__(self, path: str, journal=None, **kwargs):
+        super().__init__(path, journal, **kwargs)
+        _ensure_dir(path)
+
+    def _load_records(self) -> Iterable[dict]:
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, newline="", encoding="utf-8") as f:
+            return [
+                {field: _typed(field, row.get(field)) for field in FIELDS}
+                for row in csv.DictReader(f)
+            ]
+
+    def _write_records(self, records: list[dict], all_records: dict[int, dict]):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(all_records[row] for row in sorted(all_records))
+        os.replace(tmp_path, self.path)
+
+
+class ParquetCardStore(CsvCardStore):
+    """
+    Cartes dans un fichier Parquet (pyarrow), réécrit entièrement à chaque
+    envoi
+    """
+
+    def __init__(self, path: str, journal=None, **kwargs):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise RuntimeError("Le stockage Parquet nécessite le paquet pyarrow") from e
+        super().__init__(path, journal, **kwargs)
+
+    def _load_records(self) -> Iterable[dict]:
+        import pyarrow.parquet as pq
+
+        if not os.path.exists(self.path):
+            return []
+        return pq.read_table(self.path).to_pylist()
+
+    def _write_records(self, records: list[dict], all_records: dict[int, dict]):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        def field_type(field: str):
+            if field in INT_FIELDS:
+                return pa.int64()
+            if field in FLOAT_FIELDS:
+                return pa.float64()
+            return pa.string()
+
+        schema = pa.schema([(field, field_type(field)) for field in FIELDS])
+        table = pa.Table.from_pylist(
+            [all_records[row] for row in sorted(all_records)], schema=schema
+        )
+        tmp_path = f"{self.path}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,91 @@
+from typing import Any, Optional
+
+from config import get_settings
+from models.card import Card
+from models.price_info import PriceInfo, VintedPriceInfo
+from sheets import (
+    SheetSnapshot,
+    SheetWriteBuffer,
+    get_cards_to_track,
+    log_price_history,
+    sheet_fingerprint,
+    update_card_prices,
+    update_vinted_price,
+)
+from storage.base import CardStore
+
+settings = get_settings()
+
+
+class SheetsStore(CardStore):
+    """
+    Cartes et prix dans le Google Sheet
+
+    Les écritures passent par un SheetWriteBuffer (batchUpdate groupés,
+    journalisés) et seules les cellules modifiées depuis la lecture sont
+    envoyées (SheetSnapshot).
+    """
+
+    def __init__(self, service, sheet_id: str, sheet_name: str, journal=None):
+        self.service = service
+        self.sheet_id = sheet_id
+        self.sheet_name = sheet_name
+        self.location = sheet_id
+        self.snapshot = SheetSnapshot()
+        self.buffer = SheetWriteBuffer(
+            service,
+            sheet_id,
+            max_rows=settings.sheets_flush_rows,
+            max_seconds=settings.sheets_flush_seconds,
+            journal=journal,
+        )
+
+    def get_cards(self) -> list[Card]:
+        return get_cards_to_track(
+            self.service, self.sheet_id, self.sheet_name, self.snapshot
+        )
+
+    def fingerprint(self) -> Optional[str]:
+        return sheet_fingerprint(self.service, self.sheet_id, self.sheet_name)
+
+    def update_card_prices(
+        self, row: int, price_info: PriceInfo, current_min: Optional[float] = None
+    ):
+        update_card_prices(
+            self.service,
+            self.sheet_id,
+            self.sheet_name,
+            row,
+            price_info,
+            current_min=current_min,
+            buffer=self.buffer,
+            snapshot=self.snapshot,
+        )
+
+    def update_vinted_price(self, row: int, price_info: VintedPriceInfo):
+        update_vinted_price(
+            self.service,
+            self.sheet_id,
+            self.sheet_name,
+            row,
+            price_info,
+            buffer=self.buffer,
+            snapshot=self.snapshot,
+        )
+
+    def log_price_history(self, card_name: str, price: float, source: str):
+        log_price_history(
+            self.service,
+            self.sheet_id,
+            settings.history_sheet_name,
+            card_name,
+            price,
+            source,
+            buffer=self.buffer,
+        )
+
+    def replay(self, writes: list[tuple[str, Any]]):
+        self.buffer.replay(writes)
+
+    def flush(self):
+        self.buffer.flush()
@@ -0,0 +1,160 @@
+import queue
+import threading
+import time
+from datetime import timedelta
+from typing import Optional
+
+from utils.email_notifier import Mailer, build_alert_message, build_digest_message
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+logger = setup_logger(__name__)
+
+_STOP = object()
+
+
+class AlertOutbox:
+    """
+    File d'envoi des alertes de prix, vidée par un thread en arrière-plan
+
+    Les alertes sont dédoublonnées par (carte, URL de l'annonce), y compris
+    avec celles déjà envoyées lors des exécutions précédentes (journal), puis
+    envoyées sur une seule connexion SMTP :
+    - digest_interval None : un email par alerte, dès que possible ;
+    - digest_interval 0 : un seul email récapitulatif en fin d'exécution ;
+    - digest_interval > 0 : un récapitulatif toutes les N minutes.
+
+    Les alertes en file sont enregistrées dans le journal et n'en sortent
+    qu'une fois envoyées : celles qui n'ont pas pu partir (arrêt brutal ou
+    échec de l'envoi) sont renvoyées à l'exécution suivante, ou par retry().
+    """
+
+    def __init__(
+        self,
+        mailer: Mailer,
+        digest_interval: Optional[timedelta] = None,
+        journal=None,
+    ):
+        self.mailer = mailer
+        self.digest_interval = digest_interval
+        self.journal = journal
+        self._queue: "queue.Queue" = queue.Queue()
+        self._seen: set[tuple[str, str]] = set()
+        # Alertes en file pas encore tentées, et alertes dont l'envoi a échoué
+        self._in_flight = 0
+        self._failed: list[dict] = []
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name="alert-outbox", daemon=True
+        )
+        self._thread.start()
+
+    def put(self, alert: dict) -> bool:
+        """Met une alerte en file ; retourne False si elle a déjà été signalée"""
+        key = (alert["card_name"], alert["vinted_url"])
+        with self._lock:
+            if key in self._seen or (
+                self.journal is not None and self.journal.alert_sent(*key)
+            ):
+                return False
+            self._seen.add(key)
+            self._in_flight += 1
+        if self.journal is not None:
+            self.journal.record_alert_queued(alert)
+        self._queue.put(alert)
+        return True
+
+    def replay(self, alerts: list[dict]):
+        """Remet en file des alertes non envoyées (exécution reprise)"""
+        with self._lock:
+            for alert in alerts:
+                self._seen.add((alert["card_name"], alert["vinted_url"]))
+                self._in_flight += 1
+                self._queue.put(alert)
+
+    def retry(self) -> int:
+        """Remet en file les alertes dont l'envoi a échoué"""
+        with self._lock:
+            failed, self._failed = self._failed, []
+            self._in_flight += len(failed)
+        for alert in failed:
+            self._queue.put(alert)
+        return len(failed)
+
+    @property
+    def busy(self) -> bool:
+        """Des alertes mises en file n'ont pas encore été tentées"""
+        with self._lock:
+            return self._in_flight > 0
+
+    def _send(self, alerts: list[dict]):
+        try:
+            if len(alerts) == 1 and self.digest_interval is None:
+                msg = build_alert_message(**alerts[0])
+            else:
+                msg = build_digest_message(alerts)
+            self.mailer.send(msg)
+        except Exception as e:
+            # Les alertes restent en file dans le journal pour être renvoyées
+            logger.error(f"Erreur lors de l'envoi de l'email: {e}")
+            metrics.incr("alert_errors", len(alerts))
+            with self._lock:
+                self._failed.extend(alerts)
+                self._in_flight -= len(alerts)
+            return
+
+        logger.info(
+            f"Email d'alerte envoyé ({', '.join(a['card_name'] for a in alerts)})"
+        )
+        metrics.incr("alerts_sent", len(alerts))
+        if self.journal is not None:
+            for alert in alerts:
+                self.journal.record_alert(alert["card_name"], alert["vinted_url"])
+        with self._lock:
+            self._in_flight -= len(alerts)
+
+    def _run(self):
+        if self.digest_interval is None:
+            while (alert := self._queue.get()) is not _STOP:
+                self._send([alert])
+            return
+
+        interval = self.digest_interval.total_seconds()
+        batch: list[dict] = []
+        deadline = time.monotonic() + interval
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if interval else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                break
+            if item is not None:
+                batch.append(item)
+            if interval and time.monotonic() >= deadline:
+                if batch:
+                    self._send(batch)
+                    batch = []
+                deadline = time.monotonic() + interval
+        if batch:
+            self._send(batch)
+
+    def close(self):
+        """Envoie les alertes restantes (et le récapitulatif) puis ferme la connexion"""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        self._thread.join()
+        self.mailer.close()
+        if self._failed:
+            logger.warning(
+                f"{len(self._failed)} alertes non envoyées, "
+                "elles seront renvoyées à la prochaine exécution"
+            )
+
+    def __enter__(self) -> "AlertOutbox":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
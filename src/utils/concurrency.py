@@ -0,0 +1,29 @@
+import threading
+from contextlib import contextmanager
+from typing import Iterator
+
+from utils.metrics import metrics
+
+
+class DomainLimiter:
+    """Limite le nombre de chargements de pages simultanés par domaine"""
+
+    def __init__(self, limits: dict[str, int]):
+        self._semaphores = {
+            domain: threading.BoundedSemaphore(max(1, limit))
+            for domain, limit in limits.items()
+        }
+
+    @contextmanager
+    def slot(self, domain: str) -> Iterator[None]:
+        """Réserve une place pour le domaine (sans limite si inconnu)"""
+        semaphore = self._semaphores.get(domain)
+        if semaphore is None:
+            yield
+            return
+        with metrics.stage(f"{domain}_slot_wait"):
+            semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
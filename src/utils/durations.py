@@ -0,0 +1,18 @@
+import re
+from datetime import timedelta
+
+_DURATION_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([smhdj]?)\s*$", re.IGNORECASE)
+_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "j": 86400}
+
+
+def parse_duration(value: str) -> timedelta:
+    """
+    Convertit une durée courte ("90s", "30m", "6h", "1d") en timedelta
+
+    Un nombre sans unité est interprété en secondes.
+    """
+    match = _DURATION_RE.match(str(value))
+    if not match:
+        raise ValueError(f"Durée invalide : {value}")
+    amount, unit = match.groups()
+    return timedelta(seconds=float(amount) * _UNITS[unit.lower()])
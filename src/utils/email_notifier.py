@@ -1,30 +1,38 @@
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from typing import Optional
 from config import get_settings
 from utils.logger import setup_logger
+from utils.metrics import metrics
 
 logger = setup_logger(__name__)
 settings = get_settings()
 
 
-def send_price_alert(
+def _discount(alert: dict) -> float:
+    """Remise en % du prix Vinted par rapport au prix Cardmarket"""
+    return alert["difference"] / alert["cardmarket_price"] * 100
+
+
+def _new_message(subject: str, body: str) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg["From"] = settings.smtp_from_email
+    msg["To"] = settings.notification_email
+    msg["Subject"] = subject
+    msg.attach(MIMEText(body, "html"))
+    return msg
+
+
+def build_alert_message(
     card_name: str,
     cardmarket_price: float,
     vinted_price: float,
     vinted_url: str,
     difference: float,
-) -> bool:
-    """
-    Envoie une alerte par email quand un prix Vinted est inférieur au prix Cardmarket
-    """
-    try:
-        msg = MIMEMultipart()
-        msg["From"] = settings.smtp_from_email
-        msg["To"] = settings.notification_email
-        msg["Subject"] = f"🎴 Alerte prix Lorcana - {card_name}"
-
-        body = f"""
+) -> MIMEMultipart:
+    """Email d'alerte pour une seule annonce"""
+    body = f"""
         <html>
         <body>
             <h2>Alerte de prix pour {card_name}</h2>
@@ -38,16 +46,144 @@ def send_price_alert(
         </body>
         </html>
         """
+    return _new_message(f"🎴 Alerte prix Lorcana - {card_name}", body)
+
+
+def build_digest_message(alerts: list[dict]) -> MIMEMultipart:
+    """Email récapitulatif de plusieurs annonces, de la plus forte remise à la plus faible"""
+    rows = "".join(
+        f"""
+                <tr>
+                    <td>{alert['card_name']}</td>
+                    <td>{alert['cardmarket_price']:.2f}€</td>
+                    <td>{alert['vinted_price']:.2f}€</td>
+                    <td>{alert['difference']:.2f}€ ({_discount(alert):.1f}%)</td>
+                    <td><a href="{alert['vinted_url']}">Voir l'annonce</a></td>
+                </tr>"""
+        for alert in sorted(alerts, key=_discount, reverse=True)
+    )
+    body = f"""
+        <html>
+        <body>
+            <h2>{len(alerts)} offres moins chères trouvées sur Vinted</h2>
+            <table>
+                <tr>
+                    <th>Carte</th>
+                    <th>Prix Cardmarket</th>
+                    <th>Prix Vinted</th>
+                    <th>Différence</th>
+                    <th></th>
+                </tr>{rows}
+            </table>
+        </body>
+        </html>
+        """
+    return _new_message(f"🎴 Alertes prix Lorcana - {len(alerts)} offres", body)
 
-        msg.attach(MIMEText(body, "html"))
 
-        with smtplib.SMTP_SSL(settings.smtp_server, settings.smtp_port) as server:
-            server.login(settings.smtp_username, settings.smtp_password)
-            server.send_message(msg)
+class Mailer:
+    """
+    Connexion SMTP gardée ouverte entre deux envois
 
+    La connexion (TLS et authentification) n'est ouverte qu'au premier
+    envoi, puis rouverte une fois si le serveur l'a fermée entre-temps.
+    security vaut "ssl" (SMTP_SSL), "starttls" ou "none" (serveur local de
+    test, par exemple aiosmtpd) ; sans identifiant, aucune authentification.
+    """
+
+    def __init__(
+        self,
+        server: str,
+        port: int,
+        username: str = "",
+        password: str = "",
+        security: str = "ssl",
+        timeout: float = 30,
+    ):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.security = security
+        self.timeout = timeout
+        self._conn: Optional[smtplib.SMTP] = None
+
+    @classmethod
+    def from_settings(cls) -> "Mailer":
+        return cls(
+            settings.smtp_server,
+            settings.smtp_port,
+            settings.smtp_username,
+            settings.smtp_password,
+            settings.smtp_security,
+        )
+
+    def _connect(self) -> smtplib.SMTP:
+        with metrics.stage("smtp_connect"):
+            if self.security == "ssl":
+                conn = smtplib.SMTP_SSL(self.server, self.port, timeout=self.timeout)
+            else:
+                conn = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+                if self.security == "starttls":
+                    conn.starttls()
+            if self.username:
+                conn.login(self.username, self.password)
+        return conn
+
+    def send(self, msg: MIMEMultipart):
+        """Envoie un message, en rouvrant la connexion si elle a été coupée"""
+        with metrics.stage("smtp_send"):
+            for attempt in range(2):
+                if self._conn is None:
+                    self._conn = self._connect()
+                try:
+                    self._conn.send_message(msg)
+                    return
+                except (smtplib.SMTPServerDisconnected, ConnectionError):
+                    self._conn = None
+                    if attempt:
+                        raise
+                    logger.debug("Connexion SMTP fermée par le serveur, reconnexion")
+                    metrics.incr("retries", source="smtp")
+
+    def close(self):
+        """Ferme la connexion SMTP"""
+        if self._conn is None:
+            return
+        try:
+            self._conn.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._conn = None
+
+
+def send_price_alert(
+    card_name: str,
+    cardmarket_price: float,
+    vinted_price: float,
+    vinted_url: str,
+    difference: float,
+) -> bool:
+    """
+    Envoie une alerte par email quand un prix Vinted est inférieur au prix Cardmarket
+
+    Ouvre une connexion dédiée ; pendant une exécution, AlertOutbox réutilise
+    une seule connexion pour toutes les alertes.
+    """
+    mailer = Mailer.from_settings()
+    try:
+        mailer.send(
+            build_alert_message(
+                card_name, cardmarket_price, vinted_price, vinted_url, difference
+            )
+        )
         logger.info(f"Email d'alerte envoyé pour {card_name}")
+        metrics.incr("alerts_sent")
         return True
 
     except Exception as e:
         logger.error(f"Erreur lors de l'envoi de l'email: {e}")
+        metrics.incr("alert_errors")
         return False
+    finally:
+        mailer.close()
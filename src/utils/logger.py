@@ -1,7 +1,27 @@
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import multiprocessing
 import os
+import queue
 import sys
+import threading
+import time
+from typing import Optional
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# File partagée par tous les loggers, vidée par un seul thread d'écriture
+_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_lock = threading.Lock()
+_handler: Optional["AsyncQueueHandler"] = None
+_listener: Optional[QueueListener] = None
+# File des messages des processus enfants (pool de parsing), créée au
+# premier fork et vidée par un second thread d'écriture du processus principal
+_child_queue = None
+_child_listener: Optional[QueueListener] = None
+_loggers: set[logging.Logger] = set()
+_level = logging.INFO
 
 
 class WindowsConsoleHandler(logging.StreamHandler):
@@ -23,43 +43,212 @@ class WindowsConsoleHandler(logging.StreamHandler):
             # Remplacer les caractères problématiques
             msg = msg.replace("≠", "!=")
             stream.write(msg + self.terminator)
-            self.flush()
+            # Un seul flush par rafale de messages
+            if _queue.empty():
+                self.flush()
         except Exception:
             self.handleError(record)
 
 
-def setup_logger(name: str) -> logging.Logger:
-    """Configure et retourne un logger avec support UTF-8"""
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+class RateLimitFilter(logging.Filter):
+    """
+    Limite les messages DEBUG répétés
 
-    # Éviter les logs en double
-    if logger.hasHandlers():
-        logger.handlers.clear()
+    Au plus `limit` messages par appel (logger, fichier et ligne, le texte
+    pouvant varier d'un message à l'autre avec une f-string) et par fenêtre
+    de `window` secondes ; le premier message de la fenêtre suivante indique
+    combien ont été ignorés.
+    """
+
+    max_keys = 2000
+
+    def __init__(self, limit: int = 20, window: float = 10.0):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._counts: dict[tuple[str, str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.limit <= 0 or record.levelno > logging.DEBUG:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            state = self._counts.get(key)
+            if state is not None and now - state[0] < self.window:
+                state[1] += 1
+                return state[1] <= self.limit
+            if len(self._counts) >= self.max_keys:
+                self._counts.clear()
+            self._counts[key] = [now, 1]
+        if state is not None and state[1] > self.limit:
+            record.msg = f"{record.msg} ({state[1] - self.limit} messages similaires ignorés)"
+        return True
+
+
+class AsyncQueueHandler(QueueHandler):
+    """
+    Dépose les messages dans la file sans les formater
+
+    Le formatage et les écritures (console, fichier) sont faits par le
+    thread du QueueListener. Dans un processus enfant (pool de parsing), les
+    messages sont formatés puis envoyés au processus principal, seul à
+    écrire dans le fichier de log (et à le faire tourner).
+    """
+
+    def __init__(self, log_queue, handlers: list[logging.Handler]):
+        super().__init__(log_queue)
+        self.handlers = handlers
+        self.direct = False
+        self.child = False
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if self.child:
+            # Arguments et exception intégrés au message, transmissible par pickle
+            return super().prepare(record)
+        return record
+
+    def to_parent(self, child_queue):
+        """Envoie désormais les messages au processus principal"""
+        self.queue = child_queue
+        self.child = True
+
+    def emit(self, record: logging.LogRecord):
+        if not self.direct:
+            super().emit(record)
+            return
+        for handler in self.handlers:
+            handler.handle(record)
+
+
+def _settings_level() -> str:
+    try:
+        from config import get_settings
+
+        return get_settings().log_level
+    except Exception:
+        return os.getenv("LOG_LEVEL", "INFO")
+
+
+def _settings_log_dir() -> str:
+    try:
+        from config import get_settings
+
+        return get_settings().log_dir
+    except Exception:
+        return os.getenv("LOG_DIR", "logs")
+
+
+def _before_fork():
+    global _child_queue, _child_listener
+    with _lock:
+        if _listener is None or _child_queue is not None:
+            return
+        _child_queue = multiprocessing.Queue()
+        _child_listener = QueueListener(_child_queue, *_handler.handlers)
+        _child_listener.start()
+
+
+def _after_fork_in_child():
+    global _listener, _child_listener
+    # Les threads d'écriture n'existent que dans le processus principal
+    _listener = None
+    _child_listener = None
+    if _handler is None:
+        return
+    if _child_queue is not None:
+        _handler.to_parent(_child_queue)
+    else:
+        _handler.direct = True
+
+
+def _configure():
+    """Crée les handlers partagés et démarre le thread d'écriture (une fois)"""
+    global _handler, _listener, _level
+    _level = logging.getLevelName(_settings_level().upper())
+    if not isinstance(_level, int):
+        _level = logging.INFO
 
     # Formateur avec correction de 'levelname'
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
+    formatter = logging.Formatter(LOG_FORMAT, datefmt="%Y-%m-%d %H:%M:%S")
 
     # Handler pour la console avec support Windows
     console_handler = WindowsConsoleHandler()
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
 
     # Handler pour le fichier avec encodage UTF-8
-    log_dir = "logs"
+    log_dir = _settings_log_dir()
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
-
     file_handler = RotatingFileHandler(
-        f"{log_dir}/lorcana_price.log",
+        os.path.join(log_dir, "lorcana_price.log"),
         maxBytes=1024 * 1024,  # 1MB
         backupCount=5,
         encoding="utf-8",
     )
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
 
+    handlers: list[logging.Handler] = [console_handler, file_handler]
+    _handler = AsyncQueueHandler(_queue, handlers)
+    try:
+        from config import get_settings
+
+        settings = get_settings()
+        _handler.addFilter(
+            RateLimitFilter(settings.log_rate_limit, settings.log_rate_window)
+        )
+    except Exception:
+        _handler.addFilter(RateLimitFilter())
+
+    _listener = QueueListener(_queue, *handlers)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    os.register_at_fork(before=_before_fork, after_in_child=_after_fork_in_child)
+
+
+def setup_logger(name: str) -> logging.Logger:
+    """Configure et retourne un logger avec support UTF-8"""
+    with _lock:
+        if _handler is None:
+            _configure()
+        logger = logging.getLogger(name)
+        logger.setLevel(_level)
+        # Éviter les logs en double
+        logger.handlers.clear()
+        logger.addHandler(_handler)
+        logger.propagate = False
+        _loggers.add(logger)
     return logger
+
+
+def set_log_level(level: str):
+    """Change le niveau de tous les loggers de l'application"""
+    global _level
+    numeric = logging.getLevelName(level.upper())
+    if not isinstance(numeric, int):
+        raise ValueError(f"Niveau de log inconnu : {level}")
+    with _lock:
+        _level = numeric
+        for logger in _loggers:
+            logger.setLevel(numeric)
+
+
+def shutdown_logging():
+    """Écrit les messages encore en file et arrête les threads d'écriture"""
+    global _listener, _child_listener
+    with _lock:
+        listener, _listener = _listener, None
+        child_listener, _child_listener = _child_listener, None
+    if child_listener is not None:
+        child_listener.stop()
+    if listener is not None:
+        listener.stop()
+        # Les messages suivants (fin de l'interpréteur) sont écrits directement
+        _handler.direct = True
+        for handler in listener.handlers:
+            try:
+                handler.flush()
+            except (OSError, ValueError):
+                # Console déjà fermée (sortie redirigée, fin des tests)
+                pass
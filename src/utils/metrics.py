@@ -0,0 +1,229 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# Carte en cours de traitement, pour rattacher les durées mesurées à une carte
+_current_card: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_card", default=None
+)
+
+PROMETHEUS_PREFIX = "lorcana"
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+class RunMetrics:
+    """
+    Durées par étape et compteurs d'une exécution
+
+    Les étapes (chargement de page, parsing, appels Sheets, SMTP...) sont
+    mesurées avec stage() et agrégées globalement et par carte ; les
+    compteurs (pages, cache, appels API, relances, alertes) avec incr().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Remet les mesures à zéro (début d'une exécution)"""
+        with self._lock:
+            self.started_at = time.time()
+            self._stages: dict[str, dict] = {}
+            self._cards: dict[str, dict[str, float]] = {}
+            self._counters: dict[tuple[str, tuple], float] = {}
+
+    @contextmanager
+    def card(self, card_name: str) -> Iterator[None]:
+        """Rattache les étapes mesurées dans ce bloc à une carte"""
+        token = _current_card.set(card_name)
+        try:
+            yield
+        finally:
+            _current_card.reset(token)
+
+    @contextmanager
+    def stage(self, name: str, card: Optional[str] = None) -> Iterator[None]:
+        """
+        Mesure la durée d'une étape
+
+        card rattache la durée à une carte sans passer par card() : à utiliser
+        autour d'un await, où d'autres cartes avancent pendant la mesure.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, card)
+
+    def observe(self, name: str, seconds: float, card: Optional[str] = None):
+        """Enregistre une durée pour une étape"""
+        card_name = card or _current_card.get()
+        with self._lock:
+            stage = self._stages.setdefault(name, {"count": 0, "sum": 0.0, "max": 0.0})
+            stage["count"] += 1
+            stage["sum"] += seconds
+            stage["max"] = max(stage["max"], seconds)
+            if card_name is not None:
+                card_stages = self._cards.setdefault(card_name, {})
+                card_stages[name] = card_stages.get(name, 0.0) + seconds
+
+    def incr(self, name: str, value: float = 1, **labels):
+        """Incrémente un compteur (pages, cache, appels API, relances, alertes)"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self) -> dict:
+        """Copie des étapes et compteurs, pour calculer ce qu'un traitement y ajoute"""
+        with self._lock:
+            return {
+                "stages": {name: dict(stage) for name, stage in self._stages.items()},
+                "counters": dict(self._counters),
+            }
+
+    def changes_since(self, snapshot: dict) -> dict:
+        """
+        Étapes et compteurs ajoutés depuis snapshot(), à renvoyer au processus
+        principal par un processus de parsing (voir merge())
+        """
+        current = self.snapshot()
+        stages = {}
+        for name, stage in current["stages"].items():
+            before = snapshot["stages"].get(name, {"count": 0, "sum": 0.0})
+            if stage["count"] > before["count"]:
+                stages[name] = {
+                    "count": stage["count"] - before["count"],
+                    "sum": stage["sum"] - before["sum"],
+                    "max": stage["max"],
+                }
+        counters = {
+            key: value - snapshot["counters"].get(key, 0)
+            for key, value in current["counters"].items()
+            if value != snapshot["counters"].get(key, 0)
+        }
+        return {"stages": stages, "counters": counters}
+
+    def merge(self, changes: dict, card: Optional[str] = None):
+        """Ajoute les mesures faites dans un autre processus (changes_since())"""
+        with self._lock:
+            for name, change in changes["stages"].items():
+                stage = self._stages.setdefault(
+                    name, {"count": 0, "sum": 0.0, "max": 0.0}
+                )
+                stage["count"] += change["count"]
+                stage["sum"] += change["sum"]
+                stage["max"] = max(stage["max"], change["max"])
+                if card is not None:
+                    card_stages = self._cards.setdefault(card, {})
+                    card_stages[name] = card_stages.get(name, 0.0) + change["sum"]
+            for key, value in changes["counters"].items():
+                self._counters[key] = self._counters.get(key, 0) + value
+
+    def to_dict(self) -> dict:
+        """Mesures au format JSON"""
+        with self._lock:
+            return {
+                "started_at": self.started_at,
+                "duration_s": round(time.time() - self.started_at, 3),
+                "stages": {
+                    name: {
+                        "count": stage["count"],
+                        "sum_s": round(stage["sum"], 6),
+                        "avg_s": round(stage["sum"] / stage["count"], 6),
+                        "max_s": round(stage["max"], 6),
+                    }
+                    for name, stage in sorted(self._stages.items())
+                },
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                "cards": {
+                    card: {name: round(seconds, 6) for name, seconds in stages.items()}
+                    for card, stages in self._cards.items()
+                },
+            }
+
+    def summary_table(self) -> str:
+        """Tableau récapitulatif des étapes et compteurs"""
+        data = self.to_dict()
+        lines = [
+            f"{'Étape':<28} {'Nombre':>8} {'Total (s)':>10} {'Moy. (ms)':>10} {'Max (ms)':>10}"
+        ]
+        for name, stage in sorted(
+            data["stages"].items(), key=lambda item: item[1]["sum_s"], reverse=True
+        ):
+            lines.append(
+                f"{name:<28} {stage['count']:>8} {stage['sum_s']:>10.2f} "
+                f"{stage['avg_s'] * 1000:>10.1f} {stage['max_s'] * 1000:>10.1f}"
+            )
+        lines.append("")
+        for counter in data["counters"]:
+            labels = ",".join(f"{k}={v}" for k, v in counter["labels"].items())
+            name = f"{counter['name']}{{{labels}}}" if labels else counter["name"]
+            lines.append(f"{name:<50} {counter['value']:>10g}")
+        lines.append(f"Durée totale : {data['duration_s']:.1f}s")
+        return "\n".join(lines)
+
+    def write_json(self, path: str):
+        """Écrit les mesures dans un fichier JSON"""
+        _atomic_write(path, json.dumps(self.to_dict(), indent=2, ensure_ascii=False))
+
+    def write_prometheus(self, path: str):
+        """Écrit les mesures au format textfile du node exporter Prometheus"""
+        _atomic_write(path, self.to_prometheus())
+
+    def to_prometheus(self) -> str:
+        """Mesures au format texte Prometheus"""
+        data = self.to_dict()
+        lines = [
+            f"# TYPE {PROMETHEUS_PREFIX}_run_duration_seconds gauge",
+            f"{PROMETHEUS_PREFIX}_run_duration_seconds {data['duration_s']}",
+            f"# TYPE {PROMETHEUS_PREFIX}_run_timestamp_seconds gauge",
+            f"{PROMETHEUS_PREFIX}_run_timestamp_seconds {data['started_at']:.0f}",
+            f"# TYPE {PROMETHEUS_PREFIX}_stage_seconds summary",
+        ]
+        for name, stage in data["stages"].items():
+            lines.append(
+                f'{PROMETHEUS_PREFIX}_stage_seconds_sum{{stage="{name}"}} {stage["sum_s"]}'
+            )
+            lines.append(
+                f'{PROMETHEUS_PREFIX}_stage_seconds_count{{stage="{name}"}} {stage["count"]}'
+            )
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_stage_max_seconds gauge")
+        for name, stage in data["stages"].items():
+            lines.append(
+                f'{PROMETHEUS_PREFIX}_stage_max_seconds{{stage="{name}"}} {stage["max_s"]}'
+            )
+
+        declared = set()
+        for counter in data["counters"]:
+            metric = f"{PROMETHEUS_PREFIX}_{counter['name']}_total"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            labels = ",".join(f'{k}="{v}"' for k, v in counter["labels"].items())
+            lines.append(f"{metric}{{{labels}}} {counter['value']}" if labels else f"{metric} {counter['value']}")
+        return "\n".join(lines) + "\n"
+
+
+def _atomic_write(path: str, content: str):
+    """Écrit un fichier via un fichier temporaire renommé (lecture jamais partielle)"""
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+# Mesures partagées par tous les modules pendant une exécution
+metrics = RunMetrics()
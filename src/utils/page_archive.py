@@ -0,0 +1,308 @@
+import glob
+import json
+import mmap
+import os
+import threading
+import time
+import zlib
+from datetime import timedelta
+from typing import Any, Iterator, NamedTuple, Optional
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard est optionnel
+    zstandard = None
+
+INDEX_SUFFIX = ".idx.jsonl"
+# Types de pages dont le contenu est du JSON (annonces de l'API Vinted,
+# cartes lues dans le sheet) plutôt que du HTML
+JSON_KINDS = {
+    "vinted_api",
+    "vinted_catalog_api",
+    "sheet_cards",
+    "cardmarket_fields",
+    "vinted_items",
+    "vinted_catalog_items",
+}
+SEGMENT_PREFIX = "pages-"
+
+# Archive ouverte par l'exécution en cours (voir PageArchive.__enter__)
+_active: Optional["PageArchive"] = None
+
+
+class ArchivedPage(NamedTuple):
+    """Entrée de l'index : emplacement d'une page dans son segment"""
+
+    segment: str
+    offset: int
+    length: int
+    codec: str
+    source: str
+    kind: str
+    key: str
+    url: str
+    page: int
+    fetched_at: float
+
+
+def _compressor(level: int):
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=level).compress
+    return "zlib", lambda data: zlib.compress(data, min(level, 9))
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Archive zstd : le paquet zstandard est nécessaire")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def encode_payload(kind: str, payload: Any) -> bytes:
+    """HTML tel quel, contenus JSON (JSON_KINDS) sérialisés"""
+    if kind in JSON_KINDS:
+        return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    return payload.encode("utf-8")
+
+
+def decode_payload(kind: str, data: bytes) -> Any:
+    text = data.decode("utf-8")
+    return json.loads(text) if kind in JSON_KINDS else text
+
+
+class PageArchive:
+    """
+    Archive en ajout seul des pages chargées pendant les exécutions
+
+    Chaque exécution écrit un segment (nouveau fichier au-delà de
+    max_segment_bytes) : une trame zstd indépendante par page, les trames
+    étant simplement mises bout à bout (`zstd -d` décompresse le segment
+    entier). L'index du segment (une ligne JSON par page : source, type,
+    clé, URL, date, position) est écrit après la trame, si bien qu'une page
+    interrompue par un arrêt brutal est simplement ignorée. Sans le paquet
+    zstandard, les trames sont compressées avec zlib (codec noté dans
+    l'index). Les segments plus vieux que `retention` sont supprimés à
+    l'ouverture.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        level: int = 3,
+        max_segment_bytes: int = 64 * 1024 * 1024,
+        retention: Optional[timedelta] = None,
+    ):
+        self.path = path
+        self.max_segment_bytes = max_segment_bytes
+        self.retention = retention
+        self.codec, self._compress = _compressor(level)
+        self.pages = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._lock = threading.Lock()
+        self._segment: Optional[str] = None
+        self._data = None
+        self._index = None
+        os.makedirs(path, exist_ok=True)
+        if retention:
+            self._prune(retention)
+
+    def _prune(self, retention: timedelta):
+        limit = time.time() - retention.total_seconds()
+        for index_path in glob.glob(os.path.join(self.path, f"*{INDEX_SUFFIX}")):
+            segment_path = index_path[: -len(INDEX_SUFFIX)]
+            if os.path.getmtime(index_path) >= limit:
+                continue
+            for stale in (index_path, segment_path):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            logger.info(f"Segment d'archive expiré supprimé : {segment_path}")
+
+    def _open_segment(self):
+        self._close_segment()
+        name = f"{SEGMENT_PREFIX}{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        suffix = 0
+        while os.path.exists(os.path.join(self.path, f"{name}-{suffix}.{self.codec}")):
+            suffix += 1
+        self._segment = f"{name}-{suffix}.{self.codec}"
+        segment_path = os.path.join(self.path, self._segment)
+        self._data = open(segment_path, "ab")
+        self._index = open(f"{segment_path}{INDEX_SUFFIX}", "a", encoding="utf-8")
+
+    def _close_segment(self):
+        for f in (self._data, self._index):
+            if f is not None:
+                f.close()
+        self._data = self._index = None
+
+    def add(
+        self,
+        source: str,
+        kind: str,
+        key: str,
+        payload: Any,
+        url: str = "",
+        page: int = 1,
+    ):
+        """Compresse et ajoute une page à l'archive"""
+        raw = encode_payload(kind, payload)
+        frame = self._compress(raw)
+        with self._lock:
+            if self._data is None or self._data.tell() >= self.max_segment_bytes:
+                self._open_segment()
+            offset = self._data.tell()
+            self._data.write(frame)
+            self._data.flush()
+            self._index.write(
+                json.dumps(
+                    {
+                        "offset": offset,
+                        "length": len(frame),
+                        "codec": self.codec,
+                        "source": source,
+                        "kind": kind,
+                        "key": key,
+                        "url": url,
+                        "page": page,
+                        "fetched_at": time.time(),
+                    },
+                    ensure_ascii=False,
+                )
+                + "\n"
+            )
+            self._index.flush()
+            self.pages += 1
+            self.bytes_in += len(raw)
+            self.bytes_out += len(frame)
+
+    def rotate(self):
+        """
+        Termine le segment en cours (la page suivante en ouvre un nouveau)
+        et supprime les segments expirés, pour un processus de longue durée
+        (--daemon)
+        """
+        with self._lock:
+            self._close_segment()
+        if self.retention:
+            self._prune(self.retention)
+
+    def close(self):
+        global _active
+        with self._lock:
+            self._close_segment()
+        if _active is self:
+            _active = None
+        if self.pages:
+            logger.info(
+                f"Archive des pages : {self.pages} pages, "
+                f"{self.bytes_in / 1e6:.1f} Mo compressés en {self.bytes_out / 1e6:.1f} Mo"
+            )
+
+    def __enter__(self) -> "PageArchive":
+        """Désigne l'archive comme celle de l'exécution en cours (archive_page)"""
+        global _active
+        _active = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def archive_page(
+    source: str, kind: str, key: str, payload: Any, url: str = "", page: int = 1
+):
+    """Ajoute une page chargée à l'archive de l'exécution, s'il y en a une"""
+    archive = _active
+    if archive is None or payload is None:
+        return
+    try:
+        archive.add(source, kind, key, payload, url, page)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Impossible d'archiver la page {url or key} : {e}")
+
+
+class ArchiveReader:
+    """
+    Lecture d'une archive de pages
+
+    Les index de tous les segments sont chargés ; les segments sont ouverts
+    en mmap et chaque page n'est décompressée qu'à sa lecture.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: list[ArchivedPage] = []
+        self._maps: dict[str, mmap.mmap] = {}
+        self._files = []
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"Archive introuvable : {path}")
+        for index_path in sorted(glob.glob(os.path.join(path, f"*{INDEX_SUFFIX}"))):
+            self._load_index(index_path)
+        self.entries.sort(key=lambda entry: entry.fetched_at)
+
+    def _load_index(self, index_path: str):
+        segment = os.path.basename(index_path[: -len(INDEX_SUFFIX)])
+        segment_path = os.path.join(self.path, segment)
+        if not os.path.exists(segment_path):
+            return
+        size = os.path.getsize(segment_path)
+        with open(index_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Dernière ligne tronquée par un arrêt brutal
+                    continue
+                if record["offset"] + record["length"] > size:
+                    continue
+                self.entries.append(ArchivedPage(segment=segment, **record))
+
+    def _map(self, segment: str) -> mmap.mmap:
+        mapped = self._maps.get(segment)
+        if mapped is None:
+            f = open(os.path.join(self.path, segment), "rb")
+            self._files.append(f)
+            mapped = self._maps[segment] = mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        return mapped
+
+    def read(self, entry: ArchivedPage) -> Any:
+        """Contenu d'une page : HTML, ou annonces JSON pour l'API Vinted"""
+        mapped = self._map(entry.segment)
+        data = _decompress(entry.codec, mapped[entry.offset : entry.offset + entry.length])
+        return decode_payload(entry.kind, data)
+
+    def select(
+        self,
+        kinds: Optional[set[str]] = None,
+        since: Optional[float] = None,
+    ) -> Iterator[ArchivedPage]:
+        """Entrées de l'index filtrées par type et date de chargement"""
+        for entry in self.entries:
+            if kinds is not None and entry.kind not in kinds:
+                continue
+            if since is not None and entry.fetched_at < since:
+                continue
+            yield entry
+
+    def close(self):
+        for mapped in self._maps.values():
+            mapped.close()
+        for f in self._files:
+            f.close()
+        self._maps.clear()
+        self._files.clear()
+
+    def __enter__(self) -> "ArchiveReader":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
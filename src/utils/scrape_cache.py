@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pytz
+from pydantic import BaseModel
+
+from utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Dates de mise à jour du sheet à comparer aux relevés, par source
+SHEET_DATE_FIELDS = {"cardmarket": "last_update", "vinted": "vinted_last_update"}
+
+
+def cache_key(card, source: str) -> str:
+    """Clé des résultats d'une carte pour une source (URL Cardmarket ou nom)"""
+    return card.cardmarket_url if source == "cardmarket" else card.name_fr
+
+
+def last_checked(card, source: str, cache: Optional["ScrapeCache"]) -> Optional[datetime]:
+    """
+    Date du dernier relevé d'une source pour une carte
+
+    Avec SHEET_TIMESTAMP_POLICY=changed, la date du sheet est celle du dernier
+    changement de prix : la date du relevé mémorisée dans le cache est
+    retenue si elle est plus récente.
+    """
+    sheet_date = getattr(card, SHEET_DATE_FIELDS[source])
+    fetched_at = cache.fetched_at(source, cache_key(card, source)) if cache else None
+    if fetched_at is None or (sheet_date is not None and sheet_date >= fetched_at):
+        return sheet_date
+    return fetched_at
+
+
+class ScrapeCache:
+    """
+    Cache des derniers résultats de scraping, persisté sur disque
+
+    Les entrées sont indexées par source et par clé (URL Cardmarket ou
+    recherche Vinted) ; une entrée plus vieille que le TTL de sa source est
+    ignorée, et les moins récemment utilisées sont supprimées au-delà de
+    max_entries.
+    """
+
+    def __init__(self, path: str, ttls: dict[str, timedelta], max_entries: int = 10000):
+        self.path = path
+        self.ttls = ttls
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._entries = OrderedDict(json.load(f))
+            logger.debug(f"{len(self._entries)} entrées chargées depuis {self.path}")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache de scraping illisible, il sera recréé : {e}")
+
+    def ttl(self, source: str) -> timedelta:
+        """Durée de validité des résultats d'une source"""
+        return self.ttls.get(source, timedelta(0))
+
+    def is_fresh(self, source: str, when: Optional[datetime]) -> bool:
+        """Indique si une mise à jour faite à `when` est encore valide"""
+        if when is None:
+            return False
+        age = datetime.now(when.tzinfo) - when
+        return age < self.ttl(source)
+
+    def get(self, source: str, key: str) -> Optional[dict]:
+        """Retourne les données encore valides pour une clé, ou None"""
+        cache_key = f"{source}:{key}"
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry and time.time() - entry["fetched_at"] < self.ttl(source).total_seconds():
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return entry["data"]
+            self.misses += 1
+            return None
+
+    def fetched_at(self, source: str, key: str) -> Optional[datetime]:
+        """Date du dernier résultat mémorisé pour une clé, même expiré"""
+        with self._lock:
+            entry = self._entries.get(f"{source}:{key}")
+        if entry is None:
+            return None
+        return datetime.fromtimestamp(entry["fetched_at"], pytz.timezone("Europe/Paris"))
+
+    def put(self, source: str, key: str, value: BaseModel):
+        """Mémorise le résultat d'un scraping"""
+        cache_key = f"{source}:{key}"
+        with self._lock:
+            self._entries[cache_key] = {
+                "fetched_at": time.time(),
+                "data": value.model_dump(mode="json"),
+            }
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def save(self):
+        """Écrit le cache sur disque (remplacement atomique du fichier)"""
+        cache_dir = os.path.dirname(self.path)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        with self._lock:
+            data = dict(self._entries)
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Impossible d'enregistrer le cache de scraping : {e}")
+
+    def __enter__(self) -> "ScrapeCache":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.save()
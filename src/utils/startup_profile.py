@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+from typing import NamedTuple
+
+
+class ImportTiming(NamedTuple):
+    """Durée d'import d'un module (en secondes), mesurée par -X importtime"""
+
+    module: str
+    self_s: float
+    cumulative_s: float
+    depth: int
+
+
+def parse_importtime(output: str) -> list[ImportTiming]:
+    """Analyse la sortie de `python -X importtime`"""
+    timings = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # ligne d'en-tête
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        timings.append(
+            ImportTiming(
+                stripped,
+                int(parts[0]) / 1e6,
+                int(parts[1]) / 1e6,
+                (len(name) - len(stripped) - 1) // 2,
+            )
+        )
+    return timings
+
+
+def profile_imports(modules: list[str]) -> list[ImportTiming]:
+    """
+    Importe les modules dans un nouvel interpréteur et mesure chaque import
+
+    Le processus enfant part du dossier src/ et de l'environnement courant,
+    comme une exécution normale de main.py.
+    """
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=src_dir,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return parse_importtime(result.stderr)
+
+
+def startup_report(modules: list[str], top: int = 25) -> str:
+    """Tableau des imports les plus coûteux au démarrage"""
+    timings = profile_imports(modules)
+    total = sum(timing.cumulative_s for timing in timings if timing.depth == 0)
+    lines = [
+        f"Imports au démarrage : {total * 1e3:.0f} ms ({len(timings)} modules)",
+        f"{'module':<50} {'cumulé (ms)':>12} {'propre (ms)':>12}",
+    ]
+    for timing in sorted(timings, key=lambda t: t.cumulative_s, reverse=True)[:top]:
+        name = "  " * timing.depth + timing.module
+        lines.append(
+            f"{name[:50]:<50} {timing.cumulative_s * 1e3:>12.1f} {timing.self_s * 1e3:>12.1f}"
+        )
+    return "\n".join(lines)
@@ -1,7 +1,14 @@
+import importlib.util
 import unicodedata
 import re
-from thefuzz import fuzz
+from functools import lru_cache
+from typing import Sequence
+from rapidfuzz import fuzz, process
 from utils.logger import setup_logger
+from utils.metrics import metrics
+
+# numpy (nécessaire à process.cdist) n'est importé qu'au premier appel
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
 
 logger = setup_logger(__name__)
 
@@ -23,6 +30,13 @@ STOP_WORDS = {
     "carte",
 }
 
+PUNCTUATION_RE = re.compile(r"[^\w\s]")
+SPACES_RE = re.compile(r"\s+")
+
+# Proportion des mots-clés de la carte devant figurer dans le titre
+KEYWORD_RATIO = 0.8
+
+
 def normalize_text(text: str) -> str:
     """
     Normalise un texte en retirant les accents, la ponctuation,
@@ -35,16 +49,26 @@ def normalize_text(text: str) -> str:
     text = unicodedata.normalize("NFKD", text).encode("ASCII", "ignore").decode()
 
     # Retirer la ponctuation et les caractères spéciaux
-    text = re.sub(r"[^\w\s]", "", text)
+    text = PUNCTUATION_RE.sub("", text)
 
     # Remplacer les espaces multiples par un seul espace
-    text = re.sub(r"\s+", " ", text)
+    text = SPACES_RE.sub(" ", text)
 
     # Filtrer les mots vides
     words = [w for w in text.split() if w not in STOP_WORDS]
 
     return " ".join(words)
 
+
+# Les mêmes noms de cartes et titres d'annonces reviennent d'une page à l'autre
+_normalize_cached = lru_cache(maxsize=20000)(normalize_text)
+
+
+def _fuzzy_score(norm_card_name: str, norm_title: str) -> int:
+    """Score partial_ratio arrondi à l'entier, comme thefuzz"""
+    return int(round(fuzz.partial_ratio(norm_card_name, norm_title)))
+
+
 def is_title_match(card_name: str, title: str, threshold: int = 80) -> bool:
     """
     Vérifie si le titre correspond au nom de la carte
@@ -54,20 +78,20 @@ def is_title_match(card_name: str, title: str, threshold: int = 80) -> bool:
         title: Titre de l'annonce
         threshold: Seuil de similarité (0-100)
     """
-    norm_card_name = normalize_text(card_name)
-    norm_title = normalize_text(title)
+    norm_card_name = _normalize_cached(card_name)
+    norm_title = _normalize_cached(title)
 
     # Vérification exacte après normalisation
     if norm_card_name in norm_title:
-        logger.info(f"Correspondance exacte trouvée: '{card_name}' dans '{title}'")
+        logger.debug("Correspondance exacte trouvée: '%s' dans '%s'", card_name, title)
         return True
 
     # Vérification par ratio de similarité
-    ratio = fuzz.partial_ratio(norm_card_name, norm_title)
-    logger.debug(f"Ratio de similarité: {ratio}%")
+    ratio = _fuzzy_score(norm_card_name, norm_title)
+    logger.debug("Ratio de similarité: %d%%", ratio)
     if ratio >= threshold:
-        logger.info(
-            f"Correspondance approximative ({ratio}%): '{card_name}' ~ '{title}'"
+        logger.debug(
+            "Correspondance approximative (%d%%): '%s' ~ '%s'", ratio, card_name, title
         )
         return True
 
@@ -76,12 +100,136 @@ def is_title_match(card_name: str, title: str, threshold: int = 80) -> bool:
     title_keywords = set(norm_title.split())
     common_keywords = card_keywords & title_keywords
 
-    logger.debug(f"Mots-clés communs: {len(common_keywords)}>{len(card_keywords)*0.8}")
+    logger.debug(
+        "Mots-clés communs: %d>%s", len(common_keywords), len(card_keywords) * 0.8
+    )
     if (
-        len(common_keywords) >= len(card_keywords) * 0.8
+        len(common_keywords) >= len(card_keywords) * KEYWORD_RATIO
     ):  # 80% des mots-clés doivent correspondre
-        logger.debug(f"Correspondance par mots-clés: {common_keywords}")
+        logger.debug("Correspondance par mots-clés: %s", common_keywords)
         return True
 
-    logger.debug(f"Pas de correspondance: '{card_name}' ≠ '{title}'")
+    logger.debug("Pas de correspondance: '%s' ≠ '%s'", card_name, title)
     return False
+
+
+class TitleMatcher:
+    """
+    Compare des pages entières de titres à une ou plusieurs cartes
+
+    Les noms de cartes sont normalisés une seule fois. Pour chaque lot de
+    titres, les trois niveaux de is_title_match sont évalués ensemble :
+    - inclusion et similarité : un seul appel rapidfuzz (cdist) avec seuil,
+      une inclusion donnant toujours un partial_ratio de 100 ;
+    - mots-clés : comptage via un index inversé mot -> cartes.
+
+    Quand un titre correspond à plusieurs cartes aux noms voisins (« Mickey
+    Mouse - Ami Fidèle » et « Minnie Mouse - Amie Fidèle »), seules les plus
+    précises sont gardées (_disambiguate).
+    """
+
+    def __init__(self, card_names: Sequence[str], threshold: int = 80):
+        self.card_names = list(card_names)
+        self.threshold = threshold
+        self._norm_names = [_normalize_cached(name) for name in self.card_names]
+        self._keyword_counts = [len(set(name.split())) for name in self._norm_names]
+        self._keyword_index: dict[str, list[int]] = {}
+        for i, norm_name in enumerate(self._norm_names):
+            for keyword in set(norm_name.split()):
+                self._keyword_index.setdefault(keyword, []).append(i)
+        # Cartes sans mot-clé : toujours considérées comme correspondantes
+        self._always = {i for i, count in enumerate(self._keyword_counts) if not count}
+
+    def _fuzzy_matches(self, norm_titles: list[str]) -> list[set[int]]:
+        # Seuil abaissé de 0.5 puis contrôle de l'arrondi, pour reproduire
+        # exactement int(round(score)) >= threshold
+        cutoff = self.threshold - 0.5
+        matches: list[set[int]] = [set() for _ in norm_titles]
+        if not self._norm_names or not norm_titles:
+            return matches
+
+        if HAS_NUMPY:
+            scores = process.cdist(
+                norm_titles,
+                self._norm_names,
+                scorer=fuzz.partial_ratio,
+                score_cutoff=cutoff,
+            )
+            for t, c in zip(*scores.nonzero()):
+                if round(float(scores[t, c])) >= self.threshold:
+                    matches[t].add(int(c))
+            return matches
+
+        for t, norm_title in enumerate(norm_titles):
+            for _, score, c in process.extract(
+                norm_title,
+                self._norm_names,
+                scorer=fuzz.partial_ratio,
+                score_cutoff=cutoff,
+                limit=None,
+            ):
+                if round(score) >= self.threshold:
+                    matches[t].add(c)
+        return matches
+
+    def _keyword_matches(self, norm_title: str) -> set[int]:
+        counts: dict[int, int] = {}
+        for keyword in set(norm_title.split()):
+            for i in self._keyword_index.get(keyword, ()):
+                counts[i] = counts.get(i, 0) + 1
+        return {
+            i
+            for i, count in counts.items()
+            if count >= self._keyword_counts[i] * KEYWORD_RATIO
+        }
+
+    def _disambiguate(self, norm_title: str, matched: set[int]) -> set[int]:
+        """
+        Cartes retenues parmi plusieurs correspondances : celles dont le nom
+        figure en entier dans le titre (sauf si ce nom est inclus dans celui
+        d'une autre carte retenue), sinon la carte au meilleur score ; à
+        égalité, le titre est trop vague pour choisir et n'est attribué à
+        aucune carte
+        """
+        included = {i for i in matched if self._norm_names[i] in norm_title}
+        if included:
+            return {
+                i
+                for i in included
+                if not any(
+                    j != i
+                    and self._norm_names[i] != self._norm_names[j]
+                    and self._norm_names[i] in self._norm_names[j]
+                    for j in included
+                )
+            }
+        scores = {i: _fuzzy_score(self._norm_names[i], norm_title) for i in matched}
+        best = max(scores.values())
+        leaders = {i for i, score in scores.items() if score == best}
+        return leaders if len(leaders) == 1 else set()
+
+    def match_indices(self, titles: Sequence[str]) -> list[list[int]]:
+        """Pour chaque titre, indices des cartes correspondantes"""
+        with metrics.stage("matching"):
+            norm_titles = [_normalize_cached(title) for title in titles]
+            fuzzy = self._fuzzy_matches(norm_titles)
+
+            results = []
+            for t, norm_title in enumerate(norm_titles):
+                matched = fuzzy[t] | self._keyword_matches(norm_title)
+                if len(matched) > 1:
+                    matched = self._disambiguate(norm_title, matched)
+                results.append(sorted(matched | self._always))
+        metrics.incr("titles_matched", len(titles))
+        return results
+
+    def match(self, titles: Sequence[str]) -> list[list[str]]:
+        """Pour chaque titre, noms des cartes correspondantes"""
+        return [
+            [self.card_names[i] for i in indices]
+            for indices in self.match_indices(titles)
+        ]
+
+    def title_matches(self, titles: Sequence[str]) -> list[bool]:
+        """Pour une seule carte : indique quels titres lui correspondent"""
+        return [bool(indices) for indices in self.match_indices(titles)]
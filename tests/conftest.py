@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# Les modules de l'application sont importés comme depuis src/ (python src/main.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+os.environ.setdefault(
+    "GOOGLE_SHEETS_URL", "https://docs.google.com/spreadsheets/d/tests/edit"
+)
+# Le fichier de log des tests est écrit hors du dépôt
+os.environ.setdefault("LOG_DIR", tempfile.mkdtemp(prefix="lorcana_price_logs_"))
@@ -0,0 +1,317 @@
+"""
+Doublures du navigateur et de Vinted pour les tests
+
+- stub_server : petit site local qui enregistre les chemins demandés
+- StubSB : imite le SB de SeleniumBase ; open() charge la page du serveur
+  puis ses ressources (img, link, script) sauf celles qui correspondent aux
+  motifs de Network.setBlockedURLs. C'est la doublure qui applique ces
+  motifs : elle ne prouve pas que Chrome les respecte
+- vinted_stub : imite la page d'accueil (cookie de session), l'API du
+  catalogue et la page de recherche de Vinted
+- StubSheets : imite service.spreadsheets().values() (batchGet,
+  batchUpdate, append) sur un onglet en mémoire ; les lignes ajoutées aux
+  autres onglets sont gardées dans appended
+"""
+
+import json
+import os
+import re
+import threading
+import urllib.request
+from contextlib import contextmanager
+from typing import Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urljoin, urlparse
+
+RESOURCE_RE = re.compile(r'<(?:img|script)[^>]*\ssrc="([^"]+)"|<link[^>]*\shref="([^"]+)"')
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<link rel="stylesheet" href="/static/site.css">
+<link rel="preload" href="/static/font.woff2">
+<script src="/static/app.js"></script>
+<script src="{tracker}/gtm.js"></script>
+</head>
+<body>
+<img src="/images/card.webp">
+<img src="/images/logo.png?v=3">
+<div class="feed-grid"><div class="feed-grid__item">Carte</div></div>
+</body>
+</html>
+"""
+
+
+class StubServer:
+    """Serveur HTTP local ; `requests` liste les chemins demandés dans l'ordre"""
+
+    def __init__(self):
+        self.requests: list[str] = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.path)
+                if self.path.startswith("/page"):
+                    body = PAGE.format(tracker=server.tracker_url).encode()
+                    content_type = "text/html; charset=utf-8"
+                else:
+                    body = b""
+                    content_type = "application/octet-stream"
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_port}"
+        # Même serveur sous un autre nom d'hôte, pour les traceurs tiers
+        self.tracker_url = f"http://localhost:{self._httpd.server_port}/googletagmanager.com"
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, args=(0.05,), daemon=True
+        )
+        self._thread.start()
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@contextmanager
+def stub_server():
+    server = StubServer()
+    try:
+        yield server
+    finally:
+        server.close()
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+class VintedStub:
+    """
+    Vinted local : « / » pose le cookie access_token_web, l'API du catalogue
+    exige ce cookie (401 sinon) puis répond les statuts de
+    `api_statuses` (200 une fois la liste vide), les autres chemins servent
+    une page de recherche (tests/fixtures/vinted_catalog.html)
+
+    `requests` liste les couples (chemin, cookie reçu) dans l'ordre.
+    """
+
+    def __init__(self):
+        self.requests: list[tuple[str, str]] = []
+        self.home_status = 200
+        self.api_statuses: list[int] = []
+        self.items = [
+            {"id": 7, "title": "Elsa Reine des Neiges", "price": {"amount": "3.0"}, "url": "/items/7"}
+        ]
+        self.tokens = 0
+        with open(os.path.join(FIXTURES, "vinted_catalog.html"), encoding="utf-8") as f:
+            self.catalog_page = f.read()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = urlparse(self.path).path
+                cookie = self.headers.get("Cookie", "")
+                stub.requests.append((path, cookie))
+                headers = {}
+                if path == "/":
+                    status, body = stub.home_status, b"<html></html>"
+                    if status == 200:
+                        stub.tokens += 1
+                        headers["Set-Cookie"] = f"access_token_web=token{stub.tokens}; Path=/"
+                elif path == "/api/v2/catalog/items":
+                    if f"access_token_web=token{stub.tokens}" not in cookie:
+                        status = 401
+                    else:
+                        status = stub.api_statuses.pop(0) if stub.api_statuses else 200
+                    query = parse_qs(urlparse(self.path).query)
+                    body = json.dumps(
+                        {"items": stub.items, "search_text": query.get("search_text", [""])[0]}
+                    ).encode()
+                else:
+                    status, body = 200, stub.catalog_page.encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_port}"
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, args=(0.05,), daemon=True
+        )
+        self._thread.start()
+
+    def paths(self) -> list[str]:
+        return [path for path, _ in self.requests]
+
+    def expire_session(self):
+        """Le jeton en cours n'est plus accepté par l'API"""
+        self.tokens += 1
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+@contextmanager
+def vinted_stub():
+    stub = VintedStub()
+    try:
+        yield stub
+    finally:
+        stub.close()
+
+
+CELL_RE = re.compile(r"^([A-Z]+)(\d*)$")
+
+
+def _cell(ref: str) -> tuple[int, int]:
+    """("I", 2) pour "I2" : (indice de colonne, ligne ; 0 si absente)"""
+    letters, row = CELL_RE.match(ref).groups()
+    col = 0
+    for letter in letters:
+        col = col * 26 + ord(letter) - 64
+    return col - 1, int(row or 0)
+
+
+class _StubRequest:
+    def __init__(self, method: str, handler):
+        self.methodId = f"sheets.spreadsheets.values.{method}"
+        self._handler = handler
+
+    def execute(self):
+        return self._handler()
+
+
+class StubSheets:
+    """Onglet de Google Sheet en mémoire : rows[i] est la ligne i + 1"""
+
+    def __init__(self, rows: Optional[list[list]] = None):
+        self.rows = [list(row) for row in rows or []]
+        self.appended: dict[str, list[list]] = {}
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def _read(self, a1_range: str) -> dict:
+        start, _, end = a1_range.partition("!")[2].partition(":")
+        (c1, r1), (c2, _) = _cell(start), _cell(end)
+        return {"values": [row[c1 : c2 + 1] for row in self.rows[r1 - 1 :]]}
+
+    def _write(self, a1_range: str, values: list[list]):
+        start = a1_range.partition("!")[2].partition(":")[0]
+        col, row = _cell(start)
+        while len(self.rows) < row:
+            self.rows.append([])
+        cells = self.rows[row - 1]
+        for offset, value in enumerate(values[0]):
+            cells.extend([""] * (col + offset + 1 - len(cells)))
+            cells[col + offset] = value
+
+    def batchGet(self, spreadsheetId: str, ranges: list[str]):
+        return _StubRequest(
+            "batchGet", lambda: {"valueRanges": [self._read(r) for r in ranges]}
+        )
+
+    def batchUpdate(self, spreadsheetId: str, body: dict):
+        def handler():
+            for value_range in body["data"]:
+                self._write(value_range["range"], value_range["values"])
+            return {}
+
+        return _StubRequest("batchUpdate", handler)
+
+    def append(self, spreadsheetId: str, range: str, body: dict, **kwargs):
+        def handler():
+            self.appended.setdefault(range.partition("!")[0], []).extend(body["values"])
+            return {}
+
+        return _StubRequest("append", handler)
+
+
+def url_blocked(url: str, patterns: list[str]) -> bool:
+    """Correspondance d'un motif de Network.setBlockedURLs (`*` : toute suite)"""
+    return any(
+        re.fullmatch(".*".join(map(re.escape, pattern.split("*"))), url)
+        for pattern in patterns
+    )
+
+
+class StubDriver:
+    def __init__(self):
+        self.crashed = False
+
+    @property
+    def window_handles(self) -> list[str]:
+        if self.crashed:
+            raise ConnectionRefusedError("chromedriver ne répond plus")
+        return ["main"]
+
+
+class StubSB:
+    """SB de SeleniumBase réduit à ce qu'utilisent BrowserSession et les scrapers"""
+
+    instances: list["StubSB"] = []
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.driver = StubDriver()
+        self.blocked: list[str] = []
+        self.opened: list[str] = []
+        self.resets = 0
+        self.closed = False
+        self.page_source = ""
+        StubSB.instances.append(self)
+
+    def __enter__(self) -> "StubSB":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.closed = True
+
+    def execute_cdp_cmd(self, cmd: str, params: dict):
+        if cmd == "Network.setBlockedURLs":
+            self.blocked = list(params["urls"])
+
+    def open(self, url: str):
+        self.opened.append(url)
+        if not url.startswith("http"):
+            self.page_source = ""
+            return
+        with urllib.request.urlopen(url) as response:
+            self.page_source = response.read().decode()
+        for match in RESOURCE_RE.finditer(self.page_source):
+            resource = urljoin(url, match.group(1) or match.group(2))
+            if not url_blocked(resource, self.blocked):
+                urllib.request.urlopen(resource).close()
+
+    def wait_for_element(self, selector: str, timeout: float = 10):
+        pass
+
+    def get_page_source(self) -> str:
+        return self.page_source
+
+    def delete_all_cookies(self):
+        self.resets += 1
+
+    def clear_local_storage(self):
+        pass
+
+    def clear_session_storage(self):
+        pass
@@ -0,0 +1,201 @@
+import asyncio
+import socket
+import time
+from datetime import timedelta
+from email import message_from_bytes
+from email.header import decode_header, make_header
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from run_journal import RunJournal
+from utils import email_notifier
+from utils.alert_outbox import AlertOutbox
+from utils.email_notifier import Mailer
+from utils.metrics import metrics
+
+
+class RecordingHandler:
+    """Serveur SMTP de test : garde les messages reçus"""
+
+    def __init__(self, disconnect_after_message: bool = False):
+        self.messages = []
+        self.connections = 0
+        self.disconnect_after_message = disconnect_after_message
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(message_from_bytes(envelope.content))
+        if self.disconnect_after_message:
+            # Connexion coupée par le serveur juste après l'accusé de réception
+            asyncio.get_running_loop().call_soon(server.transport.close)
+        return "250 Message accepted for delivery"
+
+
+def _subjects(handler: RecordingHandler) -> list[str]:
+    return [str(make_header(decode_header(msg["Subject"]))) for msg in handler.messages]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(autouse=True)
+def addresses(monkeypatch):
+    monkeypatch.setattr(email_notifier.settings, "smtp_from_email", "lorcana@example.com")
+    monkeypatch.setattr(email_notifier.settings, "notification_email", "me@example.com")
+    metrics.reset()
+
+
+@pytest.fixture
+def smtp(request):
+    handler = RecordingHandler(**getattr(request, "param", {}))
+    controller = Controller(handler, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    try:
+        yield handler, Mailer("127.0.0.1", controller.port, security="none", timeout=5)
+    finally:
+        controller.stop()
+
+
+def _alert(card: str, url: str = "", vinted_price: float = 5.0) -> dict:
+    return {
+        "card_name": card,
+        "cardmarket_price": 10.0,
+        "vinted_price": vinted_price,
+        "vinted_url": url or f"https://www.vinted.fr/items/{card}",
+        "difference": 10.0 - vinted_price,
+    }
+
+
+def _counter(name: str) -> float:
+    return sum(
+        counter["value"]
+        for counter in metrics.to_dict()["counters"]
+        if counter["name"] == name
+    )
+
+
+def test_immediate_delivery_one_email_per_alert(smtp):
+    handler, mailer = smtp
+    with AlertOutbox(mailer) as outbox:
+        assert outbox.put(_alert("Elsa"))
+        assert outbox.put(_alert("Maui"))
+
+    assert _subjects(handler) == [
+        "🎴 Alerte prix Lorcana - Elsa",
+        "🎴 Alerte prix Lorcana - Maui",
+    ]
+    # Une seule connexion pour tous les envois
+    assert handler.connections == 1
+
+
+def test_digest_at_end_of_run(smtp):
+    handler, mailer = smtp
+    with AlertOutbox(mailer, digest_interval=timedelta(0)) as outbox:
+        for card in ("Elsa", "Maui", "Ariel"):
+            outbox.put(_alert(card))
+        time.sleep(0.1)
+        assert handler.messages == []
+
+    assert _subjects(handler) == ["🎴 Alertes prix Lorcana - 3 offres"]
+
+
+def test_periodic_digest(smtp):
+    handler, mailer = smtp
+    with AlertOutbox(mailer, digest_interval=timedelta(seconds=0.3)) as outbox:
+        outbox.put(_alert("Elsa"))
+        outbox.put(_alert("Maui"))
+        deadline = time.monotonic() + 5
+        while not handler.messages and time.monotonic() < deadline:
+            time.sleep(0.05)
+        outbox.put(_alert("Ariel"))
+
+    assert _subjects(handler) == [
+        "🎴 Alertes prix Lorcana - 2 offres",
+        "🎴 Alertes prix Lorcana - 1 offres",
+    ]
+
+
+def test_dedup_by_card_and_url(smtp, tmp_path):
+    handler, mailer = smtp
+    journal_path = str(tmp_path / "journal.jsonl")
+    with RunJournal(journal_path) as journal:
+        journal.start("sheet", "data")
+        with AlertOutbox(mailer, journal=journal) as outbox:
+            assert outbox.put(_alert("Elsa", "https://www.vinted.fr/items/1"))
+            assert not outbox.put(_alert("Elsa", "https://www.vinted.fr/items/1"))
+            # Même annonce pour une autre carte, autre annonce pour la même carte
+            assert outbox.put(_alert("Maui", "https://www.vinted.fr/items/1"))
+            assert outbox.put(_alert("Elsa", "https://www.vinted.fr/items/2"))
+        journal.complete()
+
+    # Exécution suivante : les annonces déjà signalées sont ignorées
+    with RunJournal(journal_path) as journal:
+        journal.start("sheet", "data")
+        with AlertOutbox(mailer, journal=journal) as outbox:
+            assert not outbox.put(_alert("Elsa", "https://www.vinted.fr/items/1"))
+
+    assert len(handler.messages) == 3
+
+
+@pytest.mark.parametrize("smtp", [{"disconnect_after_message": True}], indirect=True)
+def test_reconnect_after_server_disconnect(smtp):
+    handler, mailer = smtp
+    with AlertOutbox(mailer) as outbox:
+        for card in ("Elsa", "Maui", "Ariel"):
+            outbox.put(_alert(card))
+
+    assert len(handler.messages) == 3
+    assert handler.connections == 3
+    assert _counter("retries") == 2
+    assert _counter("alert_errors") == 0
+
+
+def test_failed_alerts_kept_in_journal_and_resent(smtp, tmp_path):
+    handler, mailer = smtp
+    journal_path = str(tmp_path / "journal.jsonl")
+    unreachable = Mailer("127.0.0.1", _free_port(), security="none", timeout=1)
+
+    with RunJournal(journal_path) as journal:
+        journal.start("sheet", "data")
+        with AlertOutbox(unreachable, journal=journal) as outbox:
+            outbox.put(_alert("Elsa"))
+        journal.complete()
+
+    assert _counter("alert_errors") == 1
+    with RunJournal(journal_path) as journal:
+        assert [alert["card_name"] for alert in journal.pending_alerts()] == ["Elsa"]
+        journal.start("sheet", "data")
+        with AlertOutbox(mailer, journal=journal) as outbox:
+            outbox.replay(journal.pending_alerts())
+        journal.complete()
+
+    assert _subjects(handler) == ["🎴 Alerte prix Lorcana - Elsa"]
+    with RunJournal(journal_path) as journal:
+        assert journal.pending_alerts() == []
+        assert journal.alert_sent("Elsa", "https://www.vinted.fr/items/Elsa")
+
+
+def test_retry_requeues_failed_alerts(smtp):
+    handler, mailer = smtp
+    outbox = AlertOutbox(Mailer("127.0.0.1", _free_port(), security="none", timeout=1))
+    try:
+        outbox.put(_alert("Elsa"))
+        deadline = time.monotonic() + 5
+        while outbox.busy and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not outbox.busy
+
+        outbox.mailer = mailer
+        assert outbox.retry() == 1
+    finally:
+        outbox.close()
+
+    assert _subjects(handler) == ["🎴 Alerte prix Lorcana - Elsa"]
@@ -0,0 +1,110 @@
+import sys
+import threading
+import types
+
+import pytest
+
+from scrapers.browser_pool import BrowserPool, borrow_browser
+from stubs import StubSB, stub_server
+from utils.metrics import metrics
+
+
+@pytest.fixture(autouse=True)
+def stub_seleniumbase(monkeypatch):
+    StubSB.instances.clear()
+    monkeypatch.setitem(sys.modules, "seleniumbase", types.SimpleNamespace(SB=StubSB))
+    metrics.reset()
+
+
+@pytest.fixture
+def server():
+    with stub_server() as server:
+        yield server
+
+
+def _counter(name: str) -> float:
+    return sum(
+        counter["value"]
+        for counter in metrics.to_dict()["counters"]
+        if counter["name"] == name
+    )
+
+
+def _load(pool: BrowserPool, source: str, url: str) -> StubSB:
+    with borrow_browser(pool, source) as sb:
+        sb.open(url)
+        return sb
+
+
+def test_session_reused_between_pages(server):
+    with BrowserPool(size=1, max_pages=10) as pool:
+        first = _load(pool, "cardmarket", f"{server.url}/page/1")
+        second = _load(pool, "cardmarket", f"{server.url}/page/2")
+
+    assert first is second
+    assert pool.launched == 1
+    assert [path for path in server.requests if path.startswith("/page")] == [
+        "/page/1",
+        "/page/2",
+    ]
+    assert first.resets == 0
+    assert first.closed
+
+
+def test_session_reset_when_source_changes(server):
+    with BrowserPool(size=1, max_pages=10) as pool:
+        sb = _load(pool, "cardmarket", f"{server.url}/page/1")
+        _load(pool, "vinted", f"{server.url}/page/2")
+
+    assert pool.launched == 1
+    assert sb.resets == 1
+    assert "about:blank" in sb.opened
+
+
+def test_session_recycled_after_max_pages(server):
+    with BrowserPool(size=1, max_pages=2) as pool:
+        sessions = [_load(pool, "vinted", f"{server.url}/page/{i}") for i in range(5)]
+
+    assert pool.launched == 3
+    assert sessions[0] is sessions[1]
+    assert sessions[1] is not sessions[2]
+    assert sessions[0].closed
+    assert _counter("browsers_launched") == 3
+
+
+def test_dead_session_replaced(server):
+    with BrowserPool(size=1, max_pages=10) as pool:
+        with borrow_browser(pool, "cardmarket") as sb:
+            sb.open(f"{server.url}/page/1")
+            sb.driver.crashed = True
+        replacement = _load(pool, "cardmarket", f"{server.url}/page/2")
+
+    assert replacement is not sb
+    assert sb.closed
+    assert pool.launched == 2
+    assert _counter("browser_crashes") == 1
+
+
+def test_pool_size_bounds_open_sessions(server):
+    in_use = []
+    peak = []
+    lock = threading.Lock()
+
+    def worker(pool: BrowserPool, n: int):
+        with borrow_browser(pool, "vinted") as sb:
+            with lock:
+                in_use.append(sb)
+                peak.append(len(in_use))
+            sb.open(f"{server.url}/page/{n}")
+            with lock:
+                in_use.remove(sb)
+
+    with BrowserPool(size=2, max_pages=100) as pool:
+        threads = [threading.Thread(target=worker, args=(pool, n)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert max(peak) <= 2
+    assert pool.launched <= 2
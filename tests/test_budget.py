@@ -0,0 +1,63 @@
+import argparse
+from datetime import timedelta
+
+import pytest
+
+from card_processing import reserve_budget
+from config import get_settings
+from main import duration_arg
+from models.card import Card
+from run_context import RunContext
+from scheduler import RunBudget
+
+settings = get_settings()
+
+
+def _card(n: int) -> Card:
+    return Card(
+        name_en=f"Card {n}",
+        name_fr=f"Carte {n}",
+        cardmarket_url=f"https://www.cardmarket.com/fr/Lorcana/Products/Singles/{n}",
+        current_price=1.0,
+        row=n,
+    )
+
+
+def test_vinted_search_reserves_all_result_pages(monkeypatch):
+    monkeypatch.setattr(settings, "vinted_max_pages", 3)
+    budget = RunBudget(max_pages=8)
+    ctx = RunContext(store=None, sources=["cardmarket", "vinted"], budget=budget)
+
+    assert reserve_budget(_card(1), ctx, ["cardmarket", "vinted"])
+    assert budget.pages == 4
+    assert reserve_budget(_card(2), ctx, ["cardmarket", "vinted"])
+    assert not reserve_budget(_card(3), ctx, ["vinted"])
+    assert budget.pages == 8
+
+
+def test_harvested_vinted_prices_cost_no_page(monkeypatch):
+    monkeypatch.setattr(settings, "vinted_max_pages", 3)
+    budget = RunBudget(max_pages=1)
+    ctx = RunContext(
+        store=None, sources=["cardmarket", "vinted"], budget=budget, vinted_harvest={}
+    )
+
+    assert reserve_budget(_card(1), ctx, ["cardmarket", "vinted"])
+    assert budget.pages == 1
+
+
+def test_duration_arg():
+    assert duration_arg("15m") == timedelta(minutes=15)
+    with pytest.raises(argparse.ArgumentTypeError):
+        duration_arg("quinze minutes")
+
+
+def test_invalid_budget_is_a_usage_error(capsys):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=duration_arg)
+
+    with pytest.raises(SystemExit) as exc:
+        parser.parse_args(["--budget", "15 min"])
+
+    assert exc.value.code == 2
+    assert "Durée invalide" in capsys.readouterr().err
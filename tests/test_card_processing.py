@@ -0,0 +1,88 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+import card_processing
+from card_processing import fetch_card_prices
+from models.card import Card
+from models.price_info import VintedPriceInfo
+from run_context import RunContext
+from run_journal import RunJournal
+from utils.scrape_cache import ScrapeCache
+
+CARD = Card(
+    name_en="Elsa - Snow Queen",
+    name_fr="Elsa - Reine des Neiges",
+    cardmarket_url=None,
+    current_price=None,
+    row=2,
+)
+
+
+@pytest.fixture
+def vinted_prices(monkeypatch):
+    """Chaque relevé Vinted renvoie un prix supérieur de 4 € au précédent"""
+    prices = iter(range(1, 100, 4))
+
+    def fetch(card_name, pool):
+        return VintedPriceInfo(
+            min_price=float(next(prices)),
+            last_update=datetime.now(pytz.timezone("Europe/Paris")),
+            url="https://www.vinted.fr/items/1",
+        )
+
+    monkeypatch.setattr(card_processing, "get_vinted_prices", fetch)
+
+
+def _ctx(journal: RunJournal, tmp_path, ttl: timedelta) -> RunContext:
+    cache = ScrapeCache(str(tmp_path / "cache.json"), {"vinted": ttl})
+    return RunContext(store=None, sources=["vinted"], journal=journal, cache=cache)
+
+
+def _prices(ctx: RunContext, count: int) -> list[float]:
+    return [fetch_card_prices(CARD, ctx, ["vinted"])[1].min_price for _ in range(count)]
+
+
+def test_journaled_results_ignored_without_resume(vinted_prices, tmp_path):
+    journal = RunJournal(str(tmp_path / "journal.jsonl"))
+    journal.start("sheet", "data")
+
+    assert _prices(_ctx(journal, tmp_path, timedelta(0)), 3) == [1.0, 5.0, 9.0]
+    journal.close()
+
+
+def test_resumed_run_reuses_fresh_results(vinted_prices, tmp_path, monkeypatch):
+    path = str(tmp_path / "journal.jsonl")
+    journal = RunJournal(path)
+    journal.start("sheet", "data")
+    _prices(_ctx(journal, tmp_path, timedelta(0)), 1)
+    journal.close()
+
+    journal = RunJournal(path)
+    assert journal.start("sheet", "data", resume=True)
+    # Sans cache, seul le journal peut fournir le prix, pendant VINTED_TTL
+    ctx = RunContext(store=None, sources=["vinted"], journal=journal)
+    monkeypatch.setattr(card_processing.settings, "vinted_ttl", "1h")
+    assert _prices(ctx, 1) == [1.0]
+    # Résultat plus vieux que la durée de validité de la source : rechargé
+    monkeypatch.setattr(card_processing.settings, "vinted_ttl", "0")
+    assert _prices(ctx, 1) == [5.0]
+    journal.close()
+
+
+def test_results_of_old_journals_expire(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    started = time.time() - 7200
+    path.write_text(
+        f'{{"type": "run_start", "seq": 1, "ts": {started}, "sheet_id": "sheet", "sheet_name": "data"}}\n'
+        '{"type": "result", "seq": 2, "source": "vinted", "key": "Elsa", "data": {"p": 1}}\n',
+        encoding="utf-8",
+    )
+    journal = RunJournal(str(path))
+    journal.start("sheet", "data", resume=True)
+
+    assert journal.result("vinted", "Elsa", timedelta(hours=3)) == {"p": 1}
+    assert journal.result("vinted", "Elsa", timedelta(hours=1)) is None
+    journal.close()
@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+import pytest
+
+from daemon import MIN_CYCLE_SECONDS, PriceDaemon, daemon_ttls
+from run_context import RunContext
+from utils.scrape_cache import ScrapeCache
+
+
+class _Store:
+    def fingerprint(self):
+        return "v1"
+
+
+def _ctx(tmp_path, sources, ttls=None) -> RunContext:
+    cache = None
+    if ttls is not None:
+        cache = ScrapeCache(str(tmp_path / "cache.json"), ttls)
+    return RunContext(store=_Store(), sources=sources, cache=cache)
+
+
+def test_ttls_of_followed_sources(tmp_path):
+    ctx = _ctx(
+        tmp_path,
+        ["cardmarket", "vinted"],
+        {"cardmarket": timedelta(hours=6), "vinted": timedelta(minutes=30)},
+    )
+
+    assert daemon_ttls(ctx) == {"cardmarket": 6 * 3600, "vinted": 30 * 60}
+
+
+@pytest.mark.parametrize(
+    "sources, ttls",
+    [
+        ([], {"cardmarket": timedelta(hours=6)}),
+        (["cardmarket"], None),
+        (["cardmarket", "vinted"], {"cardmarket": timedelta(hours=6)}),
+        (["vinted"], {"vinted": timedelta(0)}),
+    ],
+    ids=["no-source", "no-cache", "missing-ttl", "zero-ttl"],
+)
+def test_daemon_refused_without_usable_ttl(tmp_path, sources, ttls):
+    with pytest.raises(ValueError):
+        PriceDaemon([], _ctx(tmp_path, sources, ttls), 1, "data", lambda: None)
+
+
+def test_cycle_follows_shortest_ttl(tmp_path):
+    ctx = _ctx(
+        tmp_path,
+        ["cardmarket", "vinted"],
+        {"cardmarket": timedelta(hours=6), "vinted": timedelta(minutes=30)},
+    )
+
+    daemon = PriceDaemon([], ctx, 2, "data", lambda: None)
+
+    assert daemon.schedule.cycle == max(30 * 60, MIN_CYCLE_SECONDS)
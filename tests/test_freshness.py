@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+from card_processing import stale_sources
+from daemon import CardSchedule
+from models.card import Card
+from models.price_info import PriceInfo
+from run_context import RunContext
+from scheduler import card_priority
+from utils.scrape_cache import ScrapeCache, last_checked
+
+PARIS = pytz.timezone("Europe/Paris")
+TTLS = {"cardmarket": timedelta(hours=12), "vinted": timedelta(hours=6)}
+
+
+def _card(days_since_change: float) -> Card:
+    # Avec SHEET_TIMESTAMP_POLICY=changed, les dates du sheet sont celles du
+    # dernier changement de prix, pas du dernier relevé
+    changed_at = datetime.now(PARIS) - timedelta(days=days_since_change)
+    return Card(
+        name_en="Elsa - Snow Queen",
+        name_fr="Elsa - Reine des Neiges",
+        cardmarket_url="https://www.cardmarket.com/fr/Lorcana/Products/Singles/elsa",
+        current_price=12.5,
+        last_update=changed_at,
+        vinted_last_update=changed_at,
+        row=2,
+    )
+
+
+def _price_info() -> PriceInfo:
+    return PriceInfo(
+        current_price=12.5,
+        trend_price=14.0,
+        avg_30_days=13.75,
+        available_items=10,
+        min_price=12.5,
+        last_update=datetime.now(PARIS),
+    )
+
+
+def _checked_cache(tmp_path, card: Card) -> ScrapeCache:
+    cache = ScrapeCache(str(tmp_path / "cache.json"), TTLS)
+    cache.put("cardmarket", card.cardmarket_url, _price_info())
+    cache.put("vinted", card.name_fr, _price_info())
+    return cache
+
+
+def test_last_checked_prefers_recent_scrape_over_sheet_date(tmp_path):
+    card = _card(days_since_change=3)
+    cache = _checked_cache(tmp_path, card)
+
+    checked = last_checked(card, "cardmarket", cache)
+
+    assert datetime.now(PARIS) - checked < timedelta(minutes=1)
+    assert last_checked(card, "cardmarket", None) == card.last_update
+
+
+def test_unchanged_prices_stay_fresh(tmp_path):
+    card = _card(days_since_change=3)
+    ctx = RunContext(
+        store=None, sources=["cardmarket", "vinted"], cache=_checked_cache(tmp_path, card)
+    )
+
+    assert stale_sources(card, ctx) == []
+
+
+def test_unchecked_card_is_stale(tmp_path):
+    card = _card(days_since_change=3)
+    ctx = RunContext(
+        store=None,
+        sources=["cardmarket", "vinted"],
+        cache=ScrapeCache(str(tmp_path / "cache.json"), TTLS),
+    )
+
+    assert stale_sources(card, ctx) == ["cardmarket", "vinted"]
+
+
+def test_priority_age_uses_last_check(tmp_path):
+    card = _card(days_since_change=3)
+    cache = _checked_cache(tmp_path, card)
+    now = datetime.now(PARIS)
+
+    checked = card_priority(card, {}, {}, ["cardmarket", "vinted"], now, cache)
+    unchecked = card_priority(card, {}, {}, ["cardmarket", "vinted"], now)
+
+    assert checked < unchecked / 10
+
+
+def test_schedule_due_after_last_check(tmp_path):
+    card = _card(days_since_change=3)
+    cache = _checked_cache(tmp_path, card)
+    ttls = {source: ttl.total_seconds() for source, ttl in TTLS.items()}
+
+    due_at = CardSchedule(ttls, 3600, cache).due_at(card)
+
+    expected = datetime.now(PARIS).timestamp() + TTLS["vinted"].total_seconds()
+    assert abs(due_at - expected) < 60
@@ -0,0 +1,118 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+from history_report import drops_table, stats_table
+from history_store import PriceHistoryStore
+from sheets import export_history_summary
+from stubs import StubSheets
+
+PARIS = pytz.timezone("Europe/Paris")
+
+
+@pytest.fixture
+def history(tmp_path):
+    with PriceHistoryStore(str(tmp_path / "history.db")) as store:
+        yield store
+
+
+def _count(history: PriceHistoryStore) -> int:
+    return history._conn.execute("SELECT COUNT(*) FROM price_history").fetchone()[0]
+
+
+def test_points_written_by_batch(tmp_path):
+    with PriceHistoryStore(str(tmp_path / "history.db"), batch_size=3) as history:
+        history.add("Elsa", "Vinted", 10.0)
+        history.add("Elsa", "Vinted", 11.0, when=datetime.now(pytz.utc) - timedelta(hours=1))
+        assert _count(history) == 0
+        history.add("Stitch", "Vinted", 3.0)
+        assert _count(history) == 3
+        history.add("Stitch", "Cardmarket", 4.0)
+    with PriceHistoryStore(str(tmp_path / "history.db")) as history:
+        assert _count(history) == 4
+
+
+def test_same_second_keeps_distinct_prices(history):
+    now = datetime.now(pytz.utc)
+    history.add("Elsa", "Vinted", 10.0, when=now)
+    history.add("Elsa", "Vinted", 8.0, when=now)
+    # Rejeu du journal : le même relevé n'est gardé qu'une fois
+    history.add("Elsa", "Vinted", 10.0, when=now)
+    history.flush()
+    assert _count(history) == 2
+    assert history.price_stats("Elsa", "Vinted") == {
+        "min": 8.0,
+        "avg": 9.0,
+        "max": 10.0,
+        "count": 2,
+    }
+
+
+def test_old_key_migrated(tmp_path):
+    path = str(tmp_path / "history.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE price_history (card TEXT NOT NULL, source TEXT NOT NULL, "
+        "ts INTEGER NOT NULL, price REAL NOT NULL, url TEXT, "
+        "PRIMARY KEY (card, source, ts)) WITHOUT ROWID"
+    )
+    conn.execute("CREATE INDEX idx_price_history_source_ts ON price_history (source, ts)")
+    conn.execute("INSERT INTO price_history VALUES ('Elsa', 'Vinted', 100, 10.0, NULL)")
+    conn.commit()
+    conn.close()
+
+    with PriceHistoryStore(path) as history:
+        history.add_many([("Elsa", "Vinted", 100, 8.0, None)])
+        assert _count(history) == 2
+
+
+def test_price_stats_window(history):
+    now = datetime.now(pytz.utc)
+    history.add("Elsa", "Vinted", 10.0, when=now - timedelta(days=2))
+    history.add("Elsa", "Vinted", 20.0, when=now - timedelta(days=40))
+    history.add("Elsa", "Cardmarket", 15.0, when=now)
+    history.flush()
+    assert history.price_stats("Elsa", "Vinted")["count"] == 1
+    assert history.price_stats("Elsa", "Vinted", days=60)["max"] == 20.0
+    assert history.price_stats("Stitch", "Vinted") is None
+
+    table = stats_table(history, "Elsa")
+    assert "Cardmarket      15.00    15.00    15.00        1" in table
+    assert "Vinted          10.00    10.00    10.00        1" in table
+
+
+def test_price_drops(history):
+    since = datetime.now(PARIS) - timedelta(hours=1)
+    before, after = since - timedelta(hours=2), since + timedelta(minutes=30)
+    history.add("Elsa", "Vinted", 10.0, when=before)
+    history.add("Elsa", "Vinted", 12.0, when=after - timedelta(minutes=5))
+    history.add("Elsa", "Vinted", 7.0, when=after)
+    history.add("Stitch", "Vinted", 3.0, when=before)
+    history.add("Stitch", "Vinted", 4.0, when=after)
+    history.add("Mulan", "Vinted", 5.0, when=after)
+    history.flush()
+
+    assert history.price_drops("Vinted", since) == [
+        {"card": "Elsa", "price": 7.0, "previous_price": 10.0}
+    ]
+    assert history.price_drops("Cardmarket", since) == []
+    assert "  Elsa : 10.00€ -> 7.00€" in drops_table(history, since)
+
+
+def test_daily_summary_exported_once(history):
+    yesterday = datetime.now(PARIS).replace(hour=12) - timedelta(days=1)
+    history.add("Elsa", "Vinted", 10.0, when=yesterday)
+    history.add("Elsa", "Vinted", 14.0, when=yesterday + timedelta(hours=1))
+    history.add("Elsa", "Vinted", 5.0, when=datetime.now(PARIS))
+    history.flush()
+    sheet = StubSheets()
+
+    export_history_summary(sheet, "sheet", "Historique", history)
+    export_history_summary(sheet, "sheet", "Historique", history)
+
+    assert sheet.appended["Historique"] == [
+        ["Elsa", yesterday.strftime("%d/%m/%Y"), 12.0, "Vinted", 10.0, 14.0, 2]
+    ]
+    assert history.pending_export_days() == []
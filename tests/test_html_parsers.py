@@ -0,0 +1,173 @@
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+from scrapers import html_parsers
+from scrapers.cardmarket import parse_price_info
+from scrapers.vinted import parse_vinted_listings
+from utils.string_matcher import is_title_match
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+CARDMARKET_PAGES = (
+    "cardmarket_product.html",
+    "cardmarket_partial.html",
+    "cardmarket_no_info.html",
+)
+VINTED_PAGES = ("vinted_catalog.html", "vinted_empty.html", "vinted_no_grid.html")
+BACKENDS = ("lxml", "bs4")
+
+
+def _fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, monkeypatch):
+    monkeypatch.setattr(html_parsers.settings, "html_parser_backend", request.param)
+    return request.param
+
+
+# Parseurs d'origine (BeautifulSoup sur la page complète), avant l'ajout de
+# html_parsers : ils servent de référence
+
+
+def legacy_cardmarket_prices(html_content: str):
+    soup = BeautifulSoup(html_content, "html.parser")
+    info_container = soup.find("div", class_="info-list-container")
+    if not info_container:
+        return None
+
+    def get_price_by_label(label: str) -> float:
+        dt = info_container.find("dt", string=label)
+        if dt:
+            dd = dt.find_next("dd")
+            if dd:
+                text = dd.get_text().strip()
+                return float(text.replace("€", "").replace(",", ".").strip())
+        return 0
+
+    available_dt = info_container.find("dt", string="Articles disponibles")
+    available_items = 0
+    if available_dt:
+        available_dd = available_dt.find_next("dd")
+        if available_dd:
+            available_items = int(available_dd.text.strip())
+    return (
+        get_price_by_label("De"),
+        get_price_by_label("Tendance des prix"),
+        get_price_by_label("Prix moyen 30 jours"),
+        available_items,
+    )
+
+
+def legacy_vinted_items(html_content: str):
+    soup = BeautifulSoup(html_content, "html.parser")
+    items = []
+    for item in soup.find_all("div", class_="feed-grid__item"):
+        if "feed-grid__item--full-row" in item.get("class", []):
+            continue
+        link = item.find(
+            "a", {"data-testid": lambda x: x and x.endswith("--overlay-link")}
+        )
+        if not link:
+            continue
+        price = item.find("span", class_=html_parsers.VINTED_PRICE_CLASS)
+        items.append(
+            (
+                link.get("title", ""),
+                price.text.strip() if price else None,
+                link.get("href", ""),
+            )
+        )
+    return items
+
+
+def legacy_vinted_first_price(html_content: str, card_name: str):
+    for full_title, price_text, url in legacy_vinted_items(html_content):
+        title = full_title.split(", marque")[0]
+        if not is_title_match(card_name, title) or not price_text:
+            continue
+        try:
+            return float(price_text.replace("€", "").replace(",", ".")), url
+        except ValueError:
+            continue
+    return None
+
+
+@pytest.mark.parametrize("page", CARDMARKET_PAGES)
+def test_cardmarket_fields_same_for_both_backends(page, monkeypatch):
+    html = _fixture(page)
+    results = []
+    for name in BACKENDS:
+        monkeypatch.setattr(html_parsers.settings, "html_parser_backend", name)
+        results.append(html_parsers.extract_cardmarket_fields(html))
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize("page", CARDMARKET_PAGES)
+def test_parse_price_info_matches_legacy(page, backend):
+    html = _fixture(page)
+    expected = legacy_cardmarket_prices(html)
+
+    price_info = parse_price_info(html)
+
+    if expected is None:
+        assert price_info is None
+        return
+    assert (
+        price_info.current_price,
+        price_info.trend_price,
+        price_info.avg_30_days,
+        price_info.available_items,
+    ) == expected
+    assert price_info.min_price == price_info.current_price
+
+
+def test_cardmarket_product_values(backend):
+    fields = html_parsers.extract_cardmarket_fields(_fixture("cardmarket_product.html"))
+
+    assert fields == {
+        "De": "12,50 €",
+        "Tendance des prix": "14,02 €",
+        "Prix moyen 30 jours": "13,75 €",
+        "Articles disponibles": "187",
+    }
+
+
+@pytest.mark.parametrize("page", VINTED_PAGES)
+def test_vinted_items_match_legacy(page, backend):
+    html = _fixture(page)
+
+    items = html_parsers.extract_vinted_items(html)
+
+    assert [tuple(item) for item in items] == legacy_vinted_items(html)
+
+
+def test_vinted_items_skip_ads_and_items_without_overlay_link(backend):
+    items = html_parsers.extract_vinted_items(_fixture("vinted_catalog.html"))
+
+    urls = [item.url for item in items]
+    assert "https://ads.example/1" not in urls
+    assert "https://www.vinted.fr/items/106-elsa" not in urls
+    assert len(items) == 6
+    # Le prix d'une annonce réservée n'a pas la classe attendue
+    assert items[2].price_text is None
+
+
+@pytest.mark.parametrize("page", VINTED_PAGES)
+@pytest.mark.parametrize(
+    "card_name", ["Elsa Reine des Neiges", "Mickey Souris Brave", "Hadès Seigneur"]
+)
+def test_parse_vinted_listings_matches_legacy(page, card_name, backend):
+    html = _fixture(page)
+    expected = legacy_vinted_first_price(html, card_name)
+
+    price_info = parse_vinted_listings(html, card_name)
+
+    if expected is None:
+        assert price_info is None
+        return
+    assert (price_info.min_price, price_info.url) == expected
+    assert price_info.urlSearch is None
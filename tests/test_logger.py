@@ -0,0 +1,75 @@
+import logging
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import logger as logger_module
+from utils.logger import RateLimitFilter, setup_logger
+
+
+def _record(msg: str, lineno: int) -> logging.LogRecord:
+    return logging.LogRecord(
+        "scrapers.vinted", logging.DEBUG, "/src/scrapers/vinted.py", lineno, msg, None, None
+    )
+
+
+def test_rate_limit_keys_on_call_site_not_text():
+    rate_filter = RateLimitFilter(limit=3, window=60)
+
+    # Même appel, texte différent à chaque fois (f-string)
+    passed = [
+        rate_filter.filter(_record(f"Analyse de l'annonce : carte {n}", 42))
+        for n in range(10)
+    ]
+
+    assert passed == [True] * 3 + [False] * 7
+    assert rate_filter.filter(_record("Autre message", 43))
+
+
+def test_rate_limit_reports_dropped_messages():
+    rate_filter = RateLimitFilter(limit=1, window=0.05)
+    for n in range(4):
+        rate_filter.filter(_record(f"Prix trouvé : {n}", 42))
+    time.sleep(0.06)
+
+    record = _record("Prix trouvé : 5", 42)
+    assert rate_filter.filter(record)
+    assert "3 messages similaires ignorés" in record.msg
+
+
+def test_rate_limit_leaves_info_untouched():
+    rate_filter = RateLimitFilter(limit=1, window=60)
+    records = [_record("Carte traitée", 42) for _ in range(3)]
+    for record in records:
+        record.levelno = logging.INFO
+
+    assert all(rate_filter.filter(record) for record in records)
+
+
+def _log_in_child(marker: str) -> bool:
+    setup_logger("tests.child").warning("Message du processus enfant %s", marker)
+    handler = logger_module._handler
+    return handler.child and handler.queue is logger_module._child_queue
+
+
+def test_child_process_logs_go_through_parent():
+    setup_logger("tests.parent")
+    marker = uuid.uuid4().hex
+    context = multiprocessing.get_context("fork")
+    with ProcessPoolExecutor(1, mp_context=context) as executor:
+        assert executor.submit(_log_in_child, marker).result()
+
+    log_file = next(
+        handler.baseFilename
+        for handler in logger_module._handler.handlers
+        if isinstance(handler, logging.FileHandler)
+    )
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with open(log_file, encoding="utf-8") as f:
+            if f"Message du processus enfant {marker}" in f.read():
+                break
+        time.sleep(0.05)
+    else:
+        raise AssertionError("message du processus enfant absent du fichier de log")
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+import pipeline
+from models.card import Card
+from pipeline import CardPipeline
+from run_context import RunContext
+from utils.metrics import metrics
+
+TITLES = ("Elsa Reine des Neiges Lorcana", "Mickey Souris Brave", "Maui Demi-dieu")
+
+
+def _cards(count: int) -> list[Card]:
+    return [
+        Card(
+            name_en=f"Elsa {n}",
+            name_fr="Elsa Reine des Neiges" if n % 2 else "Maui Demi-dieu",
+            cardmarket_url=f"https://www.cardmarket.com/fr/Lorcana/Products/Singles/{n}",
+            current_price=10.0,
+            row=n + 2,
+        )
+        for n in range(count)
+    ]
+
+
+def fake_fetch_raw(card, source, ctx, page=1):
+    if source == "cardmarket":
+        return "cardmarket_fields", {
+            "De": "8,00 €",
+            "Tendance des prix": "9,00 €",
+            "Prix moyen 30 jours": "9,50 €",
+            "Articles disponibles": "12",
+        }
+    if page > 1:
+        return None
+    return "vinted_items", [
+        [f"{title}, marque: Disney", f"{n + 2},00 €", f"/items/{n}"]
+        for n, title in enumerate(TITLES)
+    ]
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setattr(pipeline, "fetch_raw", fake_fetch_raw)
+    monkeypatch.setattr(pipeline.settings, "vinted_max_pages", 1)
+    metrics.reset()
+
+
+def _run(ctx: RunContext, cards: list[Card], queue_size: int = 32):
+    runner = CardPipeline(ctx, parse_workers=2, queue_size=queue_size)
+    asyncio.run(asyncio.wait_for(runner.run(cards), timeout=60))
+
+
+def _counter(name: str) -> float:
+    return sum(
+        counter["value"]
+        for counter in metrics.to_dict()["counters"]
+        if counter["name"] == name
+    )
+
+
+def test_worker_metrics_merged_into_parent(monkeypatch):
+    written = []
+    monkeypatch.setattr(
+        pipeline, "write_card_prices", lambda card, *args: written.append(card.row)
+    )
+    cards = _cards(6)
+
+    _run(RunContext(store=None, sources=["cardmarket", "vinted"]), cards)
+
+    assert sorted(written) == [card.row for card in cards]
+    data = metrics.to_dict()
+    # Titres comparés dans les processus de parsing
+    assert _counter("titles_matched") == len(cards) * len(TITLES)
+    assert data["stages"]["matching"]["count"] == len(cards)
+    # Durées rattachées à la carte analysée, pas à celle du voisin
+    assert set(data["cards"]) == {"Elsa Reine des Neiges", "Maui Demi-dieu"}
+    for stages in data["cards"].values():
+        assert "vinted_parse" in stages and "matching" in stages
+
+
+def test_stage_failure_cancels_pipeline(monkeypatch):
+    def broken_alert(*args):
+        raise RuntimeError("alerte impossible")
+
+    monkeypatch.setattr(pipeline, "write_card_prices", lambda *args: None)
+    monkeypatch.setattr(pipeline, "price_alert", broken_alert)
+
+    # Avec des files d'un élément, les étapes amont attendraient sans fin
+    # une place dans la file de la correspondance arrêtée
+    with pytest.raises(RuntimeError, match="alerte impossible"):
+        _run(RunContext(store=None, sources=["cardmarket", "vinted"]), _cards(40), 1)
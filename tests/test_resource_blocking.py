@@ -0,0 +1,124 @@
+import sys
+import types
+
+import pytest
+
+from scrapers import resource_blocking
+from scrapers.browser_pool import BrowserPool, borrow_browser
+from scrapers.resource_blocking import (
+    BLOCK_PROFILES,
+    apply_resource_blocking,
+    blocked_url_patterns,
+)
+from stubs import StubSB, stub_server, url_blocked
+
+settings = resource_blocking.settings
+
+IMAGE = "https://images1.vinted.net/t/01_abc/f800/1712345678.webp?s=2f3a"
+FONT = "https://static.cardmarket.com/fonts/roboto.woff2"
+STYLESHEET = "https://static.cardmarket.com/css/main.css?v=20260901"
+TRACKER = "https://www.googletagmanager.com/gtm.js?id=GTM-XXXX"
+SCRIPT = "https://static.cardmarket.com/js/app.js"
+PAGE = "https://www.cardmarket.com/fr/Lorcana/Products/Singles/elsa"
+
+
+@pytest.fixture(autouse=True)
+def lean_profile(monkeypatch):
+    monkeypatch.setattr(settings, "browser_block_profile", "lean")
+    monkeypatch.setattr(settings, "cardmarket_block_allowlist", "")
+    monkeypatch.setattr(settings, "vinted_block_allowlist", "")
+
+
+def test_lean_profile_blocks_every_category():
+    patterns = blocked_url_patterns("cardmarket")
+
+    assert patterns == [p for category in BLOCK_PROFILES["lean"].values() for p in category]
+    for url in (IMAGE, FONT, STYLESHEET, TRACKER):
+        assert url_blocked(url, patterns), url
+    for url in (PAGE, SCRIPT):
+        assert not url_blocked(url, patterns), url
+
+
+def test_off_and_unknown_profiles_block_nothing():
+    assert blocked_url_patterns("vinted", "off") == []
+    assert blocked_url_patterns("vinted", "strict") == []
+
+
+def test_category_allowlist_only_applies_to_its_site(monkeypatch):
+    monkeypatch.setattr(settings, "vinted_block_allowlist", "images, trackers")
+
+    vinted = blocked_url_patterns("vinted")
+    cardmarket = blocked_url_patterns("cardmarket")
+
+    assert not url_blocked(IMAGE, vinted)
+    assert not url_blocked(TRACKER, vinted)
+    assert url_blocked(FONT, vinted)
+    assert url_blocked(IMAGE, cardmarket)
+    assert url_blocked(TRACKER, cardmarket)
+
+
+def test_pattern_allowlist_keeps_the_rest_of_the_category(monkeypatch):
+    monkeypatch.setattr(settings, "cardmarket_block_allowlist", "*.woff*")
+
+    patterns = blocked_url_patterns("cardmarket")
+
+    assert "*.woff*" not in patterns
+    assert "*.ttf*" in patterns
+    assert not url_blocked(FONT, patterns)
+    assert url_blocked("https://static.cardmarket.com/fonts/icons.ttf", patterns)
+
+
+def test_apply_sends_patterns_to_chrome():
+    sb = StubSB()
+
+    apply_resource_blocking(sb, "cardmarket")
+
+    assert sb.blocked == blocked_url_patterns("cardmarket")
+
+
+@pytest.fixture
+def stub_browser(monkeypatch):
+    monkeypatch.setitem(sys.modules, "seleniumbase", types.SimpleNamespace(SB=StubSB))
+    with stub_server() as server:
+        yield server
+
+
+def _resources(server) -> set[str]:
+    return {path for path in server.requests if not path.startswith("/page")}
+
+
+def test_blocked_resources_never_requested(stub_browser):
+    """
+    Vérifie les motifs envoyés à Network.setBlockedURLs, pas Chrome : c'est
+    StubSB qui les applique en chargeant la page. Que Chrome les respecte
+    n'est vérifiable qu'avec un vrai navigateur
+    """
+    with BrowserPool(size=1) as pool:
+        with borrow_browser(pool, "cardmarket") as sb:
+            sb.open(f"{stub_browser.url}/page/1")
+
+    assert _resources(stub_browser) == {"/static/app.js"}
+
+
+def test_allowlisted_resources_requested(stub_browser, monkeypatch):
+    """Motifs de chaque source, appliqués par StubSB (voir ci-dessus)"""
+    monkeypatch.setattr(settings, "vinted_block_allowlist", "images,*.css*")
+
+    with BrowserPool(size=1) as pool:
+        with borrow_browser(pool, "vinted") as sb:
+            sb.open(f"{stub_browser.url}/page/1")
+        vinted_resources = _resources(stub_browser)
+        # La liste est remplacée quand la session passe à une autre source
+        stub_browser.requests.clear()
+        with borrow_browser(pool, "cardmarket") as sb:
+            sb.open(f"{stub_browser.url}/page/2")
+        cardmarket_resources = _resources(stub_browser)
+
+    assert pool.launched == 1
+    assert vinted_resources == {
+        "/static/app.js",
+        "/static/site.css",
+        "/images/card.webp",
+        "/images/logo.png?v=3",
+    }
+    assert cardmarket_resources == {"/static/app.js"}
@@ -0,0 +1,150 @@
+import json
+
+from pydantic import BaseModel
+
+from run_journal import RunJournal
+from sheets import SheetWriteBuffer
+
+
+class _Price(BaseModel):
+    price: float
+
+
+class _FlakySheets:
+    """Service Sheets minimal dont les `failures` premiers appels échouent"""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.sent = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def batchUpdate(self, spreadsheetId, body):
+        return _Request(self, body["data"])
+
+    def append(self, spreadsheetId, range, valueInputOption, insertDataOption, body):
+        return _Request(self, body["values"])
+
+
+class _Request:
+    def __init__(self, service, payload):
+        self.service = service
+        self.payload = payload
+
+    def execute(self):
+        if self.service.failures:
+            self.service.failures -= 1
+            raise OSError("503 Service Unavailable")
+        self.service.sent.append(self.payload)
+
+
+def _records(path) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def _interrupted_journal(path) -> None:
+    journal = RunJournal(str(path))
+    journal.start("sheet", "data")
+    journal.record_write("update", {"range": "data!I2", "values": [[1.5]]})
+    journal.close()
+    # Arrêt brutal au milieu de l'écriture d'un événement
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type": "write", "kind": "upd')
+
+
+def test_resume_after_partial_line_appends_on_a_new_line(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    _interrupted_journal(path)
+
+    journal = RunJournal(str(path))
+    assert journal.start("sheet", "data", resume=True)
+    journal.record_write("update", {"range": "data!I3", "values": [[2.5]]})
+    journal.close()
+
+    records = _records(path)
+    assert [record["type"] for record in records] == ["run_start", "write", "write"]
+    assert RunJournal(str(path)).pending_writes() == [
+        ("update", {"range": "data!I2", "values": [[1.5]]}),
+        ("update", {"range": "data!I3", "values": [[2.5]]}),
+    ]
+
+
+def test_partial_first_line_is_dropped(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_text('{"type": "run_st', encoding="utf-8")
+
+    journal = RunJournal(str(path))
+    journal.start("sheet", "data", resume=True)
+    journal.close()
+
+    assert [record["type"] for record in _records(path)] == ["run_start"]
+
+
+def test_complete_journal_left_untouched(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = RunJournal(str(path))
+    journal.start("sheet", "data")
+    journal.record_done(type("Card", (), {"row": 2, "name_fr": "Elsa"})())
+    journal.close()
+    before = path.read_bytes()
+
+    journal = RunJournal(str(path))
+    journal.start("sheet", "data", resume=True)
+    journal.close()
+
+    assert path.read_bytes() == before
+
+
+def test_restart_carries_pending_writes_and_queued_alerts(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = RunJournal(str(path))
+    journal.start("sheet", "data")
+    journal.record_write("update", {"range": "data!I2", "values": [[1.5]]})
+    journal.record_write("update", {"range": "data!I3", "values": [[2.5]]})
+    journal.record_flushed("update", journal.seq)
+    journal.record_write("update", {"range": "data!I4", "values": [[3.5]]})
+    journal.record_result("vinted", "Elsa", _Price(price=1.0))
+    journal.record_alert_queued({"card_name": "Elsa", "vinted_url": "/items/1"})
+
+    pending = journal.restart("sheet", "data")
+
+    assert pending == [("update", {"range": "data!I4", "values": [[3.5]]})]
+    assert journal.pending_writes() == pending
+    assert journal.result("vinted", "Elsa") is None
+    journal.close()
+    # Le journal recommencé suffit à reprendre après un arrêt brutal
+    reloaded = RunJournal(str(path))
+    assert reloaded.pending_writes() == pending
+    assert [alert["card_name"] for alert in reloaded.pending_alerts()] == ["Elsa"]
+    assert [record["type"] for record in _records(path)] == [
+        "alert_queued",
+        "run_start",
+        "write",
+    ]
+
+
+def test_write_buffer_keeps_failed_writes(tmp_path):
+    journal = RunJournal(str(tmp_path / "journal.jsonl"))
+    journal.start("sheet", "data")
+    service = _FlakySheets(failures=2)
+    buffer = SheetWriteBuffer(service, "sheet", max_rows=100, journal=journal)
+    buffer.add_update([{"range": "data!I2", "values": [[1.5]]}])
+    buffer.add_history_row("Historique", ["Elsa", 1.5])
+
+    buffer.flush()
+    assert buffer.pending() == 2
+    assert len(journal.pending_writes()) == 2
+
+    buffer.flush()
+    assert buffer.pending() == 0
+    assert journal.pending_writes() == []
+    assert service.sent == [
+        [{"range": "data!I2", "values": [[1.5]]}],
+        [["Elsa", 1.5]],
+    ]
+    journal.close()
@@ -0,0 +1,122 @@
+import importlib.util
+from datetime import datetime
+
+import pytest
+import pytz
+
+from models.price_info import PriceInfo, VintedPriceInfo
+from storage import backends
+from storage.backends import check_backend, import_from_sheet, open_store, sync_to_sheet
+from storage.base import CardStore
+from storage.local_store import LocalCardStore
+from stubs import StubSheets
+
+LOCAL = ["sqlite", "csv", "parquet"]
+SHEET_ROWS = [
+    ["Name (EN)", "Name (FR)", "Set"],
+    ["Elsa - Snow Queen", "Elsa - Reine des Neiges", "1"] + [""] * 5
+    + ["https://www.cardmarket.com/fr/Lorcana/Products/Singles/Elsa", "12,50 €"],
+    ["Stitch - Rock Star", "Stitch - Rock Star", "2"],
+]
+
+
+@pytest.fixture
+def local_store(request, tmp_path, monkeypatch):
+    """Ouvre un stockage local ; rouvert à l'identique par un second appel"""
+    backend = request.param
+    if backend == "parquet":
+        pytest.importorskip("pyarrow")
+    path = str(tmp_path / f"cards.{backend}")
+    monkeypatch.setattr(backends.settings, "storage_path", path)
+    monkeypatch.setattr(
+        backends.settings, "storage_sync_state_path", str(tmp_path / "sync.json")
+    )
+    return lambda: open_store(backend)
+
+
+def test_stores_are_abstract():
+    with pytest.raises(TypeError):
+        CardStore()
+
+    class NoWrite(LocalCardStore):
+        def _load_records(self):
+            return []
+
+    with pytest.raises(TypeError):
+        NoWrite("cards.db")
+
+
+def test_unknown_backend_refused():
+    with pytest.raises(ValueError):
+        check_backend("excel")
+
+
+@pytest.mark.skipif(
+    importlib.util.find_spec("pyarrow") is not None, reason="pyarrow est installé"
+)
+def test_parquet_without_pyarrow_refused():
+    with pytest.raises(ValueError, match="pyarrow"):
+        open_store("parquet")
+
+
+@pytest.mark.parametrize("local_store", LOCAL, indirect=True)
+def test_prices_round_trip(local_store):
+    now = datetime.now(pytz.timezone("Europe/Paris")).replace(microsecond=0)
+    with local_store() as store:
+        store.import_records(
+            [{"row": 2, "name_en": "Elsa - Snow Queen", "name_fr": "Elsa", "set_code": "1"}]
+        )
+        store.update_card_prices(
+            2,
+            PriceInfo(
+                min_price=10.0,
+                current_price=10.0,
+                trend_price=11.5,
+                avg_30_days=12.0,
+                available_items=7,
+            ),
+            current_min=12.0,
+        )
+        store.update_vinted_price(
+            2,
+            VintedPriceInfo(
+                min_price=8.0, last_update=now, url="https://www.vinted.fr/items/1"
+            ),
+        )
+        expected = store.records()
+
+    with local_store() as store:
+        assert store.records() == expected
+        [card] = store.get_cards()
+    assert (card.row, card.name_en, card.set_code) == (2, "Elsa - Snow Queen", "1")
+    assert (card.current_price, card.trend_price, card.min_price) == (10.0, 11.5, 10.0)
+    assert expected[0]["available_items"] == 7
+    assert expected[0]["vinted_min"] == 8.0
+    assert card.vinted_last_update == now
+
+
+@pytest.mark.parametrize("local_store", LOCAL, indirect=True)
+def test_sheet_round_trip(local_store):
+    sheet = StubSheets(SHEET_ROWS)
+    with local_store() as store:
+        assert import_from_sheet(store, sheet, "sheet", "data") == 2
+        [elsa, stitch] = store.get_cards()
+        assert elsa.cardmarket_url.endswith("/Elsa")
+        assert elsa.current_price == 12.5
+        assert stitch.current_price is None
+        store.update_vinted_price(
+            3, VintedPriceInfo(min_price=4.5, url="https://www.vinted.fr/items/3")
+        )
+        written = sync_to_sheet(store, sheet, "sheet", "data")
+
+    # Seules les cellules Vinted de Stitch ont changé
+    assert written == 3
+    assert sheet.rows[1][:3] == SHEET_ROWS[1][:3]
+    assert sheet.rows[2][15] == 4.5
+    assert sheet.rows[2][17] == "https://www.vinted.fr/items/3"
+
+    with local_store() as store:
+        assert [record["vinted_min"] for record in store.records()] == [None, 4.5]
+        assert import_from_sheet(store, sheet, "sheet", "data") == 2
+        assert store.records()[1]["vinted_min"] == 4.5
+        assert sync_to_sheet(store, sheet, "sheet", "data") == 0
@@ -0,0 +1,63 @@
+import pytest
+
+from utils.string_matcher import TitleMatcher, is_title_match
+
+# Cartes aux noms voisins : même personnage ou mêmes mots
+CARDS = [
+    "Elsa - Reine des Neiges",
+    "Elsa - Majesté Glacée",
+    "Mickey Mouse - Ami Fidèle",
+    "Minnie Mouse - Amie Fidèle",
+    "Mickey Mouse - Capitaine Mousquetaire",
+    "Maui - Demi-Dieu",
+    "Maui - Héros pour Tous",
+    "Stitch - Expérience 626",
+]
+
+
+@pytest.mark.parametrize(
+    "title, expected",
+    [
+        ("Carte Lorcana Elsa Reine des Neiges", ["Elsa - Reine des Neiges"]),
+        ("Elsa majesté glacée holo", ["Elsa - Majesté Glacée"]),
+        ("Lorcana Mickey Mouse Ami Fidèle", ["Mickey Mouse - Ami Fidèle"]),
+        ("Minnie Mouse amie fidèle lorcana", ["Minnie Mouse - Amie Fidèle"]),
+        ("Mickey ami fidele", ["Mickey Mouse - Ami Fidèle"]),
+        ("Mickey Mouse capitaine mousquetaire", ["Mickey Mouse - Capitaine Mousquetaire"]),
+        ("Maui héros pour tous", ["Maui - Héros pour Tous"]),
+        ("Stitch expérience 626 foil", ["Stitch - Expérience 626"]),
+        # Lot de deux cartes : les deux noms figurent en entier
+        ("Lot Elsa reine des neiges + Maui demi-dieu", ["Elsa - Reine des Neiges", "Maui - Demi-Dieu"]),
+        # Trop vague pour choisir entre les cartes du même personnage
+        ("Lorcana Elsa", []),
+        ("Lot Maui", []),
+    ],
+)
+def test_near_duplicate_names_match_one_card(title, expected):
+    [matched] = TitleMatcher(CARDS).match([title])
+
+    assert sorted(matched) == sorted(expected)
+
+
+def test_more_specific_name_wins():
+    matcher = TitleMatcher(["Elsa - Reine des Neiges", "Elsa - Reine des Neiges Enchantée"])
+
+    assert matcher.match(["Elsa reine des neiges enchantée"]) == [
+        ["Elsa - Reine des Neiges Enchantée"]
+    ]
+    assert matcher.match(["Elsa reine des neiges"]) == [["Elsa - Reine des Neiges"]]
+
+
+@pytest.mark.parametrize("card_name", CARDS)
+def test_single_card_matches_like_is_title_match(card_name):
+    titles = [
+        "Carte Lorcana Elsa Reine des Neiges",
+        "Minnie Mouse amie fidèle lorcana",
+        "Lorcana Elsa",
+        "Maui héros pour tous",
+        "Lot 10 cartes communes",
+    ]
+
+    assert TitleMatcher([card_name]).title_matches(titles) == [
+        is_title_match(card_name, title) for title in titles
+    ]
@@ -0,0 +1,112 @@
+import sys
+import types
+
+import pytest
+
+from scrapers import vinted, vinted_api
+from scrapers.browser_pool import BrowserPool
+from scrapers.vinted_api import VintedApiClient, VintedBlockedError
+from stubs import StubSB, vinted_stub
+from utils.metrics import metrics
+
+settings = vinted.settings
+
+
+@pytest.fixture
+def stub():
+    metrics.reset()
+    with vinted_stub() as stub:
+        yield stub
+
+
+def _api_calls(stub) -> list[str]:
+    return [cookie for path, cookie in stub.requests if path.startswith("/api/")]
+
+
+def test_session_cookie_bootstrapped_once(stub):
+    client = VintedApiClient(stub.url, timeout=5)
+
+    assert client.search("Elsa")[0]["id"] == 7
+    assert client.search("Elsa", page=2)[0]["id"] == 7
+
+    assert stub.paths() == ["/", "/api/v2/catalog/items", "/api/v2/catalog/items"]
+    assert all("access_token_web=token1" in cookie for cookie in _api_calls(stub))
+
+
+def test_expired_session_bootstrapped_again(stub):
+    client = VintedApiClient(stub.url, timeout=5)
+    client.search("Elsa")
+    stub.expire_session()
+
+    assert client.search("Elsa")[0]["id"] == 7
+
+    assert stub.paths()[1:] == [
+        "/api/v2/catalog/items",
+        "/api/v2/catalog/items",
+        "/",
+        "/api/v2/catalog/items",
+    ]
+    assert "access_token_web=token3" in _api_calls(stub)[-1]
+
+
+@pytest.mark.parametrize("status", [403, 429])
+def test_blocked_api(stub, status):
+    stub.api_statuses = [status]
+
+    with pytest.raises(VintedBlockedError, match=str(status)):
+        VintedApiClient(stub.url, timeout=5).search("Elsa")
+
+
+def test_blocked_home_page(stub):
+    stub.home_status = 403
+
+    with pytest.raises(VintedBlockedError, match="page d'accueil"):
+        VintedApiClient(stub.url, timeout=5).search("Elsa")
+    assert stub.paths() == ["/"]
+
+
+def test_session_rejected_twice_is_blocked(stub):
+    client = VintedApiClient(stub.url, timeout=5)
+    client.search("Elsa")
+    stub.api_statuses = [401, 401]
+    stub.expire_session()
+
+    with pytest.raises(VintedBlockedError, match="401"):
+        client.search("Elsa")
+
+
+@pytest.fixture
+def http_mode(stub, monkeypatch):
+    monkeypatch.setattr(settings, "vinted_fetch_mode", "http")
+    monkeypatch.setattr(settings, "vinted_base_url", stub.url)
+    monkeypatch.setattr(settings, "browser_extraction", "source")
+    monkeypatch.setitem(sys.modules, "seleniumbase", types.SimpleNamespace(SB=StubSB))
+    vinted_api.get_vinted_client.cache_clear()
+    yield stub
+    vinted_api.get_vinted_client.cache_clear()
+
+
+def test_http_mode_uses_api(http_mode):
+    kind, items = vinted.fetch_vinted_search_page("Elsa - Reine des Neiges", 1)
+
+    assert kind == "vinted_api"
+    assert items[0]["id"] == 7
+    assert "/catalog" not in http_mode.paths()
+
+
+@pytest.mark.parametrize("status", [403, 429])
+def test_blocked_api_falls_back_to_browser(http_mode, status):
+    http_mode.api_statuses = [status]
+
+    with BrowserPool(size=1) as pool:
+        kind, page = vinted.fetch_vinted_search_page("Elsa - Reine des Neiges", 1, pool)
+
+    assert kind == "vinted_html"
+    assert http_mode.paths()[-1] == "/catalog"
+    page_listings = vinted.match_vinted_page(kind, page, "Elsa - Reine des Neiges")
+    assert page_listings.listings
+    assert sum(
+        counter["value"]
+        for counter in metrics.to_dict()["counters"]
+        if counter["name"] == "vinted_browser_fallbacks"
+    ) == 1
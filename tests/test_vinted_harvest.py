@@ -0,0 +1,151 @@
+import time
+
+import pytest
+
+from models.card import Card
+from scrapers import vinted_harvest
+from scrapers.vinted_harvest import HarvestedListing, HarvestState, expired_listings
+
+settings = vinted_harvest.settings
+
+CARDS = ["Elsa - Reine des Neiges", "Maui - Demi-Dieu", "Stitch - Expérience 626"]
+
+
+def _card(name: str) -> Card:
+    return Card(
+        name_en=name,
+        name_fr=name,
+        cardmarket_url=f"https://www.cardmarket.com/fr/Lorcana/Products/Singles/{name}",
+        current_price=None,
+        row=2,
+    )
+
+
+def _listing(item_id: int, title: str, price: float) -> HarvestedListing:
+    return HarvestedListing(
+        str(item_id), title, price, f"https://www.vinted.fr/items/{item_id}-carte"
+    )
+
+
+def _best(item_id: int, price: float) -> dict:
+    return {
+        "price": price,
+        "url": f"https://www.vinted.fr/items/{item_id}-carte",
+        "seen_at": time.time() - 3600,
+    }
+
+
+@pytest.fixture
+def state_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "harvest.json")
+    monkeypatch.setattr(settings, "vinted_harvest_state_path", path)
+    monkeypatch.setattr(settings, "vinted_harvest_listing_max_age", "3d")
+    return path
+
+
+def _harvest(
+    monkeypatch, pages: list[list[HarvestedListing]], cards: list[str] = CARDS
+) -> dict:
+    monkeypatch.setattr(
+        vinted_harvest, "iter_catalog_pages", lambda max_pages, order, pool: iter(pages)
+    )
+    return vinted_harvest.harvest_vinted_prices(
+        [_card(name) for name in cards], order="newest_first"
+    )
+
+
+class _Catalog:
+    """Pages du catalogue ; `fetched` compte les pages réellement chargées"""
+
+    def __init__(self, pages: list[list[HarvestedListing]]):
+        self.pages = pages
+        self.fetched = 0
+
+    def __call__(self, max_pages, order, pool):
+        for page in self.pages[:max_pages]:
+            self.fetched += 1
+            yield page
+
+
+def test_missing_best_listing_expires(state_path, monkeypatch):
+    state = HarvestState(state_path)
+    # Annonces retenues lors d'une moisson précédente
+    state.best = {"Elsa - Reine des Neiges": _best(120, 3.0), "Maui - Demi-Dieu": _best(90, 4.0)}
+    state.seen = {"120": time.time() - 3600, "110": time.time() - 3600, "90": time.time() - 7200}
+    state.save()
+
+    # L'annonce 120 (plus récente que la 110 de la dernière page) a disparu ;
+    # la 90, plus ancienne que les pages parcourues, ne peut être vérifiée
+    prices = _harvest(
+        monkeypatch,
+        [[_listing(130, "Stitch expérience 626", 6.0)], [_listing(110, "Lot 10 cartes", 8.0)]],
+    )
+
+    assert set(prices) == {"Maui - Demi-Dieu", "Stitch - Expérience 626"}
+    assert "Elsa - Reine des Neiges" not in HarvestState(state_path).best
+
+
+def test_best_listing_still_listed_is_kept(state_path, monkeypatch):
+    state = HarvestState(state_path)
+    state.best = {"Elsa - Reine des Neiges": _best(120, 3.0)}
+    state.seen = {"120": time.time() - 3600}
+    state.save()
+
+    prices = _harvest(monkeypatch, [[_listing(120, "Elsa reine des neiges", 3.0)]])
+
+    assert prices["Elsa - Reine des Neiges"].min_price == 3.0
+    assert HarvestState(state_path).best["Elsa - Reine des Neiges"]["url"].endswith("/120-carte")
+
+
+def test_price_order_expires_within_price_range():
+    best = {"Elsa - Reine des Neiges": _best(1, 3.0), "Maui - Demi-Dieu": _best(2, 9.0)}
+    cheapest = [[_listing(5, "Lot", 2.0), _listing(6, "Lot", 5.0)]]
+    dearest = [[_listing(7, "Lot", 12.0), _listing(8, "Lot", 7.0)]]
+
+    assert expired_listings(best, cheapest, "price_low_to_high") == ["Elsa - Reine des Neiges"]
+    assert expired_listings(best, dearest, "price_high_to_low") == ["Maui - Demi-Dieu"]
+    assert expired_listings(best, cheapest, "relevance") == []
+    assert expired_listings(best, [], "newest_first") == []
+
+
+def test_newly_tracked_card_matches_listings_already_seen(state_path, monkeypatch):
+    catalog = _Catalog(
+        [
+            [_listing(101, "Elsa reine des neiges", 3.0)],
+            [_listing(100, "Maui demi-dieu", 4.0)],
+        ]
+    )
+    monkeypatch.setattr(vinted_harvest, "iter_catalog_pages", catalog)
+
+    def harvest(cards: list[str]) -> dict:
+        catalog.fetched = 0
+        return vinted_harvest.harvest_vinted_prices(
+            [_card(name) for name in cards], order="newest_first"
+        )
+
+    assert set(harvest(["Elsa - Reine des Neiges"])) == {"Elsa - Reine des Neiges"}
+    # Carte ajoutée au suivi : ses annonces déjà vues sont retrouvées
+    prices = harvest(["Elsa - Reine des Neiges", "Maui - Demi-Dieu"])
+    assert prices["Maui - Demi-Dieu"].min_price == 4.0
+    assert catalog.fetched == 2
+    # Cartes toutes couvertes : arrêt dès la première page déjà vue
+    prices = harvest(["Elsa - Reine des Neiges", "Maui - Demi-Dieu"])
+    assert set(prices) == {"Elsa - Reine des Neiges", "Maui - Demi-Dieu"}
+    assert catalog.fetched == 1
+
+
+def test_aged_out_card_is_searched_again(state_path, monkeypatch):
+    state = HarvestState(state_path)
+    aged = _best(100, 4.0) | {"seen_at": time.time() - 4 * 86400}
+    state.best = {"Maui - Demi-Dieu": aged}
+    state.seen = {"100": aged["seen_at"], "101": aged["seen_at"]}
+    state.covered = set(CARDS)
+    state.save()
+
+    prices = _harvest(
+        monkeypatch,
+        [[_listing(101, "Lot 10 cartes", 8.0)], [_listing(100, "Maui demi-dieu", 4.0)]],
+    )
+
+    assert prices["Maui - Demi-Dieu"].min_price == 4.0
+    assert time.time() - HarvestState(state_path).best["Maui - Demi-Dieu"]["seen_at"] < 60
@@ -0,0 +1,75 @@
+from models.price_info import VintedListing
+from scrapers.vinted_api import parse_vinted_api_items
+from scrapers.vinted_listings import VintedPage, VintedPriceCollector
+
+
+def _listing(price: float, n: int) -> VintedListing:
+    return VintedListing(title=f"Carte {n}", price=price, url=f"/items/{n}")
+
+
+def test_result_without_search_url():
+    collector = VintedPriceCollector(top_k=3)
+    collector.add(VintedPage([_listing(4.0, 1), _listing(2.5, 2)], size=2, last=True))
+
+    price_info = collector.result()
+
+    assert price_info is not None
+    assert price_info.urlSearch is None
+    assert price_info.min_price == 2.5
+    assert price_info.url == "/items/2"
+    assert price_info.listing_count == 2
+
+
+def test_result_with_search_url():
+    collector = VintedPriceCollector(top_k=3)
+    collector.add(VintedPage([_listing(3.0, 1)], size=1, last=True))
+
+    assert collector.result("https://www.vinted.fr/catalog").urlSearch == (
+        "https://www.vinted.fr/catalog"
+    )
+
+
+def test_api_items_matched_without_search_url():
+    items = [
+        {"title": "Lorcana Elsa Reine des Neiges", "price": {"amount": "3.50"}, "url": "/items/1"},
+        {"title": "Lorcana Mickey Mouse", "price": "9,00", "url": "/items/2"},
+    ]
+
+    price_info = parse_vinted_api_items(items, "Elsa Reine des Neiges")
+
+    assert price_info is not None
+    assert price_info.min_price == 3.5
+    assert price_info.urlSearch is None
+
+
+def test_early_stop_statistics_cover_sampled_pages_only():
+    first = VintedPage([_listing(1.0 + n, n) for n in range(3)], size=3, last=False)
+
+    sampled = VintedPriceCollector(top_k=3)
+    sampled.add(first)
+    assert sampled.complete
+    price_info = sampled.result()
+
+    assert price_info.listing_count == 3
+    assert price_info.median_price == 2.0
+    assert price_info.pages_sampled == 1
+    assert not price_info.all_pages
+
+
+def test_full_statistics_read_every_page():
+    first = VintedPage([_listing(1.0 + n, n) for n in range(3)], size=3, last=False)
+    second = VintedPage([_listing(10.0 + n, 10 + n) for n in range(3)], size=3, last=True)
+
+    collector = VintedPriceCollector(top_k=3, stop_early=False)
+    collector.add(first)
+    assert not collector.complete
+    collector.add(second)
+    assert collector.complete
+    price_info = collector.result()
+
+    assert price_info.min_price == 1.0
+    assert price_info.listing_count == 6
+    assert price_info.median_price == 6.5
+    assert price_info.pages_sampled == 2
+    assert price_info.all_pages
+    assert [listing.price for listing in price_info.top_listings] == [1.0, 2.0, 3.0]